@@ -11,12 +11,18 @@
 This module provides an API to get CPU information.
 """
 
+import os
 import re
-import copy
+import json
+import logging
+from array import array
 from pathlib import Path
 from contextlib import suppress
 from pepclibs.helperlibs.Exceptions import Error
 from pepclibs.helperlibs import ArgParse, LocalProcessManager, Trivial, ClassHelpers, Human
+from pepclibs.helperlibs import BatchIO
+
+_LOG = logging.getLogger()
 
 # CPU model numbers.
 #
@@ -187,6 +193,22 @@ _CPU_DESCR = {
               INTEL_FAM6_TREMONT_D:        "Tremont Atom (Snow Ridge)",
               INTEL_FAM6_SKYLAKE_X:        "Sky/Cascade/Cooper Lake"}
 
+# The on-disk cache file name and format version.
+_DISK_CACHE_FNAME = "cpuinfo.json"
+_DISK_CACHE_VERSION = 3
+
+# The '/proc/cpuinfo' keys used by 'CPUInfo'.
+_PROC_CPUINFO_KEYS = {"processor", "vendor_id", "cpu family", "model", "model name", "stepping",
+                      "physical id", "core id", "flags"}
+
+# The sysfs CPU cache information files read by 'CPUInfo'.
+_CACHE_INFO_FNAMES = ("level", "type", "size")
+
+# The file containing the kernel architecture name, same as 'uname -m' prints.
+_ARCH_PATH = Path("/proc/sys/kernel/arch")
+# The little endian architectures 'CPUInfo' may run on.
+_LITTLE_ENDIAN_ARCHS = {"x86_64", "i386", "i486", "i586", "i686"}
+
 # The levels names have to be the same as 'sname' names in 'PStates', 'CStates', etc.
 LEVELS = ("CPU", "core", "module", "die", "node", "package")
 
@@ -241,8 +263,8 @@ class CPUInfo(ClassHelpers.SimpleCloseContext):
 
     def get_topology(self, levels=None, order="CPU"):
         """
-        Build and return copy of internal topology list. The topology includes dictionaries, one
-        dictionary per CPU. By default each dictionary includes the following keys.
+        Build and return the topology list. The topology includes dictionaries, one dictionary per
+        CPU. By default each dictionary includes the following keys.
           * CPU     - CPU number.
                     - Globally unique.
           * core    - Core number.
@@ -339,124 +361,204 @@ class CPUInfo(ClassHelpers.SimpleCloseContext):
                 self._validate_level(lvl, name="topology level")
 
         self._validate_level(order, name="order")
-        topology = self._get_topology(levels=levels, order=order)
-        return copy.deepcopy(topology)
+        cpus = self._get_topology(levels=levels, order=order)
+
+        tcols = [(lvl, self._tcols[lvl]) for lvl in LEVELS if lvl in self._initialized_levels]
+        return [{lvl : tcol[cpu] for lvl, tcol in tcols} for cpu in cpus]
 
-    def _read_range(self, path, must_exist=True):
+    def _bulk_read_files(self, patterns):
+        """
+        Read all files matching shell glob patterns in 'patterns' with a single command if the host
+        is remote, in order to avoid a network round trip per file. Returns a dictionary mapping
+        the paths to the files contents, or an empty dictionary if the host is local or the command
+        failed. Refer to 'BatchIO.grep_files()' for more information.
+        """
+
+        if not self._pman.is_remote or not patterns:
+            return {}
+
+        try:
+            return BatchIO.grep_files(patterns, pman=self._pman)
+        except Error as err:
+            _LOG.debug("failed to bulk-read files%s:\n%s", self._pman.hostmsg, err.indent(2))
+            return {}
+
+    def _read_file(self, path, prefetched=None, must_exist=True):
+        """
+        Read file 'path' and return its contents. Use the data in the 'prefetched' dictionary (see
+        '_bulk_read_files()') if possible, otherwise read the file.
+        """
+
+        if prefetched and prefetched.get(path) is not None:
+            return prefetched[path]
+
+        return self._pman.read_small(path, must_exist=must_exist)
+
+    def _read_range(self, path, must_exist=True, prefetched=None):
         """Read number range string from path 'path', and return it as a list of integers."""
 
-        str_of_ranges = self._pman.read(path, must_exist=must_exist).strip()
+        str_of_ranges = self._read_file(path, prefetched=prefetched, must_exist=must_exist).strip()
         return ArgParse.parse_int_list(str_of_ranges, ints=True)
 
-    def _sort_topology(self, topology, order):
-        """Sorts and save the topology list by 'order' in sorting map"""
+    def _sort_topology(self, order):
+        """
+        Build the topology sort permutation for order 'order': the array of online CPU numbers
+        sorted as defined by the sorting map.
+        """
+
+        skeys = [self._tcols[lvl] for lvl in self._sorting_map[order]]
+        cpus = sorted(self._get_online_cpus(),
+                      key=lambda cpu: tuple(tcol[cpu] for tcol in skeys))
+        self._tperms[order] = array("i", cpus)
 
-        skeys = self._sorting_map[order]
-        self._topology[order] = sorted(topology, key=lambda tline: tuple(tline[s] for s in skeys))
+    def _new_tcol(self):
+        """Return a new topology table column with all the values set to '-1' (unknown)."""
+        return array("i", [-1]) * self._tsize
+
+    def _resize_topology(self, cpus):
+        """Make sure the topology table has rows for all CPUs in 'cpus'."""
+
+        size = max(cpus) + 1
+        if size <= self._tsize:
+            return
+
+        for tcol in self._tcols.values():
+            tcol.extend([-1] * (size - self._tsize))
+        self._tsize = size
+
+    def _add_levels(self, levels, cpus):
+        """Add level 'levels' numbers for CPUs 'cpus' to the topology table."""
+
+        for lvl in LEVELS:
+            if lvl not in self._tcols:
+                self._tcols[lvl] = self._new_tcol()
+
+        tcol = self._tcols["CPU"]
+        for cpu in cpus:
+            tcol[cpu] = cpu
+
+        # Read all the sysfs files required for the levels in one go.
+        patterns = []
+        for lvl in levels:
+            patterns += self._bulk_read_patterns.get(lvl, [])
+        prefetched = self._bulk_read_files(patterns)
+
+        if "package" in levels or "core" in levels:
+            self._add_core_and_package_numbers(cpus)
+        if "module" in levels:
+            self._add_module_numbers(cpus, prefetched)
+        if "die" in levels:
+            self._add_die_numbers(cpus, prefetched)
+        if "node" in levels:
+            self._add_node_numbers(prefetched)
 
     def _update_topology(self):
         """Update topology information with online/offline CPUs."""
 
         new_online_cpus = self._get_online_cpus()
-        old_online_cpus = {tline["CPU"] for tline in self._topology["CPU"]}
+        old_online_cpus = set(self._tperms["CPU"])
         if new_online_cpus != old_online_cpus:
             onlined = list(new_online_cpus - old_online_cpus)
+            offlined = old_online_cpus - new_online_cpus
 
-            tinfo = {cpu : {"CPU" : cpu} for cpu in onlined}
-            for tline in self._topology["CPU"]:
-                if tline["CPU"] in new_online_cpus:
-                    tinfo[tline["CPU"]] = tline
-
-            if "package" in self._initialized_levels or "core" in self._initialized_levels:
-                self._add_core_and_package_numbers(tinfo, onlined)
-            if "module" in self._initialized_levels:
-                self._add_module_numbers(tinfo, onlined)
-            if "die" in self._initialized_levels:
-                self._add_die_numbers(tinfo, onlined)
-            if "node" in self._initialized_levels:
-                self._add_node_numbers(tinfo)
-
-            topology = list(tinfo.values())
-            for order in self._initialized_levels:
-                self._sort_topology(topology, order)
-
-        self._must_update_topology = False
+            for tcol in self._tcols.values():
+                for cpu in offlined:
+                    tcol[cpu] = -1
 
-    def _add_core_and_package_numbers(self, tinfo, cpus):
-        """Adds core and package numbers for CPUs 'cpus' to 'tinfo'."""
+            if onlined:
+                self._resize_topology(onlined)
+                self._add_levels(self._initialized_levels, onlined)
 
-        def _get_number(start, lines, index):
-            """Check that line with index 'index' starts with 'start', and return its value."""
+            for order in self._initialized_levels:
+                self._sort_topology(order)
 
-            try:
-                line = lines[index]
-            except IndexError:
-                raise Error(f"there are to few lines in '/proc/cpuinfo' for CPU '{cpu}'") from None
+            self._siblings = {}
 
-            if not line.startswith(start):
-                raise Error(f"line {index + 1} for CPU {cpu} in '/proc/cpuinfo' is not \"{start}\"")
+        self._must_update_topology = False
 
-            return Trivial.str_to_int(line.partition(":")[2], what=start)
+    def _add_core_and_package_numbers(self, cpus):
+        """Adds core and package numbers for CPUs 'cpus' to the topology table."""
 
-        info = {}
-        for data in self._pman.read("/proc/cpuinfo").strip().split("\n\n"):
-            lines = data.split("\n")
-            cpu = _get_number("processor", lines, 0)
-            info[cpu] = lines
+        proc_cpuinfo = self._get_proc_cpuinfo()
 
+        pkg_tcol = self._tcols["package"]
+        core_tcol = self._tcols["core"]
         for cpu in cpus:
-            if cpu not in info:
-                raise Error(f"CPU {cpu} is missing from '/proc/cpuinfo'")
+            if cpu not in proc_cpuinfo:
+                raise Error(f"CPU {cpu} is missing from '/proc/cpuinfo'{self._pman.hostmsg}")
+
+            info = proc_cpuinfo[cpu]
+            for key, tcol in (("physical id", pkg_tcol), ("core id", core_tcol)):
+                if key not in info:
+                    raise Error(f"no '{key}' for CPU {cpu} in '/proc/cpuinfo'{self._pman.hostmsg}")
+                tcol[cpu] = Trivial.str_to_int(info[key], what=key)
+
+    def _set_siblings_number(self, lvl, siblings, num):
+        """
+        Set level 'lvl' number of online CPUs in 'siblings' to 'num'. Offline CPUs in 'siblings' are
+        ignored.
+        """
 
-            lines = info[cpu]
-            tinfo[cpu]["package"] = _get_number("physical id", lines, 9)
-            tinfo[cpu]["core"] = _get_number("core id", lines, 11)
+        tcol = self._tcols[lvl]
+        cpu_tcol = self._tcols["CPU"]
+        for sibling in siblings:
+            if sibling < self._tsize and cpu_tcol[sibling] != -1:
+                tcol[sibling] = num
 
-    def _add_module_numbers(self, tinfo, cpus):
-        """Adds module numbers for CPUs 'cpus' to 'tinfo'"""
+    def _add_module_numbers(self, cpus, prefetched):
+        """
+        Adds module numbers for CPUs 'cpus' to the topology table. Use the 'prefetched' sysfs
+        files contents if possible.
+        """
 
+        tcol = self._tcols["module"]
         for cpu in cpus:
-            if "module" in tinfo[cpu]:
+            if tcol[cpu] != -1:
                 continue
 
             base = Path(f"/sys/devices/system/cpu/cpu{cpu}")
-            data = self._pman.read(base / "cache/index2/id")
+            data = self._read_file(base / "cache/index2/id", prefetched=prefetched)
             module = Trivial.str_to_int(data, "module number")
-            siblings = self._read_range(base / "cache/index2/shared_cpu_list")
-            for sibling in siblings:
-                # Suppress 'KeyError' in case the 'shared_cpu_list' file included an offline CPU.
-                with suppress(KeyError):
-                    tinfo[sibling]["module"] = module
+            siblings = self._read_range(base / "cache/index2/shared_cpu_list",
+                                        prefetched=prefetched)
+            self._set_siblings_number("module", siblings, module)
 
-    def _add_die_numbers(self, tinfo, cpus):
-        """Adds die numbers for CPUs 'cpus' to 'tinfo'"""
+    def _add_die_numbers(self, cpus, prefetched):
+        """
+        Adds die numbers for CPUs 'cpus' to the topology table. Use the 'prefetched' sysfs files
+        contents if possible.
+        """
 
+        tcol = self._tcols["die"]
         for cpu in cpus:
-            if "die" in tinfo[cpu]:
+            if tcol[cpu] != -1:
                 continue
 
             base = Path(f"/sys/devices/system/cpu/cpu{cpu}")
-            data = self._pman.read(base / "topology/die_id")
+            data = self._read_file(base / "topology/die_id", prefetched=prefetched)
             die = Trivial.str_to_int(data, "die number")
-            siblings = self._read_range(base / "topology/die_cpus_list")
-            for sibling in siblings:
-                # Suppress 'KeyError' in case the 'die_cpus_list' file included an offline CPU.
-                with suppress(KeyError):
-                    tinfo[sibling]["die"] = die
-
-    def _add_node_numbers(self, tinfo):
-        """Adds NUMA node numbers to 'tinfo'."""
-
-        nodes = self._read_range("/sys/devices/system/node/online")
-        for node in nodes:
-            cpus = self._read_range(f"/sys/devices/system/node/node{node}/cpulist")
-            for cpu in cpus:
-                # Suppress 'KeyError' in case the 'cpulist' file included an offline CPU.
-                with suppress(KeyError):
-                    tinfo[cpu]["node"] = node
+            siblings = self._read_range(base / "topology/die_cpus_list", prefetched=prefetched)
+            self._set_siblings_number("die", siblings, die)
+
+    def _add_node_numbers(self, prefetched):
+        """
+        Adds NUMA node numbers to the topology table. Use the 'prefetched' sysfs files contents if
+        possible.
+        """
+
+        nodes = self._read_range(Path("/sys/devices/system/node/online"), prefetched=prefetched)
+        paths = [Path(f"/sys/devices/system/node/node{node}/cpulist") for node in nodes]
+
+        for node, path in zip(nodes, paths):
+            cpus = self._read_range(path, prefetched=prefetched)
+            self._set_siblings_number("node", cpus, node)
 
     def _get_topology(self, levels, order="CPU"):
-        """Build and return topology list, refer to 'get_topology()' for more information."""
+        """
+        Make sure the topology table includes levels 'levels', and return the array of online CPU
+        numbers sorted in order 'order'. Use the array for indexing the topology table columns in
+        'self._tcols'.
+        """
 
         levels = set(levels)
         levels.update(set(self._sorting_map[order]))
@@ -466,31 +568,116 @@ class CPUInfo(ClassHelpers.SimpleCloseContext):
 
         levels -= self._initialized_levels
         if not levels:
-            return self._topology[order]
+            return self._tperms[order]
 
-        if not self._topology:
-            tinfo = {cpu : {"CPU" : cpu} for cpu in self._get_online_cpus(update=True)}
-        else:
-            tinfo = {tline["CPU"] : tline for tline in self._topology["CPU"]}
+        cpus = self._get_online_cpus(update=not self._tcols)
+        self._resize_topology(cpus)
 
-        cpus = self._get_online_cpus()
         if "package" in levels or "core" in levels:
-            self._add_core_and_package_numbers(tinfo, cpus)
             levels.update({"package", "core"})
-        if "module" in levels:
-            self._add_module_numbers(tinfo, cpus)
-        if "die" in levels:
-            self._add_die_numbers(tinfo, cpus)
-        if "node" in levels:
-            self._add_node_numbers(tinfo)
+        self._add_levels(levels, cpus)
 
-        topology = list(tinfo.values())
         self._initialized_levels.update(levels)
         for level in self._initialized_levels:
-            if level not in self._topology:
-                self._sort_topology(topology, level)
+            if level not in self._tperms:
+                self._sort_topology(level)
 
-        return self._topology[order]
+        return self._tperms[order]
+
+    def _get_siblings_index(self, lvl):
+        """
+        Return the siblings index for level 'lvl'. The index is a dictionary with the following
+        keys.
+          * cpu2sibs - maps every online CPU number to the frozenset of CPUs in the same 'lvl'
+                       element (e.g., the same core).
+          * num2cpus - maps every 'lvl' element number to the frozenset of CPUs in all 'lvl'
+                       elements with this number. Note, core and die numbers are per-package, so
+                       for cores and dies this includes CPUs from all packages.
+          * groups - maps every 'lvl' element to the frozenset of its CPUs. The keys are
+                     '(package, number)' tuples for cores and dies, and just numbers for other
+                     levels.
+
+        The index is built on the first use from the topology table and dropped when the topology
+        is updated on CPU hotplug. It allows for getting CPU siblings without scanning the entire
+        topology table, which is important for scope-aware operations on systems with many CPUs.
+        """
+
+        # Note, this also updates the topology if some CPUs were onlined or offlined.
+        cpus = self._get_topology(levels=(lvl, "package"))
+
+        if lvl in self._siblings:
+            return self._siblings[lvl]
+
+        tcol = self._tcols[lvl]
+        pkg_tcol = self._tcols["package"]
+        groups = {}
+        num2cpus = {}
+        for cpu in cpus:
+            num = tcol[cpu]
+            if lvl in ("core", "die"):
+                key = (pkg_tcol[cpu], num)
+            else:
+                key = num
+            groups.setdefault(key, []).append(cpu)
+            num2cpus.setdefault(num, []).append(cpu)
+
+        cpu2sibs = {}
+        for key, cpus in groups.items():
+            groups[key] = frozenset(cpus)
+            for cpu in cpus:
+                cpu2sibs[cpu] = groups[key]
+
+        num2cpus = {num : frozenset(cpus) for num, cpus in num2cpus.items()}
+
+        self._siblings[lvl] = {"cpu2sibs" : cpu2sibs, "num2cpus" : num2cpus, "groups" : groups}
+        return self._siblings[lvl]
+
+    def _check_level_nums(self, lvl, nums, valid_nums):
+        """
+        Validate level 'lvl' numbers 'nums' against the collection of valid numbers 'valid_nums'.
+        Return 'nums' as a set.
+        """
+
+        if nums == "all":
+            return set(valid_nums)
+
+        # Valid 'nums' should be an integer or a collection of integers.
+        try:
+            nums = set(nums)
+        except TypeError:
+            nums = set([nums])
+
+        if not nums.issubset(valid_nums):
+            valid = Human.rangify(valid_nums)
+            invalid = Human.rangify(nums - set(valid_nums))
+            raise Error(f"{lvl} {invalid} do not exist{self._pman.hostmsg}, valid {lvl} numbers "
+                        f"are: {valid}")
+
+        return nums
+
+    def _level_nums_to_cpus(self, lvl, nums, packages="all"):
+        """
+        Return the sorted list of online CPU numbers in level 'lvl' elements with numbers 'nums' in
+        packages 'packages'. Uses the siblings index, refer to '_get_siblings_index()'.
+        """
+
+        num2cpus = self._get_siblings_index(lvl)["num2cpus"]
+        nums = self._check_level_nums(lvl, nums, num2cpus)
+
+        cpus = set()
+        for num in nums:
+            cpus.update(num2cpus[num])
+
+        if packages != "all":
+            pkg2cpus = self._get_siblings_index("package")["num2cpus"]
+            packages = self._check_level_nums("package", packages, pkg2cpus)
+            if len(packages) != len(pkg2cpus):
+                pkg_cpus = set()
+                for pkg in packages:
+                    pkg_cpus.update(pkg2cpus[pkg])
+                cpus &= pkg_cpus
+
+        return sorted(cpus)
 
     def _validate_level(self, lvl, name="level"):
         """Validate that 'lvl' is a valid level name."""
@@ -561,20 +748,18 @@ class CPUInfo(ClassHelpers.SimpleCloseContext):
         result = {}
         valid_nums = set()
 
-        for tline in self._get_topology(levels=(lvl, sublvl), order=order):
-            valid_nums.add(tline[lvl])
-            if nums == "all" or tline[lvl] in nums:
-                result[tline[sublvl]] = None
+        cpus = self._get_topology(levels=(lvl, sublvl), order=order)
+        tcol = self._tcols[lvl]
+        sub_tcol = self._tcols[sublvl]
+        for cpu in cpus:
+            num = tcol[cpu]
+            valid_nums.add(num)
+            if nums == "all" or num in nums:
+                result[sub_tcol[cpu]] = None
 
         # Validate the input numbers in 'nums'.
-        if nums == "all":
-            return list(result)
-
-        if not nums.issubset(valid_nums):
-            valid = Human.rangify(valid_nums)
-            invalid = Human.rangify(nums - valid_nums)
-            raise Error(f"{lvl} {invalid} do not exist{self._pman.hostmsg}, valid {lvl} numbers "
-                        f"are: {valid}")
+        if nums != "all":
+            self._check_level_nums(lvl, nums, valid_nums)
 
         return list(result)
 
@@ -646,7 +831,8 @@ class CPUInfo(ClassHelpers.SimpleCloseContext):
         """This method informs CPUInfo to update online/offline CPUs and topology lists."""
 
         self._cpus = None
-        if self._topology:
+        self._proc_cpuinfo = None
+        if self._tcols:
             self._must_update_topology = True
 
     def get_cpu_levels(self, cpu, levels=None):
@@ -659,16 +845,13 @@ class CPUInfo(ClassHelpers.SimpleCloseContext):
         if not levels:
             levels = LEVELS
 
-        tline = None
-        for tline in self._get_topology(levels=levels):
-            if cpu == tline["CPU"]:
-                break
-        else:
+        self._get_topology(levels=levels)
+        if cpu < 0 or cpu >= self._tsize or self._tcols["CPU"][cpu] == -1:
             raise Error(f"CPU {cpu} is not available{self._pman.hostmsg}")
 
         result = {}
         for lvl in levels:
-            result[lvl] = tline[lvl]
+            result[lvl] = self._tcols[lvl][cpu]
         return result
 
     def get_cpu_siblings(self, cpu, level):
@@ -687,22 +870,21 @@ class CPUInfo(ClassHelpers.SimpleCloseContext):
         if level == "global":
             return self.get_cpus()
 
-        levels = self.get_cpu_levels(cpu, levels=(level, "package"))
-        if level == "package":
-            return self.package_to_cpus(levels[level])
-        if level == "node":
-            return self.nodes_to_cpus(levels[level])
-        if level == "die":
-            return self.dies_to_cpus(dies=levels[level], packages=levels["package"])
-        if level == "module":
-            return self.modules_to_cpus(levels[level])
-        if level == "core":
-            return self.cores_to_cpus(cores=levels[level], packages=levels["package"])
+        if level not in self._lvl2idx:
+            raise Error(f"unsupported scope name \"{level}\"")
 
-        raise Error(f"unsupported scope name \"{level}\"")
+        cpu = Trivial.str_to_int(cpu, what="CPU number")
+        cpu2sibs = self._get_siblings_index(level)["cpu2sibs"]
+        if cpu not in cpu2sibs:
+            raise Error(f"CPU {cpu} is not available{self._pman.hostmsg}")
+
+        return sorted(cpu2sibs[cpu])
 
     def package_to_cpus(self, package, order="CPU"):
         """Return list of cpu numbers belonging to package 'package', sorted by 'order'."""
+
+        if order == "CPU":
+            return self._level_nums_to_cpus("package", (package,))
         return self._get_level_nums("CPU", "package", (package,), order=order)
 
     def package_to_cores(self, package, order="core"):
@@ -728,6 +910,9 @@ class CPUInfo(ClassHelpers.SimpleCloseContext):
         Note: core numbers are per-package.
         """
 
+        if order == "CPU":
+            return self._level_nums_to_cpus("core", cores, packages=packages)
+
         by_core = self._get_level_nums("CPU", "core", cores, order=order)
         by_package = set(self._get_level_nums("CPU", "package", packages))
 
@@ -740,6 +925,9 @@ class CPUInfo(ClassHelpers.SimpleCloseContext):
 
     def modules_to_cpus(self, modules="all", order="CPU"):
         """Returns list of online CPU numbers belonging to modules 'modules'."""
+
+        if order == "CPU":
+            return self._level_nums_to_cpus("module", modules)
         return self._get_level_nums("CPU", "module", modules, order=order)
 
     def dies_to_cpus(self, dies="all", packages="all", order="CPU"):
@@ -749,6 +937,9 @@ class CPUInfo(ClassHelpers.SimpleCloseContext):
         Note: die numbers are per-package.
         """
 
+        if order == "CPU":
+            return self._level_nums_to_cpus("die", dies, packages=packages)
+
         by_die = self._get_level_nums("CPU", "die", dies, order=order)
         by_package = set(self._get_level_nums("CPU", "package", packages))
 
@@ -761,10 +952,16 @@ class CPUInfo(ClassHelpers.SimpleCloseContext):
 
     def nodes_to_cpus(self, nodes="all", order="CPU"):
         """Returns list of online CPU numbers belonging to nodes 'nodes'."""
+
+        if order == "CPU":
+            return self._level_nums_to_cpus("node", nodes)
         return self._get_level_nums("CPU", "node", nodes, order=order)
 
     def packages_to_cpus(self, packages="all", order="CPU"):
         """Returns list of online CPU numbers belonging to packages 'packages'."""
+
+        if order == "CPU":
+            return self._level_nums_to_cpus("package", packages)
         return self._get_level_nums("CPU", "package", packages, order=order)
 
     def get_offline_cpus_count(self):
@@ -820,11 +1017,13 @@ class CPUInfo(ClassHelpers.SimpleCloseContext):
         cpu2index = {} # CPU number -> core siblings index map.
         core = pkg = index = None
 
-        for tline in self._get_topology(levels=("CPU", "core", "package"), order="core"):
-            cpu = tline["CPU"]
-            if tline["core"] != core or tline["package"] != pkg:
-                core = tline["core"]
-                pkg = tline["package"]
+        core_order = self._get_topology(levels=("CPU", "core", "package"), order="core")
+        core_tcol = self._tcols["core"]
+        pkg_tcol = self._tcols["package"]
+        for cpu in core_order:
+            if core_tcol[cpu] != core or pkg_tcol[cpu] != pkg:
+                core = core_tcol[cpu]
+                pkg = pkg_tcol[cpu]
                 index = 0
             cpu2index[cpu] = index
             index += 1
@@ -837,6 +1036,44 @@ class CPUInfo(ClassHelpers.SimpleCloseContext):
 
         return result
 
+    def _cpus_div_level(self, lvl, cpus, keys=None):
+        """
+        Check which CPU numbers in 'cpus' cover entire level 'lvl' elements. The arguments are as
+        follows.
+          * lvl - the level name.
+          * cpus - same as in 'normalize_cpus()'.
+          * keys - the level elements to check, in the order they should be returned. By default,
+                   all level elements are checked in ascending order. The element keys are the same
+                   as in the 'groups' dictionary of the siblings index, refer to
+                   '_get_siblings_index()'.
+
+        Returns a tuple of two lists: ('keys', 'rem_cpus').
+          * keys - list of level element keys with all CPUs present in 'cpus'.
+          * rem_cpus - list of remaining CPUs in the order of the input 'cpus'.
+
+        The siblings index allows for doing this in a single pass over the CPUs, instead of building
+        the list of CPUs for every level element separately.
+        """
+
+        cpus = self.normalize_cpus(cpus)
+        cpus_set = set(cpus)
+
+        groups = self._get_siblings_index(lvl)["groups"]
+        if keys is None:
+            keys = sorted(groups)
+
+        result = []
+        for key in keys:
+            siblings_set = groups[key]
+            if siblings_set.issubset(cpus_set):
+                result.append(key)
+                cpus_set -= siblings_set
+
+        # Return the remaining CPUs in the order of the input 'cpus'.
+        rem_cpus = [cpu for cpu in cpus if cpu in cpus_set]
+
+        return (result, rem_cpus)
+
     def cpus_div_cores(self, cpus):
         """
         This method is similar to 'cpus_div_packages()', but it checks which CPU numbers in 'cpus'
@@ -862,26 +1099,8 @@ class CPUInfo(ClassHelpers.SimpleCloseContext):
         3. cpus_div_cores("0,3") would return ([],             [0,3]).
         """
 
-        cores = []
-        rem_cpus = []
-
-        cpus = self.normalize_cpus(cpus)
-        cpus_set = set(cpus)
-
-        for pkg in self.get_packages():
-            for core in self.package_to_cores(pkg):
-                siblings_set = set(self.cores_to_cpus(cores=(core,), packages=(pkg,)))
-
-                if siblings_set.issubset(cpus_set):
-                    cores.append((core, pkg))
-                    cpus_set -= siblings_set
-
-        # Return the remaining CPUs in the order of the input 'cpus'.
-        for cpu in cpus:
-            if cpu in cpus_set:
-                rem_cpus.append(cpu)
-
-        return (cores, rem_cpus)
+        cores, rem_cpus = self._cpus_div_level("core", cpus)
+        return ([(core, pkg) for pkg, core in cores], rem_cpus)
 
     def cpus_div_dies(self, cpus):
         """
@@ -912,26 +1131,8 @@ class CPUInfo(ClassHelpers.SimpleCloseContext):
         3. cpus_div_dies("0,3") would return   ([],             [0,3]).
         """
 
-        dies = []
-        rem_cpus = []
-
-        cpus = self.normalize_cpus(cpus)
-        cpus_set = set(cpus)
-
-        for pkg in self.get_packages():
-            for die in self.package_to_dies(pkg):
-                siblings_set = set(self.dies_to_cpus(dies=(die,), packages=(pkg,)))
-
-                if siblings_set.issubset(cpus_set):
-                    dies.append((die, pkg))
-                    cpus_set -= siblings_set
-
-        # Return the remaining CPUs in the order of the input 'cpus'.
-        for cpu in cpus:
-            if cpu in cpus_set:
-                rem_cpus.append(cpu)
-
-        return (dies, rem_cpus)
+        dies, rem_cpus = self._cpus_div_level("die", cpus)
+        return ([(die, pkg) for pkg, die in dies], rem_cpus)
 
     def cpus_div_packages(self, cpus, packages="all"):
         """
@@ -954,25 +1155,7 @@ class CPUInfo(ClassHelpers.SimpleCloseContext):
         3. cpus_div_packages("0,3") would return ([],    [0,3]).
         """
 
-        pkgs = []
-        rem_cpus = []
-
-        cpus = self.normalize_cpus(cpus)
-        cpus_set = set(cpus)
-
-        for pkg in self.normalize_packages(packages):
-            pkg_cpus_set = set(self.package_to_cpus(pkg))
-
-            if pkg_cpus_set.issubset(cpus_set):
-                pkgs.append(pkg)
-                cpus_set -= pkg_cpus_set
-
-        # Return the remaining CPUs in the order of the input 'cpus'.
-        for cpu in cpus:
-            if cpu in cpus_set:
-                rem_cpus.append(cpu)
-
-        return (pkgs, rem_cpus)
+        return self._cpus_div_level("package", cpus, keys=self.normalize_packages(packages))
 
     def normalize_cpus(self, cpus, offlined_ok=False):
         """
@@ -1068,66 +1251,300 @@ class CPUInfo(ClassHelpers.SimpleCloseContext):
         """Same as 'normalize_packages()', but for a single package number."""
         return self.normalize_packages([package])[0]
 
+    def _get_proc_cpuinfo(self):
+        """
+        Read and parse '/proc/cpuinfo'. Returns a dictionary mapping CPU numbers to dictionaries of
+        '/proc/cpuinfo' key-value pairs for the CPU (only the keys in '_PROC_CPUINFO_KEYS'). The
+        result is cached until CPUs are onlined or offlined.
+        """
+
+        if self._proc_cpuinfo is not None:
+            return self._proc_cpuinfo
+
+        self._proc_cpuinfo = {}
+        for data in self._pman.read("/proc/cpuinfo").strip().split("\n\n"):
+            info = {}
+            for line in data.split("\n"):
+                key, sep, val = line.partition(":")
+                key = key.strip()
+                if sep and key in _PROC_CPUINFO_KEYS:
+                    info[key] = val.strip()
+
+            if "processor" not in info:
+                raise Error(f"unexpected '/proc/cpuinfo' format{self._pman.hostmsg}: no "
+                            f"'processor' key in the following data:\n{data}")
+
+            cpu = Trivial.str_to_int(info["processor"], what="CPU number in '/proc/cpuinfo'")
+            self._proc_cpuinfo[cpu] = info
+
+        return self._proc_cpuinfo
+
+    def _get_arch(self, prefetched=None):
+        """
+        Return the architecture of the target host kernel (e.g., "x86_64"), which is what 'uname -m'
+        prints. Returns 'None' if the architecture could not be found out.
+        """
+
+        arch = self._read_file(_ARCH_PATH, prefetched=prefetched, must_exist=False)
+        if arch is None:
+            # Older kernels do not have the 'arch' file.
+            try:
+                arch, _ = self._pman.run_verify("uname -m")
+            except Error as err:
+                _LOG.debug("failed to find out the architecture%s:\n%s",
+                           self._pman.hostmsg, err.indent(2))
+                return None
+
+        return arch.strip() or None
+
+    def _get_cache_info(self, cpu, prefetched=None):
+        """
+        Read CPU caches information for CPU 'cpu' from sysfs. Returns a dictionary with cache
+        names (e.g., "l1d", "l2") as keys and sizes of a single cache instance (e.g., "48K") as
+        values. The 'prefetched' argument is the same as in '_read_file()'.
+        """
+
+        base = Path(f"/sys/devices/system/cpu/cpu{cpu}/cache")
+
+        caches = {}
+        index = 0
+        while True:
+            path = base / f"index{index}"
+            vals = {}
+            for fname in _CACHE_INFO_FNAMES:
+                vals[fname] = self._read_file(path / fname, prefetched=prefetched, must_exist=False)
+            if None in vals.values():
+                return caches
+
+            vals = {fname : val.strip() for fname, val in vals.items()}
+            suffix = {"Data" : "d", "Instruction" : "i"}.get(vals["type"], "")
+            caches[f"l{vals['level']}{suffix}"] = vals["size"]
+            index += 1
+
     def _get_cpu_info(self):
         """Get general CPU information (model, architecture, etc)."""
 
         if self.info:
             return self.info
 
+        proc_cpuinfo = self._get_proc_cpuinfo()
+        first_cpu = min(proc_cpuinfo)
+        first = proc_cpuinfo[first_cpu]
+
         self.info = cpuinfo = {}
-        lscpu, _ = self._pman.run_verify("lscpu", join=False)
-
-        # Parse misc. information about the CPU.
-        patterns = ((r"^Architecture:\s*(.*)$", "arch"),
-                    (r"^Byte Order:\s*(.*)$", "byteorder"),
-                    (r"^Vendor ID:\s*(.*)$", "vendor"),
-                    (r"^Socket\(s\):\s*(.*)$", "packages"),
-                    (r"^CPU family:\s*(.*)$", "family"),
-                    (r"^Model:\s*(.*)$", "model"),
-                    (r"^Model name:\s*(.*)$", "modelname"),
-                    (r"^Model name:.*@\s*(.*)GHz$", "basefreq"),
-                    (r"^Stepping:\s*(.*)$", "stepping"),
-                    (r"^L1d cache:\s*(.*)$", "l1d"),
-                    (r"^L1i cache:\s*(.*)$", "l1i"),
-                    (r"^L2 cache:\s*(.*)$", "l2"),
-                    (r"^L3 cache:\s*(.*)$", "l3"),
-                    (r"^Flags:\s*(.*)$", "flags"))
-
-        for line in lscpu:
-            for pattern, key in patterns:
-                match = re.match(pattern, line.strip())
-                if not match:
-                    continue
-
-                val = match.group(1)
-                if Trivial.is_int(val):
-                    cpuinfo[key] = int(val)
-                else:
-                    cpuinfo[key] = val
-
-        if cpuinfo.get("flags"):
-            cpuflags = set(cpuinfo["flags"].split())
-            cpuinfo["flags"] = {}
-            # In current implementation we assume all CPUs have the same flags. But ideally, we
-            # should read the flags for each CPU from '/proc/cpuinfo', instead of using 'lscpu'.
-            for cpu in self._get_online_cpus():
-                cpuinfo["flags"][cpu] = cpuflags
+        for key, pkey in (("vendor", "vendor_id"), ("family", "cpu family"), ("model", "model"),
+                          ("modelname", "model name"), ("stepping", "stepping")):
+            if pkey in first:
+                val = first[pkey]
+                cpuinfo[key] = int(val) if Trivial.is_int(val) else val
+
+        match = re.match(r"^.*@\s*(.*)GHz$", first.get("model name", ""))
+        if match:
+            val = match.group(1)
+            cpuinfo["basefreq"] = int(val) if Trivial.is_int(val) else val
+
+        packages = {info["physical id"] for info in proc_cpuinfo.values() if "physical id" in info}
+        if packages:
+            cpuinfo["packages"] = len(packages)
+
+        # Many CPUs have the same flags, so use the same 'frozenset' object for all of them.
+        flagsets = {}
+        cpuinfo["flags"] = {}
+        for cpu, info in proc_cpuinfo.items():
+            flags = info.get("flags", "")
+            if flags not in flagsets:
+                flagsets[flags] = frozenset(flags.split())
+            cpuinfo["flags"][cpu] = flagsets[flags]
+
+        # Read the architecture and the cache information files in one go in case of a remote host.
+        cache_base = f"/sys/devices/system/cpu/cpu{first_cpu}/cache"
+        patterns = [str(_ARCH_PATH)] + [f"{cache_base}/index[0-9]*/{fname}"
+                                   for fname in _CACHE_INFO_FNAMES]
+        prefetched = self._bulk_read_files(patterns)
+
+        # Note, this is the kernel architecture, which may be different to what the CPU supports
+        # (e.g., a 32-bit kernel on a 64-bit CPU).
+        arch = self._get_arch(prefetched=prefetched)
+        if arch:
+            cpuinfo["arch"] = arch
+            if arch in _LITTLE_ENDIAN_ARCHS:
+                cpuinfo["byteorder"] = "Little Endian"
+
+        try:
+            cpuinfo.update(self._get_cache_info(first_cpu, prefetched=prefetched))
+        except Error as err:
+            _LOG.debug("failed to read CPU cache information%s:\n%s",
+                       self._pman.hostmsg, err.indent(2))
 
         return cpuinfo
 
-    def __init__(self, pman=None):
+    def _info_to_disk_cache(self):
+        """
+        Convert the general CPU information dictionary to a JSON-compatible dictionary for the
+        on-disk cache. CPU flags are usually the same for many CPUs, so store every unique set of
+        flags only once.
+        """
+
+        info = dict(self.info)
+        if "flags" in info:
+            flagsets = {}
+            cpu2idx = {}
+            for cpu, flags in info["flags"].items():
+                key = id(flags)
+                if key not in flagsets:
+                    flagsets[key] = (len(flagsets), sorted(flags))
+                cpu2idx[str(cpu)] = flagsets[key][0]
+
+            info["flags"] = {"flagsets" : [flags for _, flags in flagsets.values()],
+                             "cpus" : cpu2idx}
+
+        return info
+
+    @staticmethod
+    def _info_from_disk_cache(info):
+        """The reverse of '_info_to_disk_cache()'."""
+
+        info = dict(info)
+        if "flags" in info:
+            flagsets = [frozenset(flags) for flags in info["flags"]["flagsets"]]
+            info["flags"] = {int(cpu) : flagsets[idx] for cpu, idx in info["flags"]["cpus"].items()}
+
+        return info
+
+    def _get_disk_cache_key(self):
+        """
+        Return the on-disk cache key, which includes the boot ID and the online CPUs. The key
+        changes on every reboot and CPU hotplug, which invalidates the cache.
+        """
+        return f"{self._boot_id} {Human.rangify(self._get_online_cpus())}"
+
+    def _load_disk_cache(self):
+        """
+        Load the general CPU information and topology from the on-disk cache. Returns 'True' on
+        success and 'False' if the cache is disabled, does not exist or is stale.
+        """
+
+        if not self._cachedir:
+            return False
+
+        try:
+            self._boot_id = self._pman.read("/proc/sys/kernel/random/boot_id").strip()
+        except Error as err:
+            _LOG.debug("disabling CPU information cache, failed to read boot ID%s:\n%s",
+                       self._pman.hostmsg, err.indent(2))
+            self._cachedir = None
+            return False
+
+        path = self._cachedir / _DISK_CACHE_FNAME
+        try:
+            with open(path, "r", encoding="utf-8") as fobj:
+                data = json.load(fobj)
+        except (OSError, ValueError) as err:
+            _LOG.debug("failed to load CPU information cache '%s':\n%s", path, Error(err).indent(2))
+            return False
+
+        key = self._get_disk_cache_key()
+        if data.get("version") != _DISK_CACHE_VERSION or data.get("key") != key:
+            _LOG.debug("CPU information cache '%s' is stale", path)
+            return False
+
+        try:
+            info = self._info_from_disk_cache(data["info"])
+            all_cpus = set(data["all_cpus"])
+            topology = data["topology"]
+            tcols = {lvl : array("i", topology["columns"][lvl]) for lvl in topology["columns"]}
+            tperms = {order : array("i", topology["orders"][order]) for order in topology["orders"]}
+            levels = set(topology["levels"])
+            tsize = topology["size"]
+        except (KeyError, TypeError, ValueError, OverflowError, AttributeError) as err:
+            _LOG.debug("bad CPU information cache '%s':\n%s", path, Error(err).indent(2))
+            return False
+
+        self.info = info
+        self._all_cpus = all_cpus
+        self._tcols = tcols
+        self._tperms = tperms
+        self._tsize = tsize
+        self._initialized_levels = levels
+
+        self._disk_cache_info = data["info"]
+        self._disk_cache_state = (key, levels.copy())
+        return True
+
+    def _save_disk_cache(self):
+        """Save the general CPU information and topology to the on-disk cache."""
+
+        try:
+            if self._must_update_topology:
+                self._update_topology()
+            key = self._get_disk_cache_key()
+        except Error as err:
+            # The cache is just an optimization, so do not fail if, for example, the process
+            # manager was already closed.
+            _LOG.debug("failed to save CPU information cache%s:\n%s",
+                       self._pman.hostmsg, err.indent(2))
+            return
+
+        if self._disk_cache_state == (key, self._initialized_levels):
+            # The cache is up-to-date.
+            return
+
+        topology = {"levels" : sorted(self._initialized_levels),
+                    "size" : self._tsize,
+                    "columns" : {lvl : tcol.tolist() for lvl, tcol in self._tcols.items()},
+                    "orders" : {order : tperm.tolist() for order, tperm in self._tperms.items()}}
+        data = {"version" : _DISK_CACHE_VERSION,
+                "key" : key,
+                "info" : self._disk_cache_info,
+                "all_cpus" : sorted(self._get_all_cpus()),
+                "topology" : topology}
+
+        path = self._cachedir / _DISK_CACHE_FNAME
+        # Write to a temporary file first and then rename it, so that concurrent 'pepc' processes
+        # never see a partially written cache file.
+        tmppath = self._cachedir / f"{_DISK_CACHE_FNAME}.{os.getpid()}"
+        try:
+            self._cachedir.mkdir(parents=True, exist_ok=True)
+            with open(tmppath, "w", encoding="utf-8") as fobj:
+                json.dump(data, fobj)
+            os.replace(tmppath, path)
+        except OSError as err:
+            _LOG.debug("failed to save CPU information cache '%s':\n%s", path, Error(err).indent(2))
+            with suppress(OSError):
+                os.unlink(tmppath)
+            return
+
+        self._disk_cache_state = (key, self._initialized_levels.copy())
+
+    def __init__(self, pman=None, cachedir=None):
         """
         The class constructor. The arguments are as follows.
           * pman - the process manager object that defines the target host.
+          * cachedir - path to the directory to cache the general CPU information and topology of
+                       the target host in. The cache makes creating new objects a lot faster. It is
+                       automatically invalidated on reboot and on CPU hotplug. By default, the
+                       cache is not used.
         """
 
         self._pman = pman
         self._close_pman = pman is None
-
-        # The topology dictionary. See 'get_topology()' for more information.
-        self._topology = {}
+        self._cachedir = None
+        if cachedir:
+            self._cachedir = Path(cachedir)
+
+        # The topology table. It is stored in columns, one column per level. A column is an array
+        # of level numbers indexed by CPU number, offline CPUs and uninitialized levels have number
+        # '-1'. See 'get_topology()' for more information.
+        self._tcols = {}
+        # Count of rows in the topology table (the maximum CPU number plus one).
+        self._tsize = 0
+        # The topology table sort permutations: order name -> array of online CPU numbers sorted
+        # in this order.
+        self._tperms = {}
         # Stores all initialized topology levels.
         self._initialized_levels = set()
+        # The per-level siblings index, refer to '_get_siblings_index()'.
+        self._siblings = {}
         # This flag notifies '_get_topology()' that some CPUs have been offlined/onlined.
         self._must_update_topology = False
         # We are going to sort topology by level, this map specifies how each is sorted. Note, core
@@ -1144,21 +1561,40 @@ class CPUInfo(ClassHelpers.SimpleCloseContext):
 
         # The CPU topology sysfs directory path pattern.
         self._topology_sysfs_base = "/sys/devices/system/cpu/cpu%d/topology/"
+        # The shell glob patterns of sysfs files to read in one go when initializing a topology
+        # level on a remote host. Refer to '_bulk_read_files()'.
+        cpu_base = "/sys/devices/system/cpu/cpu[0-9]*"
+        self._bulk_read_patterns = {
+            "module" : [f"{cpu_base}/cache/index2/id", f"{cpu_base}/cache/index2/shared_cpu_list"],
+            "die"    : [f"{cpu_base}/topology/die_id", f"{cpu_base}/topology/die_cpus_list"],
+            "node"   : ["/sys/devices/system/node/online",
+                        "/sys/devices/system/node/node[0-9]*/cpulist"]}
 
         # Set of online and offline CPUs.
         self._all_cpus = None
         # Set of online CPUs.
         self._cpus = None
+        # The parsed '/proc/cpuinfo' contents, refer to '_get_proc_cpuinfo()'.
+        self._proc_cpuinfo = None
 
         # General CPU information.
         self.info = None
         # A short CPU description string.
         self.cpudescr = None
 
+        # The on-disk cache: the target host boot ID, the general CPU information in the on-disk
+        # cache format, and the '(key, levels)' tuple describing the state of the cache file.
+        self._boot_id = None
+        self._disk_cache_info = None
+        self._disk_cache_state = None
+
         if not self._pman:
             self._pman = LocalProcessManager.LocalProcessManager()
 
-        self.info = self._get_cpu_info()
+        if not self._load_disk_cache():
+            self.info = self._get_cpu_info()
+            if self._cachedir:
+                self._disk_cache_info = self._info_to_disk_cache()
 
         if "Genuine Intel" in self.info["modelname"]:
             modelname = _CPU_DESCR.get(self.info["model"], self.info["modelname"])
@@ -1169,4 +1605,8 @@ class CPUInfo(ClassHelpers.SimpleCloseContext):
 
     def close(self):
         """Uninitialize the class object."""
+
+        if getattr(self, "_cachedir", None) and getattr(self, "_pman", None):
+            self._save_disk_cache()
+
         ClassHelpers.close(self, close_attrs=("_pman",))
@@ -60,8 +60,7 @@ class CPUOnline(ClassHelpers.SimpleCloseContext):
     def _get_online(self, path):
         """Read the 'online' sysfs file at 'path'."""
 
-        with self._pman.open(path, "r") as fobj:
-            state = fobj.read().strip()
+        state = self._pman.read_small(path).strip()
         if state in ("0", "1"):
             return state
         raise Error(f"unexpected value '{state}' in '{path}'{self._pman.hostmsg}")
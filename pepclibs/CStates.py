@@ -617,6 +617,30 @@ class CStates(_PCStatesBase.PCStatesBase):
             _LOG.debug("can't read value of property '%s', path '%s' missing", prop["name"], path)
             return None
 
+    def _prefetch(self, pnames, cpus):
+        """Refer to '_prefetch() in '_PropsClassBase' class."""
+
+        if not self._enable_cache:
+            return
+
+        msr_features = {"pkg_cstate_limit": (self._get_pcstatectl, ("pkg_cstate_limit", "locked"))}
+        for pname in pnames:
+            if pname in PowerCtl.FEATURES:
+                msr_features[pname] = (self._get_powerctl, (pname,))
+            elif pname in PCStateConfigCtl.FEATURES:
+                msr_features[pname] = (self._get_pcstatectl, (pname,))
+
+        self._prefetch_msrs(pnames, cpus, msr_features)
+
+        def _get_path(pname, prop, cpu): # pylint: disable=unused-argument
+            """Return path to the sysfs file of property 'prop'."""
+
+            if "fname" not in prop or prop["mechanisms"][0] != "sysfs":
+                return None
+            return self._sysfs_cpuidle / prop["fname"]
+
+        self._prefetch_sysfs(pnames, cpus, _get_path)
+
     def _get_cpu_prop_value(self, pname, cpu, prop=None):
         """"Returns property value for 'pname' in 'prop' for CPU 'cpu'."""
 
@@ -659,8 +683,7 @@ class CStates(_PCStatesBase.PCStatesBase):
         # Removing 'cpus' from the cache will make sure the following '_pcache.is_cached()' returns
         # 'False' for every CPU number that was not yet modified by the scope-aware '_pcache.add()'
         # method.
-        for cpu in cpus:
-            self._pcache.remove(pname, cpu)
+        self._pcache.remove_many(pname, cpus)
 
         prop = self._props[pname]
 
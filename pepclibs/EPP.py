@@ -13,7 +13,7 @@ This module provides a capability of reading and changing EPP (Energy Performanc
 Intel CPUs.
 """
 
-from pepclibs.helperlibs.Exceptions import Error, ErrorNotFound, ErrorNotSupported
+from pepclibs.helperlibs.Exceptions import Error, ErrorNotSupported
 from pepclibs.helperlibs import LocalProcessManager, Trivial, ClassHelpers
 from pepclibs import CPUInfo, _PropsCache
 
@@ -71,9 +71,8 @@ class EPP(ClassHelpers.SimpleCloseContext):
 
         if not self._epp_policies:
             try:
-                with self._pman.open(self._sysfs_epp_policies_path % cpu, "r") as fobj:
-                    line = fobj.read().strip()
-
+                path = self._sysfs_epp_policies_path % cpu
+                line = self._pman.read_small(path).strip()
                 self._epp_policies = Trivial.split_csv_line(line, sep=" ")
             except Error:
                 self._epp_policies = None
@@ -182,11 +181,9 @@ class EPP(ClassHelpers.SimpleCloseContext):
         if self._pcache.is_cached("epp", cpu):
             return self._pcache.get("epp", cpu)
 
-        try:
-            with self._pman.open(self._sysfs_epp_path % cpu, "r") as fobj:
-                epp = fobj.read().strip()
-        except ErrorNotFound:
-            epp = None
+        epp = self._pman.read_small(self._sysfs_epp_path % cpu, must_exist=False)
+        if epp is not None:
+            epp = epp.strip()
 
         return self._pcache.add("epp", cpu, epp)
 
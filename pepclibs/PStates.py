@@ -18,12 +18,31 @@ import contextlib
 from pathlib import Path
 from pepclibs import _PropsCache
 from pepclibs import _PCStatesBase
-from pepclibs.helperlibs import Trivial
+from pepclibs.helperlibs import Trivial, BatchIO
 from pepclibs.helperlibs import KernelModule, FSHelpers, Human, ClassHelpers
 from pepclibs.helperlibs.Exceptions import Error, ErrorNotFound, ErrorNotSupported
 
 _LOG = logging.getLogger()
 
+# How long to wait for the written CPU or uncore frequency sysfs file values to be read back, and
+# the polling interval, in seconds.
+_FREQ_VERIFY_TIMEOUT = 0.3
+_FREQ_VERIFY_INTERVAL = 0.1
+
+# The special CPU frequency values, and the corresponding CPU frequency capabilities (see
+# 'PStates._get_freq_cap()').
+_FREQ_ALIASES = {
+    "min": "min_freq_limit",
+    "max": "max_freq_limit",
+    "base": "base_freq",
+    "hfm": "base_freq",
+    "P1": "base_freq",
+    "eff": "Pn",
+    "lfm": "Pn",
+    "Pn": "Pn",
+    "Pm": "Pm",
+}
+
 # This dictionary describes the CPU properties this module supports.
 #
 # While this dictionary is user-visible and can be used, it is not recommended, because it is not
@@ -346,7 +365,7 @@ class PStates(_PCStatesBase.PCStatesBase):
                                                         msr=msr)
         return self._trl
 
-    def _get_bclk(self, cpu):
+    def _read_bclk(self, cpu):
         """Read bus clock speed from 'MSR_FSB_FREQ' and return it."""
 
         try:
@@ -411,7 +430,7 @@ class PStates(_PCStatesBase.PCStatesBase):
         self._uncore_freq_supported = self.__is_uncore_freq_supported()
         return self._uncore_freq_supported
 
-    def _get_base_freq(self, cpu):
+    def _read_base_freq(self, cpu):
         """Read base frequency from 'MSR_PLATFORM_INFO' and return it."""
 
         try:
@@ -426,7 +445,7 @@ class PStates(_PCStatesBase.PCStatesBase):
 
         return int(ratio * bclk * 1000 * 1000)
 
-    def _get_max_eff_freq(self, cpu):
+    def _read_max_eff_freq(self, cpu):
         """Read max. efficiency frequency from 'MSR_PLATFORM_INFO' and return it."""
 
         try:
@@ -441,7 +460,7 @@ class PStates(_PCStatesBase.PCStatesBase):
 
         return int(ratio * bclk * 1000 * 1000)
 
-    def _get_min_oper_freq(self, cpu):
+    def _read_min_oper_freq(self, cpu):
         """Read the minimum operating frequency from 'MSR_PLATFORM_INFO' and return it."""
 
         try:
@@ -462,7 +481,7 @@ class PStates(_PCStatesBase.PCStatesBase):
 
         return int(ratio * bclk * 1000 * 1000)
 
-    def _get_max_turbo_freq(self, cpu):
+    def _read_max_turbo_freq(self, cpu):
         """
         Read and return the maximum turbo frequency for CPU 'cpu' from 'MSR_TURBO_RATIO_LIMIT'.
         """
@@ -492,6 +511,58 @@ class PStates(_PCStatesBase.PCStatesBase):
 
         return int(ratio * bclk * 1000 * 1000)
 
+    def _get_freq_cap(self, name, cpu):
+        """
+        Return CPU frequency capability 'name' for CPU 'cpu'. The capabilities are as follows.
+          * bclk - bus clock speed in MHz.
+          * P1 - base frequency from 'MSR_PLATFORM_INFO'.
+          * Pn - max. efficiency frequency from 'MSR_PLATFORM_INFO'.
+          * Pm - min. operating frequency from 'MSR_PLATFORM_INFO'.
+          * max_turbo - max. 1-core turbo frequency from 'MSR_TURBO_RATIO_LIMIT'.
+          * base_freq, min_freq_limit, max_freq_limit - the same as the properties of the same name.
+
+        The frequencies are in Hz, and unsupported capabilities have the 'None' value.
+
+        The capabilities read from MSRs are the same for all CPUs of a package, so they are read
+        once per package and kept in the capabilities table. The other capabilities come from the
+        CPU frequency policy sysfs files, which may differ between CPU types on hybrid platforms,
+        so they are served from the properties cache instead, which caches them per policy.
+        """
+
+        if name in ("base_freq", "min_freq_limit", "max_freq_limit"):
+            return self._get_cpu_prop_value(name, cpu)
+
+        pkg = self._cpuinfo.get_cpu_levels(cpu, levels=("package",))["package"]
+        caps = self._freq_caps.setdefault(pkg, {})
+        if name in caps:
+            return caps[name]
+
+        val = self._freq_cap_readers[name](cpu)
+        if self._enable_cache:
+            caps[name] = val
+
+        return val
+
+    def _get_bclk(self, cpu):
+        """Return bus clock speed for CPU 'cpu'."""
+        return self._get_freq_cap("bclk", cpu)
+
+    def _get_base_freq(self, cpu):
+        """Return base frequency for CPU 'cpu' from 'MSR_PLATFORM_INFO'."""
+        return self._get_freq_cap("P1", cpu)
+
+    def _get_max_eff_freq(self, cpu):
+        """Return max. efficiency frequency for CPU 'cpu'."""
+        return self._get_freq_cap("Pn", cpu)
+
+    def _get_min_oper_freq(self, cpu):
+        """Return the minimum operating frequency for CPU 'cpu'."""
+        return self._get_freq_cap("Pm", cpu)
+
+    def _get_max_turbo_freq(self, cpu):
+        """Return the maximum turbo frequency for CPU 'cpu'."""
+        return self._get_freq_cap("max_turbo", cpu)
+
     def _read_int(self, path):
         """Read an integer from file 'path' via the process manager."""
 
@@ -546,6 +617,123 @@ class PStates(_PCStatesBase.PCStatesBase):
 
         return "on" if enabled else "off"
 
+    def _read_policies(self):
+        """
+        Read the 'related_cpus' files of all the CPU frequency policies and return the
+        '{path: contents}' dictionary.
+        """
+
+        policies_dir = self._sysfs_base / "cpufreq"
+
+        if self._pman.is_remote:
+            # Read all the files with a single command in order to avoid extra network round trips.
+            try:
+                data = BatchIO.grep_files([policies_dir / "policy[0-9]*" / "related_cpus"],
+                                          pman=self._pman)
+                if data:
+                    return data
+            except Error as err:
+                _LOG.debug("failed to bulk-read CPU frequency policies%s:\n%s",
+                           self._pman.hostmsg, err.indent(2))
+
+        paths = []
+        for name, path, _ in self._pman.lsdir(policies_dir, must_exist=False):
+            if name.startswith("policy") and Trivial.is_int(name[len("policy"):]):
+                paths.append(path / "related_cpus")
+
+        return self._pman.read_many(paths, must_exist=False)
+
+    def _discover_policies(self):
+        """
+        Discover which CPUs share CPU frequency policies. Every policy is represented by a
+        'policy<N>' sysfs directory, where 'N' is the number of the first CPU of the policy, and the
+        'related_cpus' file lists all CPUs of the policy. Note, the policy directory stays when CPU
+        'N' goes offline, so the policy directories are enumerated instead of being derived from the
+        online CPU numbers.
+        """
+
+        online_cpus = set(self._cpuinfo.get_cpus())
+
+        try:
+            data = self._read_policies()
+        except Error as err:
+            _LOG.debug("failed to read CPU frequency policies%s:\n%s",
+                       self._pman.hostmsg, err.indent(2))
+            data = {}
+
+        self._cpu2policy = {}
+        self._policy2cpus = {}
+
+        for path, related_cpus in data.items():
+            if not related_cpus:
+                continue
+
+            related_cpus = related_cpus.split()
+            if not all(Trivial.is_int(related_cpu) for related_cpu in related_cpus):
+                _LOG.debug("bad contents of '%s'%s: %s", path, self._pman.hostmsg, related_cpus)
+                continue
+
+            # Offline CPUs are listed in 'related_cpus' too, skip them.
+            members = [int(related_cpu) for related_cpu in related_cpus]
+            members = tuple(member for member in members if member in online_cpus)
+            if not members:
+                continue
+
+            policy = int(Path(path).parent.name[len("policy"):])
+            self._policy2cpus[policy] = members
+            for member in members:
+                self._cpu2policy[member] = policy
+
+    def _get_cpu_policy(self, cpu):
+        """Return number of the CPU frequency policy ('N' in 'policy<N>') CPU 'cpu' belongs to."""
+
+        if self._cpu2policy is None:
+            self._discover_policies()
+
+        # Assume the CPU has its own policy if policies discovery did not find it.
+        return self._cpu2policy.get(cpu, cpu)
+
+    def _get_policy_cpus(self, cpu):
+        """Return the tuple of online CPUs sharing the CPU frequency policy with CPU 'cpu'."""
+
+        policy = self._get_cpu_policy(cpu)
+        return self._policy2cpus.get(policy, (cpu,))
+
+    def _dedup_cpus_by_policy(self, cpus):
+        """
+        Return the list of CPUs in 'cpus' excluding CPUs which share the CPU frequency policy with
+        a preceding CPU in 'cpus'.
+        """
+
+        policies = set()
+        result = []
+        for cpu in cpus:
+            policy = self._get_cpu_policy(cpu)
+            if policy not in policies:
+                policies.add(policy)
+                result.append(cpu)
+
+        return result
+
+    def _is_policy_prop(self, prop):
+        """
+        Return 'True' if property 'prop' is backed by a sysfs file of the CPU frequency policy
+        directory, which is shared by all the CPUs of the policy.
+        """
+
+        return "fname" in prop and prop["sname"] == "CPU" and not _is_uncore_prop(prop)
+
+    def _pcache_add(self, pname, prop, cpu, val):
+        """
+        Add value 'val' of property 'pname' for CPU 'cpu' to the cache. Values of properties backed
+        by a CPU frequency policy sysfs file are cached for all the CPUs of the policy.
+        """
+
+        if self._is_policy_prop(prop):
+            self._pcache.add_many(pname, self._get_policy_cpus(cpu), val, sname="CPU")
+        else:
+            self._pcache.add(pname, cpu, val, sname=prop["sname"])
+
     def _get_sysfs_path(self, prop, cpu):
         """
         Construct and return path to the sysfs file corresponding to property 'prop' and CPU 'cpu'.
@@ -557,7 +745,8 @@ class PStates(_PCStatesBase.PCStatesBase):
             die = levels["die"]
             return self._sysfs_base_uncore / f"package_{pkg:02d}_die_{die:02d}" / prop["fname"]
 
-        return self._sysfs_base / "cpufreq" / f"policy{cpu}" / prop["fname"]
+        policy = self._get_cpu_policy(cpu)
+        return self._sysfs_base / "cpufreq" / f"policy{policy}" / prop["fname"]
 
     def _get_cpu_prop_value_sysfs(self, prop, cpu):
         """
@@ -591,7 +780,8 @@ class PStates(_PCStatesBase.PCStatesBase):
         """Returns the CPU frequency driver."""
 
         prop = self._props["driver"]
-        path = self._sysfs_base / "cpufreq" / f"policy{cpu}" / "scaling_driver"
+        policy = self._get_cpu_policy(cpu)
+        path = self._sysfs_base / "cpufreq" / f"policy{policy}" / "scaling_driver"
 
         try:
             driver = self._read_prop_value_from_sysfs(prop, path)
@@ -649,6 +839,39 @@ class PStates(_PCStatesBase.PCStatesBase):
         freq = perf * 100000000
         return freq
 
+    def _prefetch(self, pnames, cpus):
+        """Refer to '_prefetch() in '_PropsClassBase' class."""
+
+        if not self._enable_cache:
+            return
+
+        msr_features = {
+            "max_eff_freq": (self._get_platinfo, ("max_eff_ratio",)),
+            "min_oper_freq": (self._get_platinfo, ("min_oper_ratio",)),
+            "max_turbo_freq": (self._get_trl, ("max_1c_turbo_ratio", "max_g0_turbo_ratio")),
+            "bus_clock": (self._get_fsbfreq, ("fsb",)),
+            "min_freq_hw": (self._get_hwpreq, ("min_perf", "min_perf_valid", "pkg_control")),
+            "max_freq_hw": (self._get_hwpreq, ("max_perf", "max_perf_valid", "pkg_control")),
+            "epp_hw": (self._get_hwpreq, ("epp", "epp_valid", "pkg_control")),
+            "hwp": (self._get_pmenable, ("hwp",)),
+        }
+
+        # The frequencies read from MSRs are calculated using the bus clock speed.
+        if "bus_clock" not in pnames and \
+           any(pname in pnames for pname in ("max_eff_freq", "min_oper_freq", "max_turbo_freq")):
+            pnames = list(pnames) + ["bus_clock"]
+
+        self._prefetch_msrs(pnames, cpus, msr_features)
+
+        def _get_path(pname, prop, cpu): # pylint: disable=unused-argument
+            """Return path to the sysfs file of property 'prop' for CPU 'cpu'."""
+
+            if "fname" not in prop or _is_uncore_prop(prop):
+                return None
+            return self._get_sysfs_path(prop, cpu)
+
+        self._prefetch_sysfs(pnames, cpus, _get_path)
+
     def _get_cpu_prop_value(self, pname, cpu, prop=None):
         """Returns property value for 'pname' in 'prop' for CPU 'cpu'."""
 
@@ -693,7 +916,7 @@ class PStates(_PCStatesBase.PCStatesBase):
         else:
             raise Error(f"BUG: unsupported property '{pname}'")
 
-        self._pcache.add(pname, cpu, val, sname=prop["sname"])
+        self._pcache_add(pname, prop, cpu, val)
         return val
 
     def _set_turbo(self, cpu, enable):
@@ -755,8 +978,9 @@ class PStates(_PCStatesBase.PCStatesBase):
 
     def _handle_write_and_read_freq_mismatch(self, pname, prop, freq, read_freq, cpu, path):
         """
-        This is a helper function fo '_write_freq_prop_value_to_sysfs()' and it is called when there
-        is a mismatch between what was written to a frequency sysfs file and what was read back.
+        This is a helper function fo '_write_freq_prop_values_to_sysfs()' and it is called when
+        there is a mismatch between what was written to a frequency sysfs file and what was read
+        back.
         """
 
         raise_error = True
@@ -772,7 +996,7 @@ class PStates(_PCStatesBase.PCStatesBase):
             if bclk and freq % (bclk * 1000000):
                 msg += f"\nHint: consider using frequency value aligned to {bclk}MHz."
 
-            base_freq = self._get_cpu_prop_value("base_freq", cpu)
+            base_freq = self._get_freq_cap("base_freq", cpu)
             turbo = self._get_cpu_turbo(cpu)
 
             if base_freq and freq > base_freq and turbo == "off":
@@ -785,7 +1009,7 @@ class PStates(_PCStatesBase.PCStatesBase):
                 # to any value above base frequency. At the moment we do not support reqding base
                 # frequency for AMD systems, so we only support the 'freq == max_freq_limit' case.
                 # But it should really be 'if freq > base_freq'.
-                max_freq_limit = self._get_cpu_prop_value("max_freq_limit", cpu)
+                max_freq_limit = self._get_freq_cap("max_freq_limit", cpu)
                 driver = self._get_cpu_prop_value("driver", cpu)
                 if freq == max_freq_limit and driver == "acpi-cpufreq":
                     msg += "\nThis is expected 'acpi-cpufreq' driver behavior on AMD systems."
@@ -796,39 +1020,91 @@ class PStates(_PCStatesBase.PCStatesBase):
 
         _LOG.debug(msg)
 
-    def _write_freq_prop_value_to_sysfs(self, pname, freq, cpu):
+    def _read_freqs_from_sysfs(self, items):
         """
-        Write frequency value 'freq' of a CPU frequency property 'pname' to the corresponding sysfs
-        file.
+        Read frequency sysfs files for every '(prop, path)' tuple in 'items' and return the list of
+        frequencies in Hz. Read all the files in one batch in case of a remote host.
         """
 
-        prop = self._props[pname]
-        path = self._get_sysfs_path(prop, cpu)
+        data = {}
+        if self._pman.is_remote and len(items) > 1:
+            try:
+                data = BatchIO.read_files([path for _, path in items], pman=self._pman)
+            except Error as err:
+                _LOG.debug("failed to read frequency sysfs files in one batch%s:\n%s",
+                           self._pman.hostmsg, err.indent(2))
+
+        freqs = []
+        for prop, path in items:
+            if data.get(path) is not None:
+                freqs.append(self._parse_prop_value(prop, path, data[path]))
+            else:
+                freqs.append(self._read_prop_value_from_sysfs(prop, path))
 
-        try:
-            with self._pman.open(path, "r+") as fobj:
-                # Sysfs files use kHz.
-                fobj.write(str(freq // 1000))
-        except Error as err:
-            raise Error(f"failed to set '{prop['name']}'{self._pman.hostmsg}:\n{err.indent(2)}") \
-                        from err
+        return freqs
+
+    def _write_freq_prop_values_to_sysfs(self, writes):
+        """
+        Write frequency values to the sysfs files of CPU frequency properties and verify them. The
+        'writes' argument is a list of '(pname, freq, cpu)' tuples, where 'freq' is the frequency
+        value to write to the sysfs file of property 'pname' for CPU 'cpu'.
+
+        Write all the values first, and then verify them in one polling loop with a shared deadline,
+        re-reading only the sysfs files which do not have the written value yet.
+        """
 
-        count = 3
-        while count > 0:
-            # Returns frequency in Hz.
-            read_freq = self._read_prop_value_from_sysfs(prop, path)
+        # The '(pname, prop, freq, cpu, path)' tuples to verify.
+        pending = []
+        # The paths written so far (e.g., uncore frequency files are shared by all CPUs of a die).
+        written = set()
 
-            if freq == read_freq:
-                self._pcache.add(pname, cpu, freq, sname=prop["sname"])
+        for pname, freq, cpu in writes:
+            prop = self._props[pname]
+            path = self._get_sysfs_path(prop, cpu)
+            if path in written:
+                continue
+
+            try:
+                with self._pman.open(path, "r+") as fobj:
+                    # Sysfs files use kHz.
+                    fobj.write(str(freq // 1000))
+            except Error as err:
+                raise Error(f"failed to set '{prop['name']}'{self._pman.hostmsg}:\n"
+                            f"{err.indent(2)}") from err
+
+            written.add(path)
+            pending.append((pname, prop, freq, cpu, path))
+
+        deadline = None
+        while pending:
+            # Returns frequencies in Hz.
+            read_freqs = self._read_freqs_from_sysfs([(item[1], item[4]) for item in pending])
+
+            mismatches = []
+            for item, read_freq in zip(pending, read_freqs):
+                pname, prop, freq, cpu, _ = item
+                if freq == read_freq:
+                    self._pcache_add(pname, prop, cpu, freq)
+                else:
+                    mismatches.append((item, read_freq))
+
+            if not mismatches:
                 return
 
             # Sometimes the update does not happen immediately. For example, we observed this on
             # systems with frequency files when HWP was enabled, for example. Wait a little bit and
-            # try again.
-            time.sleep(0.1)
-            count -= 1
+            # try again. Start counting the deadline after the first read, so that the time of
+            # reading many files from a remote host does not count.
+            if deadline is None:
+                deadline = time.time() + _FREQ_VERIFY_TIMEOUT
+            elif time.time() >= deadline:
+                break
+
+            time.sleep(_FREQ_VERIFY_INTERVAL)
+            pending = [item for item, _ in mismatches]
 
-        self._handle_write_and_read_freq_mismatch(pname, prop, freq, read_freq, cpu, path)
+        for (pname, prop, freq, cpu, path), read_freq in mismatches:
+            self._handle_write_and_read_freq_mismatch(pname, prop, freq, read_freq, cpu, path)
 
     def _parse_freq(self, pname, val, cpu, uncore=False):
         """Turn a user-provided CPU or uncore frequency property value to hertz."""
@@ -840,23 +1116,14 @@ class PStates(_PCStatesBase.PCStatesBase):
                 freq = self._get_cpu_prop_value("max_uncore_freq_limit", cpu)
             else:
                 freq = Human.parse_freq(val, name=Human.uncapitalize(self._props[pname]["name"]))
+        elif val in _FREQ_ALIASES:
+            freq = self._get_freq_cap(_FREQ_ALIASES[val], cpu)
+            if not freq and _FREQ_ALIASES[val] == "Pn":
+                # Max. efficiency frequency may not be supported by the platform. Fall back to the
+                # minimum frequency in this case.
+                freq = self._get_freq_cap("min_freq_limit", cpu)
         else:
-            if val == "min":
-                freq = self._get_cpu_prop_value("min_freq_limit", cpu)
-            elif val == "max":
-                freq = self._get_cpu_prop_value("max_freq_limit", cpu)
-            elif val in {"base", "hfm", "P1"}:
-                freq = self._get_cpu_prop_value("base_freq", cpu)
-            elif val in {"eff", "lfm", "Pn"}:
-                freq = self._get_cpu_prop_value("max_eff_freq", cpu)
-                if not freq:
-                    # Max. efficiency frequency may not be supported by the platform. Fall back to
-                    # the minimum frequency in this case.
-                    freq = self._get_cpu_prop_value("min_freq_limit", cpu)
-            elif val == "Pm":
-                freq = self._get_cpu_prop_value("min_oper_freq", cpu)
-            else:
-                freq = Human.parse_freq(val, name=Human.uncapitalize(self._props[pname]["name"]))
+            freq = Human.parse_freq(val, name=Human.uncapitalize(self._props[pname]["name"]))
 
         if not freq:
             raise ErrorNotSupported(f"'{val}' is not supported{self._pman.hostmsg}")
@@ -881,6 +1148,9 @@ class PStates(_PCStatesBase.PCStatesBase):
 
         Otherwise Cur. Max will be smaller that Cur. Min:
          ----------------- Cur. Max -------- Cur. Min -- New Max ----------> (Frequency)
+
+        The CPU and uncore frequency sysfs files are written after all CPUs have been validated, in
+        batches (see '_write_freq_prop_values_to_sysfs()').
         """
 
         if freq_type == "freq":
@@ -889,13 +1159,14 @@ class PStates(_PCStatesBase.PCStatesBase):
             max_freq_key = "max_freq"
             min_freq_limit_key = "min_freq_limit"
             max_freq_limit_key = "max_freq_limit"
-            write_func = self._write_freq_prop_value_to_sysfs
+            write_func = None
         elif freq_type == "freq_hw":
             uncore = False
             min_freq_key = "min_freq_hw"
             max_freq_key = "max_freq_hw"
-            min_freq_limit_key = "min_oper_freq"
-            max_freq_limit_key = "max_turbo_freq"
+            # The HWP frequency limits.
+            min_freq_limit_key = "Pm"
+            max_freq_limit_key = "max_turbo"
             write_func = self._set_cpu_freq_hw
         else:
             uncore = True
@@ -903,9 +1174,22 @@ class PStates(_PCStatesBase.PCStatesBase):
             max_freq_key = "max_uncore_freq"
             min_freq_limit_key = "min_uncore_freq_limit"
             max_freq_limit_key = "max_uncore_freq_limit"
-            write_func = self._write_freq_prop_value_to_sysfs
+            write_func = None
+
+        if freq_type == "freq":
+            # CPUs sharing a CPU frequency policy share the sysfs files, so handle only one CPU per
+            # policy.
+            cpus = self._dedup_cpus_by_policy(cpus)
+
+        # The sysfs frequency writes are done in batches: the first write for every CPU goes to the
+        # first batch, the second write goes to the second batch. This way the min. and max.
+        # frequency ordering constraints are respected for every CPU. Every batch is a list of
+        # '(pname, freq, cpu)' tuples.
+        batches = ([], [])
 
         for cpu in cpus:
+            # The '(pname, freq)' writes to do for this CPU, in order.
+            cpu_writes = []
             new_min_freq = None
             new_max_freq = None
 
@@ -922,8 +1206,12 @@ class PStates(_PCStatesBase.PCStatesBase):
                 raise ErrorNotSupported(f"CPU {cpu} does not support min. and {name}"
                                         f"{self._pman.hostmsg}")
 
-            min_limit = self._get_cpu_prop_value(min_freq_limit_key, cpu)
-            max_limit = self._get_cpu_prop_value(max_freq_limit_key, cpu)
+            if uncore:
+                min_limit = self._get_cpu_prop_value(min_freq_limit_key, cpu)
+                max_limit = self._get_cpu_prop_value(max_freq_limit_key, cpu)
+            else:
+                min_limit = self._get_freq_cap(min_freq_limit_key, cpu)
+                max_limit = self._get_freq_cap(max_freq_limit_key, cpu)
 
             what = self._get_num_str(self._props[min_freq_key], cpu)
             for pname, val in ((min_freq_key, new_min_freq), (max_freq_key, new_max_freq)):
@@ -948,11 +1236,11 @@ class PStates(_PCStatesBase.PCStatesBase):
                                 f"{new_max_freq} for {what}: minimum can't be greater than maximum")
                 if new_min_freq != cur_min_freq or new_max_freq != cur_max_freq:
                     if cur_max_freq < new_min_freq:
-                        write_func(max_freq_key, new_max_freq, cpu)
-                        write_func(min_freq_key, new_min_freq, cpu)
+                        cpu_writes.append((max_freq_key, new_max_freq))
+                        cpu_writes.append((min_freq_key, new_min_freq))
                     else:
-                        write_func(min_freq_key, new_min_freq, cpu)
-                        write_func(max_freq_key, new_max_freq, cpu)
+                        cpu_writes.append((min_freq_key, new_min_freq))
+                        cpu_writes.append((max_freq_key, new_max_freq))
             elif not new_max_freq:
                 if new_min_freq > cur_max_freq:
                     name = Human.uncapitalize(self._props[min_freq_key]["name"])
@@ -961,7 +1249,7 @@ class PStates(_PCStatesBase.PCStatesBase):
                     raise Error(f"can't set {name} of {what} to {new_min_freq} - it is higher than "
                                 f"currently configured maximum frequency of {cur_max_freq}")
                 if new_min_freq != cur_min_freq:
-                    write_func(min_freq_key, new_min_freq, cpu)
+                    cpu_writes.append((min_freq_key, new_min_freq))
             elif not new_min_freq:
                 if new_max_freq < cur_min_freq:
                     name = Human.uncapitalize(self._props[max_freq_key]["name"])
@@ -970,7 +1258,18 @@ class PStates(_PCStatesBase.PCStatesBase):
                     raise Error(f"can't set {name} of {what} to {new_max_freq} - it is lower than "
                                 f"currently configured minimum frequency of {cur_min_freq}")
                 if new_max_freq != cur_max_freq:
-                    write_func(max_freq_key, new_max_freq, cpu)
+                    cpu_writes.append((max_freq_key, new_max_freq))
+
+            if write_func:
+                for pname, freq in cpu_writes:
+                    write_func(pname, freq, cpu)
+            else:
+                for idx, (pname, freq) in enumerate(cpu_writes):
+                    batches[idx].append((pname, freq, cpu))
+
+        for batch in batches:
+            if batch:
+                self._write_freq_prop_values_to_sysfs(batch)
 
     def _set_intel_pstate_mode(self, cpu, mode):
         """Change mode of the CPU frequency driver 'intel_pstate'."""
@@ -1004,10 +1303,12 @@ class PStates(_PCStatesBase.PCStatesBase):
         # Removing 'cpus' from the cache will make sure the following '_pcache.is_cached()' returns
         # 'False' for every CPU number that was not yet modified by the scope-aware '_pcache.add()'
         # method.
-        for cpu in cpus:
-            self._pcache.remove(pname, cpu)
+        self._pcache.remove_many(pname, cpus)
 
         prop = self._props[pname]
+        if self._is_policy_prop(prop):
+            # CPUs sharing a CPU frequency policy share the sysfs files (e.g., the governor file).
+            cpus = self._dedup_cpus_by_policy(cpus)
 
         for cpu in cpus:
             if self._pcache.is_cached(pname, cpu):
@@ -1023,11 +1324,12 @@ class PStates(_PCStatesBase.PCStatesBase):
                 path = self._get_sysfs_path(prop, cpu)
                 self._write_prop_value_to_sysfs(prop, path, val)
 
-                # Note, below 'add()' call is scope-aware. It will cache 'val' not only for CPU
-                # number 'cpu', but also for all the 'sname' siblings. For example, if property
-                # scope name is "package", 'val' will be cached for all CPUs in the package that
-                # contains CPU number 'cpu'.
-                self._pcache.add(pname, cpu, val, sname=prop["sname"])
+                # Note, below call is scope-aware. It will cache 'val' not only for CPU number
+                # 'cpu', but also for all the 'sname' siblings. For example, if property scope name
+                # is "package", 'val' will be cached for all CPUs in the package that contains CPU
+                # number 'cpu'. Similarly, values of CPU frequency policy properties are cached for
+                # all CPUs of the policy.
+                self._pcache_add(pname, prop, cpu, val)
             else:
                 raise Error(f"BUG: unsupported property '{pname}'")
 
@@ -1131,6 +1433,22 @@ class PStates(_PCStatesBase.PCStatesBase):
         self._ufreq_drv = None
         self._unload_ufreq_drv = False
 
+        # The CPU number -> CPU frequency policy number map, and the policy number -> tuple of the
+        # policy CPUs map. Discovered on demand.
+        self._cpu2policy = None
+        self._policy2cpus = None
+
+        # The CPU frequency capabilities table: package number -> '{name: value}' dictionary (see
+        # '_get_freq_cap()'), and the capability name -> reader function map.
+        self._freq_caps = {}
+        self._freq_cap_readers = {
+            "bclk": self._read_bclk,
+            "P1": self._read_base_freq,
+            "Pn": self._read_max_eff_freq,
+            "Pm": self._read_min_oper_freq,
+            "max_turbo": self._read_max_turbo_freq,
+        }
+
         self._sysfs_base = Path("/sys/devices/system/cpu")
         self._sysfs_base_uncore = Path("/sys/devices/system/cpu/intel_uncore_frequency")
 
@@ -139,6 +139,21 @@ class Power(_PropsClassBase.PropsClassBase):
 
         return pname.replace("ppl", "limit")
 
+    def _prefetch(self, pnames, cpus):
+        """Refer to '_prefetch() in '_PropsClassBase' class."""
+
+        if not self._enable_cache:
+            return
+
+        msr_features = {}
+        for pname in pnames:
+            if pname.startswith("ppl"):
+                msr_features[pname] = (self._get_pplobj, (self._pname2fname(pname),))
+            else:
+                msr_features[pname] = (self._get_ppiobj, (pname,))
+
+        self._prefetch_msrs(pnames, cpus, msr_features)
+
     def _get_cpu_prop_value(self, pname, cpu, prop=None):
         """Returns property value for 'pname' in 'prop' for CPU 'cpu'."""
 
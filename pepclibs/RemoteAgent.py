@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+# vim: ts=4 sw=4 tw=100 et ai si
+#
+# Copyright (C) 2023 Intel Corporation
+# SPDX-License-Identifier: BSD-3-Clause
+#
+# Author: Artem Bityutskiy <artem.bityutskiy@linux.intel.com>
+
+"""
+This module implements the "remote agent" mode: instead of reading every sysfs file and MSR of a
+remote host over SSH, run 'pepclibs' on the remote host with its own python interpreter, and send
+only the compact results back.
+
+The agent is a python process started in a new SSH session. It talks to the local side using a
+simple line-based protocol over its standard input and output: every request and every response is
+a single JSON-encoded line. The agent does not require 'pepclibs' to be installed on the remote host:
+the local copy of 'pepclibs' is sent to the remote host on first use and is cached there in
+'$XDG_CACHE_HOME/pepc/agent/<digest>/' (or '$HOME/.cache/pepc/agent/<digest>/'), where 'digest' is
+the hash of the 'pepclibs' sources. Therefore, subsequent runs re-use the cached copy, as long as
+the local 'pepclibs' sources do not change.
+
+The agent currently supports the read-only "info" operations of the 'PStates', 'CStates' and
+'Power' classes. Use 'RemoteAgent.get_pobj()' to get an object which can be used instead of these
+classes objects for reading properties.
+"""
+
+import io
+import sys
+import json
+import base64
+import shlex
+import tarfile
+import hashlib
+import logging
+import traceback
+import contextlib
+from pathlib import Path
+from pepclibs import _PropsTable
+from pepclibs.helperlibs import ClassHelpers, LocalProcessManager
+from pepclibs.helperlibs import Exceptions
+from pepclibs.helperlibs.Exceptions import Error, ErrorTimeOut, ErrorNotSupported
+
+_LOG = logging.getLogger()
+
+# The classes that the agent provides access to.
+_CLASSES = ("PStates", "CStates", "Power")
+
+# The script which starts the agent on the remote host. It checks if the 'pepclibs' copy with the
+# digest given in the first argument is already cached on the remote host, and if it is not, prints
+# "payload" and reads the base64-encoded 'tar.gz' archive with 'pepclibs' from the standard input.
+# The second (optional) argument is the path to the cache directory.
+_BOOTSTRAP = r"""
+import os, sys, io, base64, shutil, tarfile, tempfile
+digest = sys.argv[1]
+basedir = sys.argv[2] if len(sys.argv) > 2 else ""
+if not basedir:
+    basedir = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    basedir = os.path.join(basedir, "pepc", "agent")
+libdir = os.path.join(basedir, digest)
+if not os.path.isdir(libdir):
+    print("payload", flush=True)
+    data = base64.b64decode(sys.stdin.readline())
+    os.makedirs(basedir, exist_ok=True)
+    tmpdir = tempfile.mkdtemp(dir=basedir, prefix=".tmp-")
+    kwargs = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as tar:
+        tar.extractall(tmpdir, **kwargs)
+    try:
+        os.rename(tmpdir, libdir)
+    except OSError:
+        shutil.rmtree(tmpdir)
+sys.path.insert(0, libdir)
+from pepclibs import RemoteAgent
+RemoteAgent.serve(sys.stdin, sys.stdout)
+"""
+
+def _group_by_value(pinfo_iter):
+    """
+    Consume the '(cpu, pinfo)' tuples yielded by 'pinfo_iter' and return a dictionary with the
+    following keys.
+      * cpus - list of all the CPU numbers in the order they were yielded.
+      * groups - list of '[pinfo, cpus]' pairs, where 'cpus' is the list of CPUs having the same
+                 'pinfo'.
+    Most CPUs usually have the same properties, so grouping makes the result a lot more compact.
+    """
+
+    cpus = []
+    groups = {}
+    for cpu, pinfo in pinfo_iter:
+        cpus.append(cpu)
+        # Serialize right away, because the yielded dictionaries may be re-used by the generator.
+        # Note, the keys order matters to the users, so it is preserved.
+        key = json.dumps(pinfo, default=str)
+        groups.setdefault(key, []).append(cpu)
+
+    return {"cpus": cpus, "groups": [[json.loads(key), gcpus] for key, gcpus in groups.items()]}
+
+class _LogForwarder(logging.Handler):
+    """
+    A logging handler for the agent side: send every log message to the standard error stream as a
+    JSON-encoded '[levelno, message]' line, so that the local side could log it.
+    """
+
+    def emit(self, record):
+        """Send log record 'record' to the local side."""
+
+        try:
+            line = json.dumps([record.levelno, record.getMessage()])
+            self._fobj.write(line + "\n")
+            self._fobj.flush()
+        except Exception: # pylint: disable=broad-except
+            self.handleError(record)
+
+    def __init__(self, fobj):
+        """The class constructor. The 'fobj' argument is the file object to send the messages to."""
+
+        super().__init__(level=logging.INFO)
+        self._fobj = fobj
+
+def serve(infobj, outfobj):
+    """
+    Run the agent: read requests from the 'infobj' file object and write responses to the 'outfobj'
+    file object. This function is executed on the remote host and returns when the local side sends
+    the "close" request or closes the connection.
+    """
+
+    _LOG.addHandler(_LogForwarder(sys.stderr))
+    _LOG.setLevel(logging.INFO)
+
+    # pylint: disable=import-outside-toplevel
+    from pepclibs import CPUInfo, PStates, CStates, Power
+
+    modules = {"PStates": PStates, "CStates": CStates, "Power": Power}
+
+    with contextlib.ExitStack() as stack:
+        pman = LocalProcessManager.LocalProcessManager()
+        stack.enter_context(pman)
+
+        cpuinfo = None
+        pobjs = {}
+
+        outfobj.write("ready\n")
+        outfobj.flush()
+
+        for line in infobj:
+            try:
+                req = json.loads(line)
+                op = req["op"]
+
+                if op == "close":
+                    break
+
+                if not cpuinfo:
+                    cpuinfo = CPUInfo.CPUInfo(pman=pman)
+                    stack.enter_context(cpuinfo)
+
+                if op == "init":
+                    if req.get("model") is not None:
+                        cpuinfo.info["model"] = req["model"]
+                    result = None
+                else:
+                    clsname = req["cls"]
+                    if clsname not in modules:
+                        raise Error(f"unsupported class '{clsname}'")
+                    if clsname not in pobjs:
+                        pobj = getattr(modules[clsname], clsname)(pman=pman, cpuinfo=cpuinfo)
+                        pobjs[clsname] = stack.enter_context(pobj)
+                    pobj = pobjs[clsname]
+
+                    if op == "props":
+                        result = pobj.props
+                    elif op == "get_props":
+                        result = _group_by_value(pobj.get_props(req["pnames"], cpus=req["cpus"]))
+                    elif op == "get_cstates_info":
+                        result = _group_by_value(pobj.get_cstates_info(csnames=req["csnames"],
+                                                                        cpus=req["cpus"]))
+                    else:
+                        raise Error(f"unknown operation '{op}'")
+
+                resp = {"result": result}
+            except Error as err:
+                resp = {"error": str(err), "errtype": type(err).__name__}
+            except Exception: # pylint: disable=broad-except
+                resp = {"error": traceback.format_exc(), "errtype": "Error"}
+
+            outfobj.write(json.dumps(resp, default=str) + "\n")
+            outfobj.flush()
+
+class _PropsProxy(ClassHelpers.SimpleCloseContext):
+    """
+    This class provides the read-only part of the 'PStates', 'CStates' or 'Power' class interface,
+    and it is backed by the remote agent. Objects of this class are created by
+    'RemoteAgent.get_pobj()'.
+    """
+
+    def _get_grouped(self, op, cpus, **kwargs):
+        """Send the 'op' request for CPUs in 'cpus' and yield the '(cpu, pinfo)' tuples."""
+
+        if cpus != "all":
+            cpus = [int(cpu) for cpu in cpus]
+
+        result = self._agent._request(op, cls=self._clsname, cpus=cpus, **kwargs)
+
+        cpu2pinfo = {}
+        for pinfo, gcpus in result["groups"]:
+            for cpu in gcpus:
+                cpu2pinfo[cpu] = pinfo
+
+        for cpu in result["cpus"]:
+            yield cpu, cpu2pinfo[cpu]
+
+    def get_props(self, pnames, cpus="all"):
+        """Same as 'get_props()' of the 'PStates', 'CStates' and 'Power' classes."""
+
+        if pnames != "all":
+            pnames = list(pnames)
+
+        yield from self._get_grouped("get_props", cpus, pnames=pnames)
+
+    def get_props_table(self, pnames, cpus="all"):
+        """Same as 'get_props_table()' of the 'PStates', 'CStates' and 'Power' classes."""
+        return _PropsTable.build_props_table(self.get_props(pnames, cpus=cpus))
+
+    def get_cstates_info(self, csnames="all", cpus="all"):
+        """Same as 'CStates.get_cstates_info()'."""
+
+        if self._clsname != "CStates":
+            raise ErrorNotSupported(f"'get_cstates_info()' is not supported by '{self._clsname}'")
+
+        if csnames != "all":
+            csnames = list(csnames)
+
+        yield from self._get_grouped("get_cstates_info", cpus, csnames=csnames)
+
+    def close(self):
+        """Uninitialize the class object."""
+        ClassHelpers.close(self, unref_attrs=("_agent",))
+
+    def __init__(self, agent, clsname):
+        """
+        The class constructor. The arguments are as follows.
+          * agent - the 'RemoteAgent' object.
+          * clsname - name of the class to provide the interface of (e.g., "PStates").
+        """
+
+        self._agent = agent
+        self._clsname = clsname
+
+        self.props = self._agent._request("props", cls=clsname)
+
+class RemoteAgent(ClassHelpers.SimpleCloseContext):
+    """
+    This class starts the 'pepclibs' agent on a remote host and provides the API for talking to it.
+    """
+
+    def _get_payload(self):
+        """
+        Build the 'tar.gz' archive with the 'pepclibs' sources. Return a '(digest, payload)' tuple,
+        where 'digest' is a hash of the sources and 'payload' is the base64-encoded archive.
+        """
+
+        srcdir = Path(__file__).parent
+        paths = sorted(path for path in srcdir.rglob("*.py") if "__pycache__" not in path.parts)
+
+        digest = hashlib.sha256()
+        data = io.BytesIO()
+        with tarfile.open(fileobj=data, mode="w:gz") as tar:
+            for path in paths:
+                arcname = str(Path(srcdir.name) / path.relative_to(srcdir))
+                digest.update(arcname.encode("utf-8") + b"\0")
+                digest.update(path.read_bytes() + b"\0")
+                tar.add(path, arcname=arcname)
+
+        return digest.hexdigest()[:16], base64.b64encode(data.getvalue())
+
+    def _write(self, data):
+        """Write string 'data' to the standard input of the agent."""
+
+        data = data.encode("utf-8")
+        if self._pman.is_remote:
+            self._proc.stdin.write(data)
+        else:
+            # The standard input of a local process is unbuffered, so the data may be written
+            # partially.
+            view = memoryview(data)
+            while view:
+                view = view[self._proc.stdin.write(view):]
+        self._proc.stdin.flush()
+
+    def _readline(self):
+        """Read a line from the standard output of the agent."""
+
+        while True:
+            stdout, stderr, exitcode = self._proc.wait(timeout=self._timeout, lines=(1, None),
+                                                       join=False)
+
+            for line in stderr:
+                try:
+                    levelno, msg = json.loads(line)
+                except (ValueError, TypeError):
+                    levelno, msg = logging.WARNING, line.rstrip()
+                _LOG.log(levelno, "%s", msg)
+
+            if stdout:
+                return stdout[0]
+
+            if exitcode is not None:
+                raise Error(f"the 'pepclibs' agent{self._pman.hostmsg} exited with status "
+                            f"{exitcode}")
+            if not stderr:
+                raise ErrorTimeOut(f"the 'pepclibs' agent{self._pman.hostmsg} did not respond "
+                                   f"for {self._proc.timeout} seconds")
+
+    def _request(self, op, **kwargs):
+        """Send request 'op' with arguments 'kwargs' to the agent and return the result."""
+
+        _LOG.debug("sending request '%s' to the 'pepclibs' agent%s", op, self._pman.hostmsg)
+
+        self._write(json.dumps({"op": op, **kwargs}) + "\n")
+        line = self._readline()
+
+        try:
+            resp = json.loads(line)
+        except ValueError:
+            raise Error(f"unexpected response from the 'pepclibs' agent{self._pman.hostmsg}:\n"
+                        f"{line}") from None
+
+        if "error" in resp:
+            errcls = getattr(Exceptions, resp.get("errtype", ""), Error)
+            if not isinstance(errcls, type) or not issubclass(errcls, Error):
+                errcls = Error
+            raise errcls(resp["error"])
+
+        return resp["result"]
+
+    def _start(self):
+        """Start the agent on the remote host and wait for it to become ready."""
+
+        digest, payload = self._get_payload()
+
+        cmd = f"{self._pman.get_python_path()} -u -c {shlex.quote(_BOOTSTRAP)} {digest}"
+        if self._agentdir:
+            cmd += f" {shlex.quote(str(self._agentdir))}"
+
+        _LOG.debug("starting the 'pepclibs' agent%s", self._pman.hostmsg)
+        self._proc = self._pman.run_async(cmd, intsh=False)
+
+        line = self._readline()
+        if line.strip() == "payload":
+            _LOG.debug("sending 'pepclibs' to%s (%d bytes)", self._pman.hostmsg, len(payload))
+            self._write(payload.decode("utf-8") + "\n")
+            line = self._readline()
+
+        if line.strip() != "ready":
+            raise Error(f"unexpected output of the 'pepclibs' agent{self._pman.hostmsg}:\n{line}")
+
+    def get_pobj(self, clsname):
+        """
+        Return an object for reading properties of class 'clsname' ("PStates", "CStates" or "Power")
+        via the agent. The object provides the 'props' attribute and the 'get_props()' method, same
+        as the 'clsname' class objects, and 'get_cstates_info()' in case of "CStates".
+        """
+
+        if clsname not in _CLASSES:
+            raise Error(f"unsupported class '{clsname}', use one of: {', '.join(_CLASSES)}")
+
+        return _PropsProxy(self, clsname)
+
+    def __init__(self, pman, model=None, agentdir=None, timeout=None):
+        """
+        The class constructor. The arguments are as follows.
+          * pman - the process manager object that defines the host to run the agent on.
+          * model - if provided, override the CPU model on the agent side (see
+                    'CPUInfo.info["model"]').
+          * agentdir - path to the directory for caching the 'pepclibs' copy on the target host.
+                       Default is '$XDG_CACHE_HOME/pepc/agent' (or '$HOME/.cache/pepc/agent').
+          * timeout - the maximum time in seconds to wait for the agent to respond.
+        """
+
+        self._pman = pman
+        self._agentdir = agentdir
+        self._timeout = timeout
+
+        # The agent process.
+        self._proc = None
+
+        self._start()
+        self._request("init", model=model)
+
+    def close(self):
+        """Uninitialize the class object."""
+
+        if getattr(self, "_proc", None):
+            with contextlib.suppress(Error, OSError):
+                self._write(json.dumps({"op": "close"}) + "\n")
+                self._proc.wait(timeout=5)
+
+        ClassHelpers.close(self, close_attrs=("_proc",), unref_attrs=("_pman",))
@@ -13,7 +13,7 @@ This module provides the base class for 'PState' and 'CState' classes.
 """
 
 import logging
-from pepclibs.helperlibs import Trivial
+from pepclibs.helperlibs import Trivial, BatchIO
 from pepclibs import _PropsClassBase
 from pepclibs.helperlibs.Exceptions import Error
 
@@ -34,10 +34,10 @@ class PCStatesBase(_PropsClassBase.PropsClassBase):
             governors = ", ".join(governors)
             raise Error(f"bad governor name '{name}', use one of: {governors}")
 
-    def _read_prop_value_from_sysfs(self, prop, path):
-        """Read property described by 'prop' from sysfs, and return its value."""
+    def _parse_prop_value(self, prop, path, val):
+        """Parse value 'val' of property described by 'prop', read from sysfs file 'path'."""
 
-        val = self._pman.read(path).strip()
+        val = val.strip()
 
         if prop["type"] == "int":
             if not Trivial.is_int(val):
@@ -54,6 +54,73 @@ class PCStatesBase(_PropsClassBase.PropsClassBase):
 
         return val
 
+    def _read_prop_value_from_sysfs(self, prop, path):
+        """Read property described by 'prop' from sysfs, and return its value."""
+
+        return self._parse_prop_value(prop, path, self._pman.read_small(path))
+
+    def _prefetch_sysfs(self, pnames, cpus, get_path):
+        """
+        Read the sysfs files backing properties 'pnames' (and their sub-properties) on a remote host
+        in one batch, and add the values to the properties cache. This avoids a network round trip
+        per sysfs file. The arguments are as follows.
+          * pnames - names of the properties that are going to be read.
+          * cpus - normalized list of CPU numbers the properties are going to be read for.
+          * get_path - a function which takes a property name, the property dictionary and a CPU
+                       number, and returns path to the sysfs file to read or 'None' if the property
+                       should not be prefetched.
+
+        The files that could not be read are not cached, so the errors are handled when the
+        properties are read the usual way.
+        """
+
+        if not self._pman.is_remote or not self._enable_cache:
+            return
+
+        # The '(pname, prop, cpu, path)' tuples to prefetch.
+        to_read = []
+        for pname in pnames:
+            props = [(pname, self._props[pname])] + list(self._props[pname]["subprops"].items())
+            for name, prop in props:
+                sname = prop.get("sname")
+                if not sname:
+                    continue
+
+                covered = set()
+                for cpu in cpus:
+                    if cpu in covered or self._pcache.is_cached(name, cpu):
+                        continue
+
+                    path = get_path(name, prop, cpu)
+                    if path is None:
+                        break
+
+                    to_read.append((name, prop, cpu, path))
+                    if sname != "CPU":
+                        covered.update(self._cpuinfo.get_cpu_siblings(cpu, sname))
+
+        if not to_read:
+            return
+
+        try:
+            data = BatchIO.read_files([path for _, _, _, path in to_read], pman=self._pman)
+        except Error as err:
+            # Prefetching is only an optimization, the properties will be read one-by-one.
+            _LOG.debug("failed to prefetch sysfs files%s:\n%s", self._pman.hostmsg, err.indent(2))
+            return
+
+        for name, prop, cpu, path in to_read:
+            if data[path] is None:
+                continue
+
+            try:
+                val = self._parse_prop_value(prop, path, data[path])
+            except Error as err:
+                _LOG.debug("failed to prefetch '%s' for CPU %d:\n%s", name, cpu, err.indent(2))
+                continue
+
+            self._pcache.add(name, cpu, val, sname=prop.get("sname"))
+
     def _write_prop_value_to_sysfs(self, prop, path, val):
         """Write property value 'val' to a sysfs file at path 'path'."""
 
@@ -12,17 +12,80 @@
 This module implements CPU properties caching.
 """
 
+import logging
 from pepclibs import CPUInfo
 from pepclibs.helperlibs import ClassHelpers
-from pepclibs.helperlibs.Exceptions import ErrorNotFound
+from pepclibs.helperlibs.Exceptions import Error, ErrorNotFound
+
+_LOG = logging.getLogger()
 
 class PropsCache():
     """
     This class implements properties caching. The cache is indexed by property name and CPU number.
-    It takes the CPU scope (global 0, package 3, etc) into account as well. The cache uses the
-    write-through policy.
+    It takes the CPU scope (global 0, package 3, etc) into account as well: a value is stored only
+    once per scope instance (e.g., once per package for a package-scope property), and the CPU
+    number is resolved to the scope instance using 'CPUInfo'. The cache uses the write-through
+    policy.
+
+    The cache counts hits and misses per property. The counters are printed to the debug log when
+    the object is closed, and can also be fetched with 'get_stats()'.
     """
 
+    def _get_key(self, cpu, sname):
+        """
+        Return the key identifying the scope instance 'sname' (e.g. "package") CPU 'cpu' belongs
+        to. Core and die numbers are relative to the package, so they are identified by the
+        '(package, number)' tuple.
+        """
+
+        if sname == "CPU":
+            return cpu
+        if sname == "global":
+            return None
+
+        if sname not in self._sname2levels:
+            raise Error(f"unsupported scope name \"{sname}\"")
+
+        levels = self._sname2levels[sname]
+        tline = self._cpuinfo.get_cpu_levels(cpu, levels=levels)
+        if len(levels) == 1:
+            return tline[sname]
+        return tuple(tline[lvl] for lvl in levels)
+
+    def _lookup(self, pname, cpu):
+        """
+        Look up the '(pname, cpu)' item in the cache and update the hit/miss counters. Returns a
+        '(found, value)' tuple.
+        """
+
+        for sname, vals in self._cache.get(pname, {}).items():
+            key = self._get_key(cpu, sname)
+            if key in vals:
+                self._hits[pname] = self._hits.get(pname, 0) + 1
+                return True, vals[key]
+
+        self._misses[pname] = self._misses.get(pname, 0) + 1
+        return False, None
+
+    def _remove(self, pname, cpu, sname, skip_sname=None):
+        """
+        Remove the cached '(pname, cpu)' values of all the scope instances that overlap with the
+        'sname' scope instance of CPU 'cpu'. Values cached with the 'skip_sname' scope name are not
+        removed.
+        """
+
+        for cached_sname, vals in self._cache[pname].items():
+            if cached_sname == skip_sname or not vals:
+                continue
+
+            if cached_sname == "global":
+                vals.clear()
+            elif sname in ("CPU", cached_sname):
+                vals.pop(self._get_key(cpu, cached_sname), None)
+            else:
+                for sibling in self._cpuinfo.get_cpu_siblings(cpu, sname):
+                    vals.pop(self._get_key(sibling, cached_sname), None)
+
     def is_cached(self, pname, cpu):
         """
         Checks if '(pname, cpu)' item exists in the cache. Returns 'True' if the item was found and
@@ -34,9 +97,7 @@ class PropsCache():
         if not self._enable_cache:
             return False
 
-        if pname in self._cache and cpu in self._cache[pname]:
-            return True
-        return False
+        return self._lookup(pname, cpu)[0]
 
     def get(self, pname, cpu):
         """
@@ -44,12 +105,38 @@ class PropsCache():
         raises 'ErrorNotFound' otherwise. The argument are as follows.
           * pname - name of the property.
           * cpu - an integer CPU number.
+
+        Note, this method does not update the hit/miss counters, because it is normally called
+        after 'is_cached()'.
         """
 
-        try:
-            return self._cache[pname][cpu]
-        except KeyError:
-            raise ErrorNotFound(f"{pname} is not cached for CPU {cpu}") from None
+        if self._enable_cache:
+            for sname, vals in self._cache.get(pname, {}).items():
+                key = self._get_key(cpu, sname)
+                if key in vals:
+                    return vals[key]
+
+        raise ErrorNotFound(f"{pname} is not cached for CPU {cpu}")
+
+    def get_many(self, pname, cpus):
+        """
+        Look up the '(pname, cpu)' items for every CPU in 'cpus'. Returns a '{cpu: value}'
+        dictionary for the CPUs that have the value cached. The CPUs without a cached value are not
+        included. The arguments are as follows.
+          * pname - name of the property.
+          * cpus - collection of integer CPU numbers.
+        """
+
+        result = {}
+        if not self._enable_cache:
+            return result
+
+        for cpu in cpus:
+            found, val = self._lookup(pname, cpu)
+            if found:
+                result[cpu] = val
+
+        return result
 
     def remove(self, pname, cpu, sname="CPU"):
         """
@@ -57,27 +144,41 @@ class PropsCache():
           * pname - name of the property.
           * cpu - an integer CPU number.
           * sname - name of scope (e.g. "package", "core").
+
+        Note, if the value is cached with a wider scope than 'sname' (e.g., "package" scope, and
+        'sname' is "CPU"), the value is removed for the entire wider scope instance (e.g., for the
+        entire package).
         """
 
-        if not self._enable_cache:
+        if not self._enable_cache or pname not in self._cache:
             return
 
         if sname == "global":
             del self._cache[pname]
             return
 
-        cpus = self._cpuinfo.get_cpu_siblings(cpu, sname)
+        self._remove(pname, cpu, sname)
+
+    def remove_many(self, pname, cpus, sname="CPU"):
+        """
+        Same as 'remove()', but remove the '(pname, cpu)' items for every CPU in 'cpus'.
+        """
 
-        for cpu in cpus: # pylint: disable=redefined-argument-from-local
-            try:
-                del self._cache[pname][cpu]
-            except KeyError:
-                pass
+        if not self._enable_cache or pname not in self._cache:
+            return
+
+        if sname == "global":
+            del self._cache[pname]
+            return
+
+        for cpu in cpus:
+            self._remove(pname, cpu, sname)
 
     def add(self, pname, cpu, val, sname="CPU"):
         """
-        Add value 'val' for item '(pname, cpu)' to the cache. Add it also for each CPU sharing the
-        same scope. The argument are as follows.
+        Add value 'val' for item '(pname, cpu)' to the cache. The value is cached for the 'sname'
+        scope instance CPU 'cpu' belongs to, so it is also cached for each CPU sharing the same
+        scope. The argument are as follows.
           * pname - name of the property.
           * cpu - an integer CPU number.
           * val - value to get cached.
@@ -85,18 +186,60 @@ class PropsCache():
         Returns 'val'.
         """
 
+        return self.add_many(pname, (cpu,), val, sname=sname)
+
+    def add_many(self, pname, cpus, val, sname="CPU"):
+        """
+        Same as 'add()', but add value 'val' for every CPU in 'cpus'. Returns 'val'.
+        """
+
         if not self._enable_cache:
             return val
 
-        cpus = self._cpuinfo.get_cpu_siblings(cpu, sname)
-
         if pname not in self._cache:
             self._cache[pname] = {}
-        for cpu in cpus: # pylint: disable=redefined-argument-from-local
-            self._cache[pname][cpu] = val
+
+        scache = self._cache[pname]
+        # Drop the stale values cached with a different scope name.
+        drop_stale = len(scache) > 1 or (scache and sname not in scache)
+
+        if sname not in scache:
+            scache[sname] = {}
+        vals = scache[sname]
+
+        for cpu in cpus:
+            if drop_stale:
+                self._remove(pname, cpu, sname, skip_sname=sname)
+            vals[self._get_key(cpu, sname)] = val
 
         return val
 
+    def get_stats(self):
+        """
+        Return the cache hit/miss statistics as a '{pname: (hits, misses)}' dictionary.
+        """
+
+        stats = {}
+        for pname in set(self._hits) | set(self._misses):
+            stats[pname] = (self._hits.get(pname, 0), self._misses.get(pname, 0))
+        return stats
+
+    def _dump_stats(self):
+        """Print the cache hit/miss statistics to the debug log."""
+
+        stats = self.get_stats()
+        if not stats:
+            return
+
+        lines = []
+        for pname, (hits, misses) in stats.items():
+            if isinstance(pname, int):
+                # MSR addresses are used as property names by the 'MSR' module.
+                pname = f"{pname:#x}"
+            lines.append(f"{pname}: {hits} hits, {misses} misses")
+
+        _LOG.debug("properties cache statistics:\n  %s", "\n  ".join(sorted(lines)))
+
     def __init__(self, cpuinfo=None, pman=None, enable_cache=True):
         """
         The class constructor. The argument are as follows.
@@ -106,6 +249,11 @@ class PropsCache():
         """
 
         self._enable_cache = enable_cache
+
+        # The cache hit and miss counters, indexed by property name.
+        self._hits = {}
+        self._misses = {}
+
         if not self._enable_cache:
             return
 
@@ -116,9 +264,18 @@ class PropsCache():
             # 'pman' is only used to initialize 'cpuinfo' in this class.
             self._cpuinfo = CPUInfo.CPUInfo(pman=pman)
 
+        # The cache: '{pname: {sname: {key: value}}}', where 'key' identifies the scope instance
+        # (see '_get_key()').
         self._cache = {}
+        # Scope name -> the CPUInfo levels identifying a scope instance.
+        self._sname2levels = {lvl: (lvl,) for lvl in CPUInfo.LEVELS}
+        self._sname2levels["core"] = ("package", "core")
+        self._sname2levels["die"] = ("package", "die")
 
     def close(self):
         """Uninitialize the class object."""
 
+        if getattr(self, "_enable_cache", False):
+            self._dump_stats()
+
         ClassHelpers.close(self, close_attrs=("_cpuinfo",))
@@ -25,7 +25,7 @@ Naming conventions:
 
 import copy
 import logging
-from pepclibs import CPUInfo
+from pepclibs import CPUInfo, _PropsTable
 from pepclibs.helperlibs import Human, ClassHelpers, LocalProcessManager
 from pepclibs.helperlibs.Exceptions import ErrorNotSupported, Error
 
@@ -36,6 +36,58 @@ def _bug_method_not_defined(method_name):
 
     raise Error(f"BUG: '{method_name}()' was not defined by the child class")
 
+class _ReadPlan:
+    """
+    The properties read plan: read a property only for the first CPU of every scope instance (e.g.,
+    for the first CPU of every package in case of a package-scope property), and use the value for
+    the other CPUs of the scope instance (the siblings).
+    """
+
+    def _get_scope_key(self, cpu, sname):
+        """
+        Return a key identifying the 'sname' scope instance CPU 'cpu' belongs to. For example, for
+        the "die" scope the key is the '(package, die)' tuple, because die numbers are per-package.
+        """
+
+        if sname == "CPU":
+            return cpu
+        if sname == "global":
+            return None
+
+        key = self._keys.get((cpu, sname))
+        if key is None:
+            levels = self._cpuinfo.get_cpu_levels(cpu, levels=(sname, "package"))
+            key = self._keys[(cpu, sname)] = (levels["package"], levels[sname])
+        return key
+
+    def get_value(self, name, cpu, read_value):
+        """
+        Return value of property (or sub-property) 'name' for CPU 'cpu'. The 'read_value' argument
+        is a function which reads the value for CPU 'cpu'. It is called only if the value has not
+        been read for a sibling CPU yet.
+        """
+
+        key = (name, self._get_scope_key(cpu, self._snames[name]))
+        if key not in self._values:
+            self._values[key] = read_value()
+        return self._values[key]
+
+    def __init__(self, snames, cpuinfo):
+        """
+        The class constructor. The arguments are as follows.
+          * snames - a '{name: sname}' dictionary with the scope names to read the properties and
+                     sub-properties with.
+          * cpuinfo - the 'CPUInfo' object.
+        """
+
+        self._snames = snames
+        self._cpuinfo = cpuinfo
+
+        # The already read values of the properties and sub-properties, by name and scope key.
+        self._values = {}
+        # The '(cpu, sname)' -> scope key cache.
+        self._keys = {}
+
 class PropsClassBase(ClassHelpers.SimpleCloseContext):
     """
     Base class for higher level classes implementing properties (e.g. 'CStates' or 'PStates').
@@ -104,30 +156,120 @@ class PropsClassBase(ClassHelpers.SimpleCloseContext):
         subprop = self._props[pname]["subprops"][subpname]
         return self._get_cpu_prop_value(subpname, cpu, prop=subprop)
 
-    def _get_cpu_props(self, pnames, cpu):
-        """Returns all properties in 'pnames' for CPU 'cpu'."""
+    def _prefetch(self, pnames, cpus):
+        """
+        Read the data required for getting properties 'pnames' on CPUs 'cpus' in advance, which is
+        more efficient than reading the data CPU-by-CPU. Sub-classes may re-define this method, by
+        default nothing is prefetched.
+        """
 
-        pinfo = {}
+    def _prefetch_msrs(self, pnames, cpus, msr_features):
+        """
+        Read the MSRs required for getting properties 'pnames' on CPUs 'cpus' in one pass, so that
+        the subsequent reads are served from the MSR cache. The arguments are as follows.
+          * pnames - names of the properties that are going to be read.
+          * cpus - normalized list of CPU numbers the properties are going to be read for.
+          * msr_features - a dictionary mapping property names to '(get_fmsr, fnames)' tuples, where
+                           'get_fmsr' is a method returning the featured MSR object and 'fnames' is a
+                           collection of names of features the property is read from.
+        """
 
+        snames = {}
         for pname in pnames:
-            pinfo[pname] = {}
+            if pname not in msr_features:
+                continue
 
-            # Get the 'pname' property.
-            pinfo[pname][pname] = self._get_cpu_prop_value(pname, cpu)
-            if pinfo[pname][pname] is None:
-                _LOG.debug("CPU %d: %s is not supported", cpu, pname)
+            get_fmsr, fnames = msr_features[pname]
+            try:
+                fmsr = get_fmsr()
+            except ErrorNotSupported:
                 continue
-            _LOG.debug("CPU %d: %s = %s", cpu, pname, pinfo[pname][pname])
 
-            # Get all the sub-properties.
-            for subpname in self._props[pname]["subprops"]:
-                if pinfo[pname][pname] is not None:
-                    # Get the 'subpname' sub-property.
-                    pinfo[pname][subpname] = self._get_cpu_subprop_value(pname, subpname, cpu)
+            for fname in fnames:
+                if not fmsr.is_feature_supported(fname, cpus=cpus):
+                    continue
+
+                # If features of the same MSR have different scopes, use the narrowest one.
+                sname = fmsr.features[fname]["sname"]
+                prev_sname = snames.get(fmsr.regaddr, sname)
+                if CPUInfo.LEVELS.index(prev_sname) < CPUInfo.LEVELS.index(sname):
+                    sname = prev_sname
+                snames[fmsr.regaddr] = sname
+
+        if not snames:
+            return
+
+        try:
+            for _ in self._msr.read_many(snames, cpus=cpus, snames=snames):
+                pass
+        except Error as err:
+            # Prefetching is only an optimization, the properties will be read one-by-one.
+            _LOG.debug("failed to prefetch MSRs%s:\n%s", self._pman.hostmsg, err.indent(2))
+
+    def _get_read_sname(self, pname, prop):
+        """
+        Return scope name to use for reading property (or sub-property) 'pname' described by
+        'prop'. Properties without a known scope are read for every CPU.
+        """
+
+        sname = prop.get("sname")
+        if sname or pname not in self._props:
+            return sname or "CPU"
+
+        try:
+            return self.get_sname(pname)
+        except Error as err:
+            _LOG.debug("failed to get scope of '%s', reading it for every CPU:\n%s",
+                       pname, err.indent(2))
+            return "CPU"
+
+    def _build_read_plan(self, pnames):
+        """Build and return the '_ReadPlan' object for reading properties 'pnames'."""
+
+        snames = {}
+        for pname in pnames:
+            snames[pname] = self._get_read_sname(pname, self._props[pname])
+            for subpname, subprop in self._props[pname]["subprops"].items():
+                # Sub-properties without own scope have the scope of the property.
+                if subprop.get("sname"):
+                    snames[subpname] = self._get_read_sname(subpname, subprop)
                 else:
-                    # The property is not supported, so all sub-properties are not supported either.
-                    pinfo[pname][subpname] = None
-                _LOG.debug("CPU %d: %s = %s", cpu, subpname, pinfo[pname][subpname])
+                    snames[subpname] = snames[pname]
+
+        return _ReadPlan(snames, self._cpuinfo)
+
+    def _iter_cpu_prop_values(self, pname, cpu, plan):
+        """
+        Read property 'pname' and its sub-properties for CPU 'cpu' and yield the '(name, value)'
+        tuples, where 'name' is the property or sub-property name. The sub-properties are not
+        yielded if the property is not supported. The 'plan' argument is the '_ReadPlan' object to
+        read the properties with.
+        """
+
+        val = plan.get_value(pname, cpu, lambda: self._get_cpu_prop_value(pname, cpu))
+        yield pname, val
+
+        if val is None:
+            _LOG.debug("CPU %d: %s is not supported", cpu, pname)
+            return
+        _LOG.debug("CPU %d: %s = %s", cpu, pname, val)
+
+        for subpname in self._props[pname]["subprops"]:
+            # pylint: disable=cell-var-from-loop
+            val = plan.get_value(subpname, cpu,
+                                 lambda: self._get_cpu_subprop_value(pname, subpname, cpu))
+            _LOG.debug("CPU %d: %s = %s", cpu, subpname, val)
+            yield subpname, val
+
+    def _get_cpu_props(self, pnames, cpu, plan):
+        """
+        Returns all properties in 'pnames' for CPU 'cpu'. The 'plan' argument is the '_ReadPlan'
+        object to read the properties with.
+        """
+
+        pinfo = {}
+        for pname in pnames:
+            pinfo[pname] = dict(self._iter_cpu_prop_values(pname, cpu, plan))
 
         return pinfo
 
@@ -160,13 +302,60 @@ class PropsClassBase(ClassHelpers.SimpleCloseContext):
         Properties of "bool" type use the following values:
            * "on" if the feature is enabled.
            * "off" if the feature is disabled.
+
+        Properties of a scope wider than CPU (e.g., package) are read only once per scope instance
+        (e.g., once per package), and the value is used for all the CPUs of the scope instance.
+        """
+
+        for pname in pnames:
+            self._validate_pname(pname)
+
+        cpus = self._cpuinfo.normalize_cpus(cpus)
+        self._prefetch(pnames, cpus)
+
+        plan = self._build_read_plan(pnames)
+        for cpu in cpus:
+            yield cpu, self._get_cpu_props(pnames, cpu, plan)
+
+    def get_props_table(self, pnames, cpus="all"):
+        """
+        Read all properties specified in the 'pnames' list for CPUs in 'cpus', and return the
+        results as a '_PropsTable.PropsTable' object. The arguments are the same as in
+        'get_props()'.
+
+        This method is an alternative to 'get_props()' for large CPU counts: instead of building a
+        'pinfo' dictionary for every CPU, the values are stored in per-property columns, and the
+        table provides the values grouped by CPUs having the same value. Sub-properties of a
+        property not supported by a CPU have the 'None' value for this CPU.
         """
 
         for pname in pnames:
             self._validate_pname(pname)
 
-        for cpu in self._cpuinfo.normalize_cpus(cpus):
-            yield cpu, self._get_cpu_props(pnames, cpu)
+        cpus = self._cpuinfo.normalize_cpus(cpus)
+        self._prefetch(pnames, cpus)
+
+        plan = self._build_read_plan(pnames)
+
+        columns = {}
+        for pname in pnames:
+            columns[pname] = {pname: []}
+            for subpname in self._props[pname]["subprops"]:
+                columns[pname][subpname] = []
+
+        for idx, cpu in enumerate(cpus):
+            for pname in pnames:
+                pcolumns = columns[pname]
+                for name, val in self._iter_cpu_prop_values(pname, cpu, plan):
+                    pcolumns[name].append(val)
+
+                # Fill in the sub-properties which were not read because the property is not
+                # supported.
+                for column in pcolumns.values():
+                    if len(column) == idx:
+                        column.append(None)
+
+        return _PropsTable.PropsTable(cpus, columns)
 
     def get_cpu_props(self, pnames, cpu):
         """Same as 'get_props()', but for a single CPU."""
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+# vim: ts=4 sw=4 tw=100 et ai si
+#
+# Copyright (C) 2023 Intel Corporation
+# SPDX-License-Identifier: BSD-3-Clause
+#
+# Author: Artem Bityutskiy <artem.bityutskiy@linux.intel.com>
+
+"""
+This module implements the columnar properties table, which is an alternative to the per-CPU
+'pinfo' dictionaries yielded by 'get_props()'. Refer to 'PropsClassBase.get_props_table()'.
+"""
+
+from pepclibs.helperlibs.Exceptions import Error
+
+def _get_hashable(val):
+    """Return a hashable version of value 'val' (lists and dictionaries are not hashable)."""
+
+    if isinstance(val, list):
+        return tuple(val)
+    if isinstance(val, dict):
+        return tuple(val.items())
+    return val
+
+class PropsTable():
+    """
+    The properties table: property and sub-property values for multiple CPUs, stored as columns.
+    The columns are tuples indexed by CPU position in 'cpus'. The table also provides the values
+    grouped by CPUs having the same value.
+
+    The public attributes are as follows.
+      * cpus - the tuple of CPU numbers the table has the values for.
+      * pnames - the list of property names in the table.
+      * columns - the '{pname: {key: column}}' dictionary, where 'key' is the property name or a
+                  sub-property name, and 'column' is the tuple of values. Unsupported properties
+                  have 'None' values.
+    """
+
+    def get_column(self, pname, key=None):
+        """
+        Return the column of values of property 'pname' or its sub-property 'key'. The column is
+        a tuple indexed by CPU position in 'cpus'.
+        """
+
+        if key is None:
+            key = pname
+
+        try:
+            return self.columns[pname][key]
+        except KeyError:
+            raise Error(f"no '{pname}' property values for '{key}' in the properties table") \
+                  from None
+
+    def get_value(self, pname, cpu, key=None):
+        """Return value of property 'pname' (or its sub-property 'key') for CPU 'cpu'."""
+
+        if self._cpu2idx is None:
+            self._cpu2idx = {cpu: idx for idx, cpu in enumerate(self.cpus)}
+
+        try:
+            idx = self._cpu2idx[cpu]
+        except KeyError:
+            raise Error(f"CPU {cpu} is not in the properties table") from None
+
+        return self.get_column(pname, key=key)[idx]
+
+    def get_groups(self, pname, key=None):
+        """
+        Group CPUs by value of property 'pname' (or its sub-property 'key') and return the list of
+        '(value, cpus)' tuples, where 'cpus' is the list of CPUs having value 'value'. The groups
+        and the CPUs are in the order of 'cpus'.
+        """
+
+        if key is None:
+            key = pname
+
+        groups = self._groups.get((pname, key))
+        if groups is not None:
+            return groups
+
+        column = self.get_column(pname, key=key)
+
+        # Map hashable values to the '(value, cpus)' tuples.
+        val2group = {}
+        for cpu, val in zip(self.cpus, column):
+            hval = _get_hashable(val)
+            if hval not in val2group:
+                val2group[hval] = (val, [])
+            val2group[hval][1].append(cpu)
+
+        groups = list(val2group.values())
+        self._groups[(pname, key)] = groups
+        return groups
+
+    def __init__(self, cpus, columns):
+        """
+        The class constructor. The arguments are as follows.
+          * cpus - collection of CPU numbers the table has the values for.
+          * columns - the '{pname: {key: column}}' columns dictionary (see the class docstring),
+                      the columns can be any sequences of the same length as 'cpus'.
+        """
+
+        self.cpus = tuple(cpus)
+        self.pnames = list(columns)
+        self.columns = {}
+
+        for pname, pcolumns in columns.items():
+            self.columns[pname] = {}
+            for key, column in pcolumns.items():
+                column = tuple(column)
+                if len(column) != len(self.cpus):
+                    raise Error(f"BUG: bad properties table column '{pname}/{key}' length "
+                                f"{len(column)}, expected {len(self.cpus)}")
+                self.columns[pname][key] = column
+
+        # The CPU number -> CPU position in 'cpus' map, built on demand.
+        self._cpu2idx = None
+        # The '(pname, key)' -> groups cache.
+        self._groups = {}
+
+def build_props_table(pinfo_iter):
+    """
+    Build and return the properties table from an iterator yielding '(cpu, pinfo)' tuples, just
+    like 'get_props()' does.
+    """
+
+    cpus = []
+    columns = {}
+
+    for cpu, pinfo in pinfo_iter:
+        for pname, kinfo in pinfo.items():
+            pcolumns = columns.setdefault(pname, {})
+            for key, val in kinfo.items():
+                # Sub-properties may be missing for some CPUs, fill the gaps with 'None'.
+                column = pcolumns.setdefault(key, [None] * len(cpus))
+                column.append(val)
+        cpus.append(cpu)
+
+        for pcolumns in columns.values():
+            for column in pcolumns.values():
+                if len(column) < len(cpus):
+                    column.append(None)
+
+    return PropsTable(cpus, columns)
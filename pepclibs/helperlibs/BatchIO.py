@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+# vim: ts=4 sw=4 tw=100 et ai si
+#
+# Copyright (C) 2023 Intel Corporation
+# SPDX-License-Identifier: BSD-3-Clause
+#
+# Author: Artem Bityutskiy <artem.bityutskiy@linux.intel.com>
+
+"""
+This module provides helpers for doing many small file and MSR I/O operations in one go.
+
+Reading or writing a file on a remote host via SFTP costs several network round trips per file. The
+functions of this module send a batch of I/O operations to a small shell helper, which runs them all
+on the target host and prints the results as a single framed response. The helper is passed along
+with the batch, so nothing has to be installed on the target host. The helper runs through the
+process manager, so it uses the interactive shell in case of a remote host.
+
+Supported operations are described by tuples.
+  * ("read", path) - read the entire file at 'path'. The result is the file contents with the
+                     trailing newlines stripped.
+  * ("write", path, data) - write string 'data' to file 'path'. The result is 'None'.
+  * ("msr_read", cpu, regaddr) - read MSR at 'regaddr' on CPU 'cpu'. The result is the MSR value.
+  * ("msr_write", cpu, regaddr, regval) - write 'regval' to MSR at 'regaddr' on CPU 'cpu'. The
+                                          result is 'None'.
+
+
+The 'grep_files()' function is an alternative for reading many small files when their paths are
+not known in advance: it reads all the files matching a list of shell glob patterns with a single
+'grep' command.
+"""
+
+import shlex
+import random
+import logging
+from pathlib import Path
+from pepclibs.helperlibs import ProcessManager, Trivial
+from pepclibs.helperlibs.Exceptions import Error
+
+_LOG = logging.getLogger()
+
+# MSR registers size in bytes (the shell helper assumes 8 bytes as well).
+_MSR_BYTES = 8
+# The byte order of MSR values.
+_MSR_BYTEORDER = "little"
+
+# The shell helper which runs the batch of operations. It reads the operations from 'stdin', one
+# operation per line, and for every operation prints a header line with the marker (the first
+# argument), operation index and exit status, followed by the operation output.
+_HELPER = r"""
+m="$1"; i=0
+while IFS= read -r line; do
+    op="${line%% *}"; args="${line#* }"
+    case "$op" in
+    r)
+        data="$(cat -- "$args" 2>&1)"; s=$?;;
+    w)
+        path="${args%% *}"; val="${args#* }"
+        data="$( (printf "%s" "$val" > "$path") 2>&1)"; s=$?;;
+    m)
+        set -- $args
+        data="$(dd if=/dev/cpu/$1/msr bs=8 count=1 skip=$2 iflag=skip_bytes 2>/dev/null | od -An -t u8)"
+        s=0; [ -n "$data" ] || s=1;;
+    M)
+        set -- $args
+        data="$(printf "$3" | LC_ALL=C dd of=/dev/cpu/$1/msr bs=8 count=1 seek=$2 iflag=fullblock oflag=seek_bytes conv=notrunc 2>&1)"
+        s=$?
+        if [ "$s" -eq 0 ]; then
+            case "$data" in
+            *"1+0 records out"*) data="";;
+            *) data="wrote less than 8 bytes: $data"; s=1;;
+            esac
+        fi;;
+    *)
+        data="bad operation '$op'"; s=1;;
+    esac
+    printf "%s %d %d\n%s\n" "$m" "$i" "$s" "$data"
+    i=$((i+1))
+done
+"""
+
+def _format_op(op):
+    """Validate operation 'op' and format it as a line for the shell helper."""
+
+    try:
+        opname = op[0]
+        if opname == "read":
+            path, = op[1:]
+            line = f"r {path}"
+        elif opname == "write":
+            path, data = op[1:]
+            if " " in str(path):
+                raise Error(f"path '{path}' contains white-spaces")
+            line = f"w {path} {data}"
+        elif opname == "msr_read":
+            cpu, regaddr = op[1:]
+            line = f"m {int(cpu)} {int(regaddr)}"
+        elif opname == "msr_write":
+            cpu, regaddr, regval = op[1:]
+            regval_bytes = int(regval).to_bytes(_MSR_BYTES, byteorder=_MSR_BYTEORDER)
+            # Encode the MSR value as a string of octal escapes for the 'printf' shell command.
+            octal = "".join(f"\\{byte:03o}" for byte in regval_bytes)
+            line = f"M {int(cpu)} {int(regaddr)} {octal}"
+        else:
+            raise Error(f"unknown operation '{opname}'")
+    except (ValueError, TypeError, IndexError):
+        raise Error(f"bad batch I/O operation '{op}'") from None
+
+    if "\n" in line:
+        raise Error(f"bad batch I/O operation '{op}': new line characters are not allowed")
+
+    return line
+
+def _parse_output(stdout, marker, ops, pman):
+    """
+    Parse output of the shell helper and return the list of '(status, data)' tuples, one tuple per
+    operation in 'ops'.
+    """
+
+    results = [None] * len(ops)
+    idx = status = None
+    lines = []
+
+    def _save_result():
+        """Save the result of the operation whose output was just parsed."""
+
+        if idx is not None:
+            results[idx] = (status, "\n".join(lines))
+
+    # Every operation output ends with a newline, remove the last one to avoid an extra empty line.
+    if stdout.endswith("\n"):
+        stdout = stdout[:-1]
+
+    for line in stdout.split("\n"):
+        if not line.startswith(marker):
+            if idx is None:
+                raise Error(f"unexpected output of the batch I/O helper{pman.hostmsg}:\n{line}")
+            lines.append(line)
+            continue
+
+        _save_result()
+
+        split = line.split()
+        if len(split) != 3 or not Trivial.is_int(split[1]) or not Trivial.is_int(split[2]) or \
+           int(split[1]) >= len(ops):
+            raise Error(f"unexpected header line in output of the batch I/O helper"
+                        f"{pman.hostmsg}:\n{line}")
+
+        idx, status = int(split[1]), int(split[2])
+        lines = []
+
+    _save_result()
+
+    for idx, result in enumerate(results):
+        if result is None:
+            raise Error(f"batch I/O helper did not provide the result for operation '{ops[idx]}'"
+                        f"{pman.hostmsg}")
+
+    return results
+
+def execute(ops, pman=None):
+    """
+    Run a batch of I/O operations 'ops' (refer to the module docstring for the list of supported
+    operations) and return the list of results, one result per operation. The arguments are as
+    follows.
+      * ops - an iterable collection of operations to run.
+      * pman - the process manager object that defines the host to run the operations on (local
+               host by default).
+
+    The read operations are allowed to fail, and the corresponding result is 'None' in this case.
+    Usually the caller should then fall back to reading the file or MSR directly, in order to get a
+    meaningful error. If a write operation fails, this function raises an exception, but only after
+    all the operations have been run.
+    """
+
+    ops = list(ops)
+    if not ops:
+        return []
+
+    lines = [_format_op(op) for op in ops]
+
+    with ProcessManager.pman_or_local(pman) as wpman:
+        marker = f"---{random.getrandbits(64):016x}---"
+        # Use a unique here-document delimiter to make sure it does not match any operation line.
+        eof = f"EOF_{random.getrandbits(64):016x}"
+        cmd = f"sh -c {shlex.quote(_HELPER)} batch_io '{marker}' <<'{eof}'\n" + \
+              "\n".join(lines) + f"\n{eof}"
+
+        _LOG.debug("running a batch of %d I/O operations%s", len(ops), wpman.hostmsg)
+        stdout, _ = wpman.run_verify(cmd)
+        results = _parse_output(stdout, marker, ops, wpman)
+
+        errors = []
+        for idx, (status, data) in enumerate(results):
+            op = ops[idx]
+            if status != 0:
+                msg = f"batch I/O operation '{op}' failed{wpman.hostmsg}"
+                if data:
+                    msg += f":\n{data}"
+                if op[0] in ("write", "msr_write"):
+                    errors.append(msg)
+                else:
+                    _LOG.debug(msg)
+                results[idx] = None
+            elif op[0] == "read":
+                results[idx] = data
+            elif op[0] == "msr_read":
+                if not Trivial.is_int(data.strip()):
+                    raise Error(f"batch I/O operation '{op}' returned unexpected data"
+                                f"{wpman.hostmsg}:\n{data}")
+                results[idx] = int(data.strip())
+            else:
+                results[idx] = None
+
+    if errors:
+        raise Error("\n".join(errors))
+
+    return results
+
+def read_files(paths, pman=None):
+    """
+    Read files in 'paths' in one batch and return a dictionary mapping the paths to the file
+    contents. The contents of the files that could not be read is 'None'. Refer to 'execute()' for
+    more information.
+    """
+
+    paths = Trivial.list_dedup(paths)
+    results = execute([("read", path) for path in paths], pman=pman)
+    return dict(zip(paths, results))
+
+def grep_files(patterns, pman=None):
+    """
+    Read all files matching shell glob patterns in 'patterns' with a single 'grep -H' command and
+    return a dictionary mapping the file paths ('Path' objects) to the file contents. The arguments
+    are as follows.
+      * patterns - an iterable collection of shell glob patterns, for example
+                   '/sys/devices/system/cpu/cpu[0-9]*/topology/die_id'.
+      * pman - the process manager object that defines the host to read the files on (local host
+               by default).
+
+    Files that could not be read, as well as empty files, are not included in the result. The
+    file contents have the trailing newline stripped. Note, the file paths must not include the ':'
+    character.
+    """
+
+    patterns = [str(pattern) for pattern in patterns]
+    if not patterns:
+        return {}
+
+    for pattern in patterns:
+        if any(char in pattern for char in " \t\n'\";:$`\\"):
+            raise Error(f"bad file path pattern '{pattern}': it should not include white-spaces, "
+                        f"quotes or shell special characters")
+
+    with ProcessManager.pman_or_local(pman) as wpman:
+        cmd = "grep -H -s '' -- " + " ".join(patterns)
+        _LOG.debug("reading files matching %d patterns%s", len(patterns), wpman.hostmsg)
+        stdout, _, exitcode = wpman.run(cmd, join=False)
+
+    # The 'grep' program exits with status 1 if nothing was found, and with status 2 if some files
+    # could not be read, but it still prints the contents of all the other files.
+    if exitcode not in (0, 1, 2):
+        raise Error(f"failed to read files matching the following patterns{wpman.hostmsg}:\n  "
+                    + "\n  ".join(patterns))
+
+    lines = {}
+    for line in stdout:
+        path, sep, data = line.rstrip("\n").partition(":")
+        if not sep:
+            raise Error(f"unexpected line in 'grep' output{wpman.hostmsg}:\n{line}")
+        lines.setdefault(path, []).append(data)
+
+    return {Path(path) : "\n".join(data) for path, data in lines.items()}
@@ -326,6 +326,14 @@ class EmulProcessManager(LocalProcessManager.LocalProcessManager):
         self._msr_seek(fobj, path)
         return fobj
 
+    def read_small(self, path, must_exist=True):
+        """
+        Read a small file at path 'path'. The emulated files are not necessarily real files, so
+        read them via 'open()'.
+        """
+
+        return self.read(path, must_exist=must_exist)
+
     def _init_commands(self, cmdinfos, datapath):
         """
         Initialize commands described by the 'cmdinfos' dictionary. Read the stdout/stderr data of
@@ -502,6 +510,18 @@ class EmulProcessManager(LocalProcessManager.LocalProcessManager):
         dirpath = self._get_basepath() / str(dirpath).lstrip("/")
         super().mkdir(dirpath, parents=parents, exist_ok=exist_ok)
 
+    def lsdir(self, path, must_exist=True):
+        """
+        List directory entries in 'path'. Refer to
+        '_ProcessManagerBase.ProcessManagerBase().lsdir()' for more information.
+        """
+
+        basepath = self._get_basepath()
+        dirpath = basepath / str(path).lstrip("/")
+
+        for name, entpath, mode in super().lsdir(dirpath, must_exist=must_exist):
+            yield (name, Path("/") / entpath.relative_to(basepath), mode)
+
     def exists(self, path):
         """Returns 'True' if path 'path' exists."""
 
@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+# vim: ts=4 sw=4 tw=100 et ai si
+#
+# Copyright (C) 2023 Intel Corporation
+# SPDX-License-Identifier: BSD-3-Clause
+#
+# Author: Artem Bityutskiy <artem.bityutskiy@linux.intel.com>
+
+"""
+This module provides I/O accounting and tracing for process managers. It counts calls, bytes and
+wall time of the process manager I/O operations, and optionally writes a trace line per operation to
+a file. Refer to 'ProcessManagerBase.enable_stats()' for the process manager API.
+
+The statistics are grouped by path pattern, which is the path with all the numbers replaced with
+'*'. For example, '/dev/cpu/12/msr' becomes '/dev/cpu/*/msr', and
+'/sys/devices/system/cpu/cpu3/cpufreq/scaling_max_freq' becomes
+'/sys/devices/system/cpu/cpu*/cpufreq/scaling_max_freq'. Commands are grouped by the program name.
+"""
+
+# pylint: disable=protected-access
+
+import re
+import time
+import threading
+from pepclibs.helperlibs import ClassHelpers
+from pepclibs.helperlibs.Exceptions import Error
+
+# The process manager methods to account, and the operation names for them.
+METHODS = {
+    "open": "open",
+    "read": "read",
+    "read_small": "read",
+    "read_many": "read",
+    "run": "run",
+    "run_verify": "run",
+    "run_async": "run",
+    "exists": "exists",
+    "is_file": "exists",
+    "is_dir": "exists",
+    "is_exe": "exists",
+    "is_socket": "exists",
+    "lsdir": "lsdir",
+}
+
+# The operation names.
+OPS = ("open", "read", "write", "run", "exists", "lsdir")
+
+_NUMBER_RE = re.compile(r"\d+")
+
+def get_pattern(op, path):
+    """Return the statistics group name for operation 'op' on path (or command) 'path'."""
+
+    if op == "run":
+        cmd = str(path).split(maxsplit=1)
+        if not cmd:
+            return "run: <empty>"
+        return f"run: {cmd[0].split('/')[-1]}"
+
+    return _NUMBER_RE.sub("*", str(path))
+
+def _get_size(data):
+    """Return size of data 'data' in bytes (or characters)."""
+
+    if isinstance(data, (str, bytes, bytearray)):
+        return len(data)
+    if isinstance(data, dict):
+        return sum(_get_size(val) for val in data.values())
+    if isinstance(data, (list, tuple)):
+        return sum(_get_size(val) for val in data)
+    return 0
+
+def _new_counters():
+    """Return a new counters dictionary."""
+    return {"count": 0, "bytes": 0, "time": 0.0}
+
+class _StatsFile(ClassHelpers.SimpleCloseContext):
+    """A file object wrapper which accounts the 'read()' and 'write()' operations."""
+
+    def read(self, *args, **kwargs):
+        """Read from the file."""
+
+        with self._iostats.measure("read", self._path) as info:
+            data = self._fobj.read(*args, **kwargs)
+            info["bytes"] = _get_size(data)
+        return data
+
+    def write(self, data):
+        """Write to the file."""
+
+        with self._iostats.measure("write", self._path) as info:
+            info["bytes"] = _get_size(data)
+            return self._fobj.write(data)
+
+    def __iter__(self):
+        """Iterate over the file lines, account all of them as one read operation."""
+
+        nbytes = 0
+        duration = 0
+        lines = iter(self._fobj)
+        while True:
+            start = time.perf_counter()
+            try:
+                line = next(lines)
+            except StopIteration:
+                break
+            finally:
+                duration += time.perf_counter() - start
+
+            nbytes += len(line)
+            yield line
+
+        if not self._iostats.is_nested():
+            self._iostats.account("read", self._path, nbytes, duration)
+
+    def __getattr__(self, name):
+        """Forward all the other attributes to the wrapped file object."""
+        return getattr(self._fobj, name)
+
+    def close(self):
+        """Close the file."""
+
+        fobj = getattr(self, "_fobj", None)
+        if fobj:
+            fobj.close()
+        ClassHelpers.close(self, unref_attrs=("_fobj", "_iostats"))
+
+    def __init__(self, fobj, path, iostats):
+        """
+        The class constructor. The arguments are as follows.
+          * fobj - the file object to wrap.
+          * path - path of the file.
+          * iostats - the 'IOStats' object.
+        """
+
+        self._fobj = fobj
+        self._path = path
+        self._iostats = iostats
+
+class _Measure:
+    """
+    A context manager which measures an I/O operation and accounts it when the context exits. The
+    context value is a dictionary with the "bytes" key, which should be updated with the amount of
+    transferred bytes. If multiple files were read, the "files" key should be set to a
+    '{path: bytes}' dictionary instead.
+    """
+
+    def __enter__(self):
+        """Start measuring."""
+
+        tls = self._iostats._tls
+        self._outer = not getattr(tls, "depth", 0)
+        tls.depth = getattr(tls, "depth", 0) + 1
+        self._start = time.perf_counter()
+        return self._info
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Stop measuring and account the operation."""
+
+        duration = time.perf_counter() - self._start
+        self._iostats._tls.depth -= 1
+
+        # Nested operations (e.g., 'open()' called by 'read()') are part of the outer operation.
+        if not self._outer:
+            return
+
+        failed = exc_type is not None
+        files = self._info.get("files")
+        if files:
+            # Split the time evenly between the files read in one go.
+            for path, nbytes in files.items():
+                self._iostats.account(self._op, path, nbytes, duration / len(files), failed)
+        else:
+            self._iostats.account(self._op, self._path, self._info["bytes"], duration, failed)
+
+    def __init__(self, iostats, op, path):
+        """The class constructor."""
+
+        self._iostats = iostats
+        self._op = op
+        self._path = path
+        self._info = {"bytes": 0}
+        self._outer = None
+        self._start = None
+
+class IOStats(ClassHelpers.SimpleCloseContext):
+    """
+    This class implements the I/O statistics of a process manager. Refer to the module docstring for
+    more information.
+    """
+
+    def measure(self, op, path):
+        """
+        Return a context manager which measures operation 'op' on path (or command) 'path' (see
+        '_Measure').
+        """
+        return _Measure(self, op, path)
+
+    def is_nested(self):
+        """Return 'True' if the current thread is in the middle of a measured operation."""
+        return bool(getattr(self._tls, "depth", 0))
+
+    def account(self, op, path, nbytes, duration, failed=False):
+        """
+        Account operation 'op' on path (or command) 'path', which transferred 'nbytes' bytes and took
+        'duration' seconds.
+        """
+
+        pattern = get_pattern(op, path)
+
+        with self._lock:
+            for counters in (self._ops[op], self._groups.setdefault(pattern, _new_counters())):
+                counters["count"] += 1
+                counters["bytes"] += nbytes
+                counters["time"] += duration
+
+            if self._trace_fobj:
+                status = " FAILED" if failed else ""
+                path = str(path).replace("\n", "\\n")
+                self._trace_fobj.write(f"{time.time():.6f} {op} {path} {nbytes} "
+                                       f"{duration * 1000:.3f}ms{status}\n")
+
+    def wrap_method(self, name, method):
+        """Return a wrapper for process manager method 'name', which accounts the method calls."""
+
+        op = METHODS[name]
+
+        if name == "open":
+            def _open(path, mode):
+                """Open the file and wrap the file object."""
+
+                with self.measure(op, path):
+                    fobj = method(path, mode)
+                return _StatsFile(fobj, path, self)
+
+            return _open
+
+        if name == "read_many":
+            def _read_many(paths, *args, **kwargs):
+                """Read the files and account a read operation per file."""
+
+                paths = list(paths)
+                with self.measure(op, paths[0] if paths else "") as info:
+                    result = method(paths, *args, **kwargs)
+                    info["files"] = {path: _get_size(data) for path, data in result.items()}
+                return result
+
+            return _read_many
+
+        if name == "lsdir":
+            def _lsdir(path, *args, **kwargs):
+                """List the directory and account the operation."""
+
+                with self.measure(op, path):
+                    entries = list(method(path, *args, **kwargs))
+                return iter(entries)
+
+            return _lsdir
+
+        def _method(path, *args, **kwargs):
+            """Call the method and account the operation."""
+
+            with self.measure(op, path) as info:
+                result = method(path, *args, **kwargs)
+                if op == "read":
+                    info["bytes"] = _get_size(result)
+                elif op == "run" and isinstance(result, tuple):
+                    info["bytes"] = _get_size(result[:2])
+            return result
+
+        return _method
+
+    def get_stats(self):
+        """
+        Return the statistics dictionary. The keys are as follows.
+          * ops - an '{op: counters}' dictionary with the counters per operation (see 'OPS').
+          * groups - a '{pattern: counters}' dictionary with the counters per path pattern.
+
+        The counters are dictionaries with the following keys.
+          * count - count of operations.
+          * bytes - count of transferred bytes (or characters).
+          * time - the total wall time of the operations in seconds.
+        """
+
+        with self._lock:
+            return {"ops": {op: dict(counters) for op, counters in self._ops.items()},
+                    "groups": {name: dict(counters) for name, counters in self._groups.items()}}
+
+    def reset_stats(self):
+        """Reset the statistics."""
+
+        with self._lock:
+            self._ops = {op: _new_counters() for op in OPS}
+            self._groups = {}
+
+    def close(self):
+        """Uninitialize the class object."""
+
+        if getattr(self, "_trace_fobj", None):
+            self._trace_fobj.flush()
+        ClassHelpers.close(self, close_attrs=("_trace_fobj",))
+
+    def __init__(self, tracepath=None):
+        """
+        The class constructor. The 'tracepath' argument is path to the file to write the trace to.
+        Every accounted operation is written as a '<timestamp> <op> <path> <bytes> <time>' line.
+        """
+
+        self._lock = threading.Lock()
+        # The per-thread nesting depth of the measured operations.
+        self._tls = threading.local()
+
+        self._ops = {op: _new_counters() for op in OPS}
+        self._groups = {}
+
+        self._trace_fobj = None
+        if tracepath:
+            try:
+                # pylint: disable=consider-using-with
+                self._trace_fobj = open(tracepath, "w", encoding="utf-8", buffering=1)
+            except OSError as err:
+                msg = Error(err).indent(2)
+                raise Error(f"failed to open the I/O trace file '{tracepath}':\n{msg}") from None
+
+def format_stats(stats, hostmsg="", top=None):
+    """
+    Format the statistics dictionary 'stats' (see 'IOStats.get_stats()') and return the resulting
+    text. Print only 'top' path patterns which took the most time if 'top' is not 'None'.
+    """
+
+    lines = [f"I/O statistics{hostmsg}:"]
+
+    fmt = "  %-8s %8s %12s %12s"
+    lines.append(fmt % ("op", "count", "bytes", "time (ms)"))
+    for op, counters in stats["ops"].items():
+        if counters["count"]:
+            lines.append(fmt % (op, counters["count"], counters["bytes"],
+                                f"{counters['time'] * 1000:.1f}"))
+
+    groups = sorted(stats["groups"].items(), key=lambda item: item[1]["time"], reverse=True)
+    if top is not None:
+        groups = groups[:top]
+
+    if groups:
+        lines.append("")
+        fmt = "  %8s %12s %12s  %s"
+        lines.append(fmt % ("count", "bytes", "time (ms)", "path"))
+        for name, counters in groups:
+            lines.append(fmt % (counters["count"], counters["bytes"],
+                                f"{counters['time'] * 1000:.1f}", name))
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+# vim: ts=4 sw=4 tw=100 et ai si
+#
+# Copyright (C) 2023 Intel Corporation
+# SPDX-License-Identifier: BSD-3-Clause
+#
+# Author: Artem Bityutskiy <artem.bityutskiy@linux.intel.com>
+
+"""
+This module provides a process manager wrapper which emulates the network latency and bandwidth of
+a remote host, and counts the network round trips.
+
+The wrapper is meant for measuring and testing the remote host code paths without a remote host.
+Wrap an 'EmulProcessManager' or a 'LocalProcessManager' object, run the code under test, and check
+how many round trips it took. Every operation is assumed to cost one network round trip, which is
+the case for 'SSHProcessManager'. The operations are as follows.
+  * open - open a file ('open()').
+  * read - read from a file object, or read a whole file ('read()', 'read_small()', 'read_many()').
+  * write - write to a file object.
+  * run - run a command ('run()', 'run_verify()', 'run_async()').
+  * exists - check a file ('exists()', 'is_file()', 'is_dir()', etc).
+  * other - all the other file-system operations ('lsdir()', 'mkdir()', 'rmtree()', etc).
+
+Note, 'read_many()' costs one round trip in total, because 'SSHProcessManager' pipelines the
+requests.
+"""
+
+import time
+import threading
+from pepclibs.helperlibs import ClassHelpers
+from pepclibs.helperlibs.Exceptions import Error
+
+# The supported operation names.
+OPS = ("open", "read", "write", "run", "exists", "other")
+
+# The process manager methods to inject the latency into, and the operation names for them.
+_METHODS = {
+    "read": "read",
+    "read_small": "read",
+    "read_many": "read",
+    "run": "run",
+    "run_verify": "run",
+    "run_async": "run",
+    "exists": "exists",
+    "is_file": "exists",
+    "is_dir": "exists",
+    "is_exe": "exists",
+    "is_socket": "exists",
+    "shell_test": "exists",
+    "which": "exists",
+    "lsdir": "other",
+    "mkdir": "other",
+    "rmtree": "other",
+    "abspath": "other",
+    "mkdtemp": "other",
+    "get_mtime": "other",
+    "get_homedir": "other",
+}
+
+def _get_size(data):
+    """Return size of data 'data' in bytes (roughly, for the bandwidth emulation)."""
+
+    if isinstance(data, (str, bytes, bytearray)):
+        return len(data)
+    if isinstance(data, dict):
+        return sum(_get_size(val) for val in data.values())
+    if isinstance(data, (list, tuple)):
+        return sum(_get_size(val) for val in data)
+    return 0
+
+class _LatencyFile(ClassHelpers.SimpleCloseContext):
+    """A file object wrapper which injects latency into the 'read()' and 'write()' methods."""
+
+    def read(self, *args, **kwargs):
+        """Read from the file."""
+
+        data = self._fobj.read(*args, **kwargs)
+        self._lpman.inject("read", _get_size(data))
+        return data
+
+    def write(self, data):
+        """Write to the file."""
+
+        self._lpman.inject("write", _get_size(data))
+        return self._fobj.write(data)
+
+    def __iter__(self):
+        """Iterate over the file lines. Reads the entire file at once."""
+        return iter(self.read().splitlines(keepends=True))
+
+    def __getattr__(self, name):
+        """Forward all the other attributes to the wrapped file object."""
+        return getattr(self._fobj, name)
+
+    def close(self):
+        """Close the file."""
+
+        fobj = getattr(self, "_fobj", None)
+        if fobj:
+            fobj.close()
+        ClassHelpers.close(self, unref_attrs=("_fobj", "_lpman"))
+
+    def __init__(self, fobj, lpman):
+        """
+        The class constructor. The arguments are as follows.
+          * fobj - the file object to wrap.
+          * lpman - the 'LatencyProcessManager' object.
+        """
+
+        self._fobj = fobj
+        self._lpman = lpman
+
+class LatencyProcessManager(ClassHelpers.SimpleCloseContext):
+    """
+    A process manager wrapper which injects latency into the operations of the wrapped process
+    manager and counts them. Provides the same API as the wrapped process manager.
+    """
+
+    def inject(self, op, size=0):
+        """
+        Account operation 'op' transferring 'size' bytes, and sleep for the operation latency plus
+        the transfer time.
+        """
+
+        delay = self._latencies[op]
+        if self._bandwidth:
+            delay += size / self._bandwidth
+
+        with self._lock:
+            self._counts[op] += 1
+            self._bytes += size
+            self._delay += delay
+
+        if delay and self._sleep:
+            time.sleep(delay)
+
+    def get_stats(self):
+        """
+        Return the statistics dictionary. The keys are as follows.
+          * rtts - the total count of round trips.
+          * ops - the '{op: count}' dictionary with the round trips count per operation.
+          * bytes - the total count of transferred bytes.
+          * delay - the total injected delay in seconds.
+        """
+
+        with self._lock:
+            return {"rtts": sum(self._counts.values()), "ops": dict(self._counts),
+                    "bytes": self._bytes, "delay": self._delay}
+
+    def reset_stats(self):
+        """Reset the statistics."""
+
+        with self._lock:
+            self._counts = dict.fromkeys(OPS, 0)
+            self._bytes = 0
+            self._delay = 0
+
+    def open(self, path, mode):
+        """Open file 'path' and return a file object wrapper which injects latency."""
+
+        self.inject("open")
+        return _LatencyFile(self._pman.open(path, mode), self)
+
+    def __getattr__(self, name):
+        """Forward the attributes to the wrapped process manager, inject latency if needed."""
+
+        val = getattr(self._pman, name)
+
+        op = _METHODS.get(name)
+        if not op:
+            return val
+
+        def _method(*args, **kwargs):
+            """Run the wrapped method and inject the latency."""
+
+            result = val(*args, **kwargs)
+            if name == "lsdir":
+                result = list(result)
+            self.inject(op, _get_size(result))
+            if name == "lsdir":
+                return iter(result)
+            return result
+
+        return _method
+
+    def close(self):
+        """Uninitialize the class object."""
+        ClassHelpers.close(self, unref_attrs=("_pman",))
+
+    def __init__(self, pman, latency=0, latencies=None, bandwidth=None, remote=True, sleep=True):
+        """
+        The class constructor. The arguments are as follows.
+          * pman - the process manager object to wrap. It is not closed when this object is closed.
+          * latency - the round trip latency in seconds for all operations.
+          * latencies - an '{op: latency}' dictionary for overriding 'latency' for particular
+                        operations (see 'OPS').
+          * bandwidth - the bandwidth in bytes per second ('None' means infinite).
+          * remote - if 'True', pretend that the host is remote, so that the remote host code paths
+                     are used.
+          * sleep - if 'False', do not sleep, but only account the delay (see 'get_stats()').
+        """
+
+        self._pman = pman
+        self._bandwidth = bandwidth
+        self._sleep = sleep
+
+        self._latencies = dict.fromkeys(OPS, latency)
+        if latencies:
+            for op, val in latencies.items():
+                if op not in OPS:
+                    raise Error(f"unknown operation '{op}', use one of: {', '.join(OPS)}")
+                self._latencies[op] = val
+
+        self.hostname = pman.hostname
+        self.hostmsg = pman.hostmsg
+        self.is_remote = pman.is_remote or remote
+
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(OPS, 0)
+        self._bytes = 0
+        self._delay = 0
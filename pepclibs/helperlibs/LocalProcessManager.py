@@ -18,6 +18,7 @@ import shlex
 import errno
 import shutil
 import logging
+import selectors
 import subprocess
 from pathlib import Path
 from operator import itemgetter
@@ -28,6 +29,9 @@ from pepclibs.helperlibs.Exceptions import ErrorNotFound, ErrorExists
 
 _LOG = logging.getLogger()
 
+# The initial size of the 'read_small()' buffer in bytes.
+_READ_SMALL_BUFSIZE = 4096
+
 class LocalProcess(_ProcessManagerBase.ProcessBase):
     """
     This class represents a process that was executed by 'LocalProcessManager'.
@@ -51,16 +55,63 @@ class LocalProcess(_ProcessManagerBase.ProcessBase):
 
         raise Error(f"received 'EAGAIN' error {retries} times")
 
+    def _wait_for_streams(self, timeout):
+        """
+        Wait for up to 'timeout' seconds for the stdout or stderr pipes of the process to become
+        readable. Refer to 'ProcessBase._wait_for_streams()' for more information.
+        """
+
+        if not self._selector:
+            self._selector = selectors.DefaultSelector()
+            for streamid in (0, 1):
+                if self._streams[streamid]:
+                    self._selector.register(self._streams[streamid], selectors.EVENT_READ,
+                                            data=streamid)
+
+        # Stop watching the streams that reached the end of file, they are always readable.
+        for key in list(self._selector.get_map().values()):
+            if self._eof[key.data]:
+                self._selector.unregister(key.fileobj)
+
+        if not self._selector.get_map():
+            return []
+
+        return [key.data for key, _ in self._selector.select(timeout=timeout)]
+
     def _wait_timeout(self, timeout):
         """Wait for process to finish with a timeout."""
 
         pobj = self.pobj
         self._dbg("_wait_timeout: waiting for exit status, timeout %s sec", timeout)
-        try:
-            exitcode = pobj.wait(timeout=timeout)
-        except subprocess.TimeoutExpired:
-            self._dbg("_wait_timeout: exit status not ready for %s seconds", timeout)
-            return None
+
+        exitcode = pobj.poll()
+        if exitcode is None and timeout and hasattr(os, "pidfd_open"):
+            # 'Popen.wait()' with a timeout polls the process with sleeps in between, which adds
+            # latency. Wait for the process to exit using the process file descriptor instead.
+            try:
+                pidfd = os.pidfd_open(pobj.pid)
+            except OSError:
+                pidfd = None
+
+            if pidfd is not None:
+                try:
+                    with selectors.DefaultSelector() as selector:
+                        selector.register(pidfd, selectors.EVENT_READ)
+                        selector.select(timeout=timeout)
+                finally:
+                    os.close(pidfd)
+
+                exitcode = pobj.poll()
+                if exitcode is None:
+                    self._dbg("_wait_timeout: exit status not ready for %s seconds", timeout)
+                    return None
+
+        if exitcode is None:
+            try:
+                exitcode = pobj.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                self._dbg("_wait_timeout: exit status not ready for %s seconds", timeout)
+                return None
 
         self._dbg("_wait_timeout: exit status %d", exitcode)
         return exitcode
@@ -95,8 +146,7 @@ class LocalProcess(_ProcessManagerBase.ProcessBase):
             else:
                 self._dbg("_wait: stream %d closed", streamid)
                 # One of the output streams closed.
-                self._threads[streamid].join()
-                self._threads[streamid] = self._streams[streamid] = None
+                self._streams[streamid] = None
 
                 if not self._streams[0] and not self._streams[1]:
                     self._dbg("_wait: both streams closed")
@@ -318,6 +368,66 @@ class LocalProcessManager(_ProcessManagerBase.ProcessManagerBase):
         # Make sure all file methods raise only exceptions derived from 'Error'.
         return ClassHelpers.WrapExceptions(fobj, get_err_prefix=get_err_prefix)
 
+    def read_small(self, path, must_exist=True):
+        """
+        Read a small file at path 'path', such as a sysfs or procfs file. Refer to
+        '_ProcessManagerBase.ProcessManagerBase().read_small()' for more information.
+
+        Compared to 'read()', this method does not create a Python file object and does not wrap it
+        with 'ClassHelpers.WrapExceptions', but reads the file with 'os.read()' into a reused
+        buffer.
+        """
+
+        # Take the buffer, so that a concurrent caller would allocate its own one.
+        buf, self._rbuf = self._rbuf, None
+        if buf is None:
+            buf = bytearray(_READ_SMALL_BUFSIZE)
+
+        try:
+            fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+        except FileNotFoundError:
+            self._rbuf = buf
+            if must_exist:
+                raise ErrorNotFound(f"file '{path}' does not exist{self.hostmsg}") from None
+            return None
+        except PermissionError as err:
+            self._rbuf = buf
+            msg = Error(err).indent(2)
+            raise ErrorPermissionDenied(f"failed to open file '{path}':\n{msg}") from None
+        except OSError as err:
+            self._rbuf = buf
+            msg = Error(err).indent(2)
+            raise Error(f"failed to open file '{path}':\n{msg}") from None
+
+        try:
+            size = 0
+            view = memoryview(buf)
+            while True:
+                count = os.readv(fd, (view[size:],))
+                if not count:
+                    break
+                size += count
+                if size == len(buf):
+                    # The file is larger than the buffer, grow it.
+                    view.release()
+                    buf.extend(bytes(len(buf)))
+                    view = memoryview(buf)
+
+            data = view[:size].tobytes()
+            view.release()
+        except OSError as err:
+            msg = Error(err).indent(2)
+            raise Error(f"failed to read file '{path}':\n{msg}") from None
+        finally:
+            os.close(fd)
+            self._rbuf = buf
+
+        try:
+            return data.decode("utf-8")
+        except UnicodeError as err:
+            msg = Error(err).indent(2)
+            raise Error(f"failed to decode contents of file '{path}':\n{msg}") from None
+
     @staticmethod
     def time_time():
         """
@@ -550,3 +660,6 @@ class LocalProcessManager(_ProcessManagerBase.ProcessManagerBase):
         self.is_remote = False
         self.hostname = "localhost"
         self.hostmsg = ""
+
+        # The buffer reused by 'read_small()'.
+        self._rbuf = None
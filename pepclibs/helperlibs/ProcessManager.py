@@ -28,7 +28,7 @@ def _check_for_none(hostname, **kwargs):
             raise Error(f"BUG: get_pman: hostname is '{hostname}', but argument '{name}' is not "
                         f"'None'. Instead, it is '{val}'")
 
-def get_pman(hostname, username=None, privkeypath=None, timeout=None):
+def get_pman(hostname, username=None, privkeypath=None, timeout=None, broker=False):
     """
     Creates and returns a process manager object for host 'hostname'. At the moment there are
     basically 3 possibilities.
@@ -51,10 +51,13 @@ def get_pman(hostname, username=None, privkeypath=None, timeout=None):
       * username - the user name to use for logging into the 'hostname' host over SSH.
       * privkeypath - path to SSH private key to use for logging into the host.
       * timeout - the SSH connection time out in seconds.
+      * broker - if 'True', use the SSH connection kept by the SSH broker process instead of
+                 establishing a new SSH connection (see the 'SSHBroker' module). The broker is
+                 started if it is not running.
 
     The 'hostname' argument is used for all types of process managers. The 'username',
-    'privkeypath', and 'timeout' arguments are used only for 'SSHProcessManager'. Have to be 'None'
-    for everything else.
+    'privkeypath', 'timeout' and 'broker' arguments are used only for 'SSHProcessManager'. Have to
+    be 'None' for everything else ('broker' is ignored).
 
     Notes.
     1. The preferred way of using this method is with the 'with' statement:
@@ -81,6 +84,11 @@ def get_pman(hostname, username=None, privkeypath=None, timeout=None):
         from pepclibs.helperlibs import EmulProcessManager
 
         pman = EmulProcessManager.EmulProcessManager(hostname=hostname)
+    elif broker:
+        from pepclibs.helperlibs import SSHBroker
+
+        pman = SSHBroker.get_pman(hostname=hostname, username=username, privkeypath=privkeypath,
+                                  timeout=timeout)
     else:
         from pepclibs.helperlibs import SSHProcessManager
 
@@ -0,0 +1,729 @@
+# -*- coding: utf-8 -*-
+# vim: ts=4 sw=4 tw=100 et ai si
+#
+# Copyright (C) 2023 Intel Corporation
+# SPDX-License-Identifier: BSD-3-Clause
+#
+# Author: Artem Bityutskiy <artem.bityutskiy@linux.intel.com>
+
+"""
+This module implements the SSH connection broker, which is similar in spirit to the OpenSSH
+"ControlMaster" feature.
+
+Establishing an SSH connection is expensive: it includes SSH configuration look-up, TCP connection,
+key exchange and authentication. Then the SFTP sessions and interactive shells have to be started as
+well. For short-living programs, like 'pepc', this often takes more time than the actual work.
+
+The broker is a local background process which keeps the 'SSHProcessManager' objects, along with
+their SSH transports, SFTP sessions and interactive shells, alive between program invocations. The
+programs connect to the broker over a Unix socket and get a process manager object which forwards
+all the method calls to the broker's 'SSHProcessManager' object for the same host. Objects returned
+by the methods (e.g., file objects returned by 'open()' or processes returned by 'run_async()') stay
+in the broker as well, and the caller gets forwarding objects instead.
+
+The broker is started on first use and exits when it was not used for 'IDLE_TIMEOUT' seconds. A
+connection to a host is closed when it was not used for 'IDLE_TIMEOUT' seconds as well.
+
+The Unix socket is only accessible to the user who started the broker, because the broker runs
+whatever the clients ask it to run. The socket directory must be owned by the user and must not be
+accessible to other users, and both the broker and the clients check that the other side of the
+socket runs as the same user. The messages are JSON documents which include only data (see
+'_encode()'), so a message can not make the receiving side run any code.
+"""
+
+import os
+import sys
+import json
+import stat
+import time
+import fcntl
+import types
+import errno
+import base64
+import socket
+import struct
+import builtins
+import logging
+import threading
+import contextlib
+import subprocess
+from pathlib import PurePath, Path
+from pepclibs.helperlibs import ClassHelpers, Exceptions
+from pepclibs.helperlibs.Exceptions import Error, ErrorConnect, ErrorPermissionDenied
+from pepclibs.helperlibs._ProcessManagerBase import ProcResult, ProcessBase
+
+_LOG = logging.getLogger()
+
+# Close connections to hosts and exit the broker after this many seconds of inactivity.
+IDLE_TIMEOUT = 10 * 60
+
+# How long to wait for a newly started broker to create the socket, in seconds.
+_START_TIMEOUT = 10
+
+# The message header: the message length.
+_HDR = struct.Struct("!I")
+
+# The built-in exceptions which are sent to the other side with the type preserved. Other exceptions
+# (except for the exceptions of the 'Exceptions' module) become 'Error' exceptions.
+_BUILTIN_ERRORS = ("StopIteration", "KeyError", "ValueError", "TypeError", "AttributeError",
+                   "NotImplementedError", "EOFError", "OSError", "FileNotFoundError",
+                   "PermissionError")
+
+# The value returned by the "getattr" request for methods.
+_METHOD = object()
+
+def get_socket_path():
+    """Return path to the Unix socket of the broker."""
+
+    basedir = os.environ.get("XDG_RUNTIME_DIR")
+    if basedir:
+        return Path(basedir) / "pepc" / "ssh-broker.sock"
+    return Path(f"/tmp/pepc-{os.getuid()}") / "ssh-broker.sock"
+
+def _prepare_sockdir(sockdir):
+    """
+    Create the socket directory 'sockdir' if it does not exist, and make sure it is owned by the
+    current user and is not accessible to other users.
+    """
+
+    try:
+        sockdir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        st = os.lstat(sockdir)
+    except OSError as err:
+        msg = Error(err).indent(2)
+        raise Error(f"failed to create the SSH broker socket directory '{sockdir}':\n{msg}") \
+                    from None
+
+    if not stat.S_ISDIR(st.st_mode):
+        raise ErrorPermissionDenied(f"refusing to use the SSH broker socket directory '{sockdir}': "
+                                    f"not a directory")
+    if st.st_uid != os.getuid():
+        raise ErrorPermissionDenied(f"refusing to use the SSH broker socket directory '{sockdir}': "
+                                    f"owned by UID {st.st_uid}, expected UID {os.getuid()}")
+    if stat.S_IMODE(st.st_mode) != 0o700:
+        raise ErrorPermissionDenied(f"refusing to use the SSH broker socket directory '{sockdir}': "
+                                    f"mode is {stat.S_IMODE(st.st_mode):#o}, expected 0o700")
+
+def _get_peer_uid(sock):
+    """Return UID of the process on the other side of Unix socket 'sock'."""
+
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    return struct.unpack("3i", creds)[1]
+
+def _encode(obj, get_handle):
+    """
+    Encode object 'obj' to a JSON-compatible data structure. The arguments are as follows.
+      * obj - the object to encode.
+      * get_handle - a function which is called for objects which can not be sent by value. It
+                     returns the '(hid, typename)' tuple, where 'hid' is the handle of the object,
+                     and 'typename' is name of the object type.
+
+    Only lists and scalars are encoded as is, the other objects are encoded as '{"t": <tag>, ...}'
+    dictionaries.
+    """
+
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+    if isinstance(obj, list):
+        return [_encode(val, get_handle) for val in obj]
+    if isinstance(obj, ProcResult):
+        return {"t": "procresult", "v": [_encode(val, get_handle) for val in obj]}
+    if isinstance(obj, tuple):
+        return {"t": "tuple", "v": [_encode(val, get_handle) for val in obj]}
+    if isinstance(obj, dict):
+        return {"t": "dict", "v": [[_encode(key, get_handle), _encode(val, get_handle)]
+                                   for key, val in obj.items()]}
+    if isinstance(obj, (set, frozenset)):
+        return {"t": "set", "v": [_encode(val, get_handle) for val in obj]}
+    if isinstance(obj, (bytes, bytearray)):
+        return {"t": "bytes", "v": base64.b64encode(obj).decode("ascii")}
+    if isinstance(obj, PurePath):
+        return {"t": "path", "v": str(obj)}
+    if isinstance(obj, BaseException):
+        return {"t": "error", "type": type(obj).__name__, "v": str(obj)}
+    if obj is _METHOD:
+        return {"t": "method"}
+
+    hid, typename = get_handle(obj)
+    return {"t": "handle", "v": hid, "type": typename}
+
+def _decode_error(typename, msg):
+    """Create and return an exception object of type named 'typename' with message 'msg'."""
+
+    cls = getattr(Exceptions, typename, None)
+    if isinstance(cls, type) and issubclass(cls, Error):
+        return cls(msg)
+    if typename in _BUILTIN_ERRORS:
+        return getattr(builtins, typename)(msg)
+    return Error(msg)
+
+def _decode(data, load_handle):
+    """
+    Decode data structure 'data' created by '_encode()'. The 'load_handle' function is called for
+    the handles, and it returns the object for the handle. The arguments of the function are the
+    handle and the object type name.
+    """
+
+    if isinstance(data, list):
+        return [_decode(val, load_handle) for val in data]
+    if not isinstance(data, dict):
+        return data
+
+    tag = data.get("t")
+    if tag == "tuple":
+        return tuple(_decode(val, load_handle) for val in data["v"])
+    if tag == "dict":
+        return {_decode(key, load_handle): _decode(val, load_handle) for key, val in data["v"]}
+    if tag == "set":
+        return {_decode(val, load_handle) for val in data["v"]}
+    if tag == "procresult":
+        return ProcResult(*[_decode(val, load_handle) for val in data["v"]])
+    if tag == "bytes":
+        return base64.b64decode(data["v"])
+    if tag == "path":
+        return Path(data["v"])
+    if tag == "error":
+        return _decode_error(data["type"], data["v"])
+    if tag == "method":
+        return _METHOD
+    if tag == "handle":
+        return load_handle(data["v"], data["type"])
+
+    raise Error(f"bad SSH broker message: unknown tag '{tag}'")
+
+def _dump_msg(obj, get_handle):
+    """Encode object 'obj' (see '_encode()') and return the message bytes."""
+    return json.dumps(_encode(obj, get_handle)).encode("utf-8")
+
+def _load_msg(data, load_handle):
+    """Decode message 'data' (see '_decode()') and return the resulting object."""
+
+    try:
+        return _decode(json.loads(data.decode("utf-8")), load_handle)
+    except (ValueError, KeyError, TypeError) as err:
+        raise Error(f"bad SSH broker message: {err}") from None
+
+def _send_msg(sock, data):
+    """Send message 'data' (bytes) over socket 'sock'."""
+    sock.sendall(_HDR.pack(len(data)) + data)
+
+def _recv_exact(sock, size):
+    """Receive exactly 'size' bytes from socket 'sock'. Return 'None' if the socket was closed."""
+
+    buf = bytearray()
+    while len(buf) < size:
+        data = sock.recv(size - len(buf))
+        if not data:
+            return None
+        buf += data
+    return bytes(buf)
+
+def _recv_msg(sock):
+    """Receive a message from socket 'sock'. Return 'None' if the socket was closed."""
+
+    hdr = _recv_exact(sock, _HDR.size)
+    if hdr is None:
+        return None
+    return _recv_exact(sock, _HDR.unpack(hdr)[0])
+
+class _Host:
+    """A connection to a host kept by the broker."""
+
+    def __init__(self, pman):
+        """The class constructor."""
+
+        self.pman = pman
+        # Count of the clients using the connection.
+        self.users = 0
+        # The last time the connection was used.
+        self.last_used = time.monotonic()
+
+class _Session:
+    """A client session in the broker."""
+
+    def add_handle(self, obj):
+        """Add object 'obj' to the handles table and return its handle."""
+
+        hid = self._obj2hid.get(id(obj))
+        if hid is None:
+            self._hcount += 1
+            hid = self._hcount
+            self._handles[hid] = obj
+            self._obj2hid[id(obj)] = hid
+        return hid
+
+    def get_handle_info(self, obj):
+        """Return the '(hid, typename)' tuple for object 'obj' (see '_encode()')."""
+        return self.add_handle(obj), type(obj).__qualname__
+
+    def get_handle(self, hid, typename=None): # pylint: disable=unused-argument
+        """Return the object for handle 'hid'."""
+
+        try:
+            return self._handles[hid]
+        except KeyError:
+            raise Error(f"BUG: bad SSH broker object handle {hid}") from None
+
+    def _release(self, hid):
+        """Remove handle 'hid' from the handles table."""
+
+        obj = self._handles.pop(hid, None)
+        if obj is not None:
+            self._obj2hid.pop(id(obj), None)
+        self._owned.discard(hid)
+
+    def _handle_request(self, req):
+        """Handle request 'req' and return the result."""
+
+        op = req[0]
+        if op == "attach":
+            self._host = self._broker.attach(req[1])
+            return self.add_handle(self._host.pman)
+
+        if not self._host:
+            raise Error("BUG: the SSH broker client is not attached to a host")
+
+        self._host.last_used = time.monotonic()
+
+        if op == "release":
+            self._release(req[1])
+            return None
+
+        obj = self.get_handle(req[1])
+        if op == "getattr":
+            val = getattr(obj, req[2])
+            # Call methods and functions in the broker (e.g., static methods, or methods wrapped by
+            # 'enable_stats()').
+            if callable(val) and not isinstance(val, type):
+                return _METHOD
+            return val
+
+        if op == "call":
+            result = getattr(obj, req[2])(*req[3], **req[4])
+            if isinstance(result, types.GeneratorType):
+                result = list(result)
+            elif isinstance(result, ProcessBase) or (obj is self._host.pman and req[2] == "open"):
+                # The processes and files created by the client are closed when the client
+                # disconnects, in case the client did not close them.
+                self._owned.add(self.add_handle(result))
+            return result
+
+        raise Error(f"BUG: bad SSH broker request '{op}'")
+
+    def serve(self):
+        """Serve the client until it disconnects."""
+
+        try:
+            while True:
+                data = _recv_msg(self._sock)
+                if data is None:
+                    break
+
+                try:
+                    req = _load_msg(data, self.get_handle)
+                    resp = ("ok", self._handle_request(req))
+                except Exception as err: # pylint: disable=broad-except
+                    resp = ("err", err)
+
+                try:
+                    data = _dump_msg(resp, self.get_handle_info)
+                except Exception as err: # pylint: disable=broad-except
+                    data = _dump_msg(("err", Error(str(err))), self.get_handle_info)
+                _send_msg(self._sock, data)
+        except OSError:
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        """Close the session and all the objects the client did not close."""
+
+        if self._host:
+            for hid in self._owned:
+                with contextlib.suppress(Exception):
+                    self._handles[hid].close()
+            self._broker.detach(self._host)
+            self._host = None
+
+        self._handles = {}
+        self._obj2hid = {}
+        self._owned = set()
+        self._sock.close()
+
+    def __init__(self, broker, sock):
+        """The class constructor."""
+
+        self._broker = broker
+        self._sock = sock
+
+        # The host the client is attached to.
+        self._host = None
+        # The objects the client has handles for.
+        self._handles = {}
+        # Python object ID -> handle.
+        self._obj2hid = {}
+        self._hcount = 0
+        # Handles of the objects to close when the client disconnects.
+        self._owned = set()
+
+class _Broker:
+    """The SSH connection broker."""
+
+    def attach(self, kwargs):
+        """
+        Return the '_Host' object for the SSH connection defined by 'kwargs' (the 'SSHProcessManager'
+        constructor arguments). Establish the connection if necessary.
+        """
+
+        # pylint: disable=import-outside-toplevel
+        from pepclibs.helperlibs import SSHProcessManager
+
+        key = tuple(sorted((name, str(val)) for name, val in kwargs.items()))
+
+        with self._lock:
+            host = self._hosts.get(key)
+            if host:
+                transport = host.pman.ssh.get_transport()
+                if not transport or not transport.is_active():
+                    del self._hosts[key]
+                    with contextlib.suppress(Exception):
+                        host.pman.close()
+                    host = None
+            if host:
+                host.users += 1
+                return host
+
+        pman = SSHProcessManager.SSHProcessManager(**kwargs)
+
+        with self._lock:
+            if key in self._hosts:
+                # Another client has connected to the same host meanwhile.
+                pman.close()
+            else:
+                self._hosts[key] = _Host(pman)
+
+            host = self._hosts[key]
+            host.users += 1
+            return host
+
+    def detach(self, host):
+        """Detach a client from host 'host'."""
+
+        with self._lock:
+            host.users -= 1
+            host.last_used = time.monotonic()
+            self._last_used = host.last_used
+
+    def _evict(self):
+        """Close idle connections. Return 'True' if the broker is idle and should exit."""
+
+        now = time.monotonic()
+        with self._lock:
+            for key, host in list(self._hosts.items()):
+                if not host.users and now - host.last_used >= self._idle_timeout:
+                    del self._hosts[key]
+                    with contextlib.suppress(Exception):
+                        host.pman.close()
+
+            return not self._hosts and now - self._last_used >= self._idle_timeout
+
+    def serve(self):
+        """Accept clients until the broker has been idle for too long."""
+
+        self._sock.settimeout(min(self._idle_timeout / 4, 10))
+
+        while True:
+            try:
+                sock, _ = self._sock.accept()
+            except socket.timeout:
+                if self._evict():
+                    break
+                continue
+
+            # Accept only the clients running as the same user.
+            if _get_peer_uid(sock) != os.getuid():
+                sock.close()
+                continue
+
+            with self._lock:
+                self._last_used = time.monotonic()
+
+            sock.settimeout(None)
+            session = _Session(self, sock)
+            threading.Thread(target=session.serve, daemon=True).start()
+
+    def close(self):
+        """Uninitialize the class object."""
+
+        for host in self._hosts.values():
+            with contextlib.suppress(Exception):
+                host.pman.close()
+        self._hosts = {}
+
+        if self._sock:
+            with contextlib.suppress(OSError):
+                self._sockpath.unlink()
+            self._sock.close()
+            self._sock = None
+
+    def __init__(self, sock, sockpath, idle_timeout):
+        """The class constructor."""
+
+        self._sock = sock
+        self._sockpath = sockpath
+        self._idle_timeout = idle_timeout
+
+        # The connections to the hosts, indexed by the connection parameters.
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self._last_used = time.monotonic()
+
+def serve(sockpath=None, idle_timeout=IDLE_TIMEOUT):
+    """
+    Run the broker: listen on Unix socket 'sockpath' (default is 'get_socket_path()') and serve the
+    clients. Return when the broker was idle for 'idle_timeout' seconds. If another broker is
+    already listening on 'sockpath', return right away.
+    """
+
+    if not sockpath:
+        sockpath = get_socket_path()
+    sockpath = Path(sockpath)
+
+    _prepare_sockdir(sockpath.parent)
+
+    with open(f"{sockpath}.lock", "w", encoding="utf-8") as lockfobj:
+        try:
+            fcntl.flock(lockfobj, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError as err:
+            if err.errno in (errno.EAGAIN, errno.EACCES):
+                # Another broker is running.
+                return
+            raise
+
+        with contextlib.suppress(FileNotFoundError):
+            sockpath.unlink()
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o077)
+        try:
+            sock.bind(str(sockpath))
+        finally:
+            os.umask(old_umask)
+        sock.listen()
+
+        broker = _Broker(sock, sockpath, idle_timeout)
+        try:
+            broker.serve()
+        finally:
+            broker.close()
+
+def _start_broker(sockpath, idle_timeout):
+    """Start the broker process in background."""
+
+    srcdir = Path(__file__).parents[2]
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, (str(srcdir), env.get("PYTHONPATH"))))
+
+    code = "from pepclibs.helperlibs import SSHBroker; " \
+           f"SSHBroker.serve({str(sockpath)!r}, idle_timeout={idle_timeout!r})"
+
+    _LOG.debug("starting the SSH broker, socket '%s'", sockpath)
+    # pylint: disable=consider-using-with
+    subprocess.Popen([sys.executable, "-c", code], stdin=subprocess.DEVNULL,
+                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env,
+                     start_new_session=True)
+
+class _Connection:
+    """A client connection to the broker."""
+
+    def request(self, req):
+        """Send request 'req' to the broker and return the result."""
+
+        data = _dump_msg(req, _get_proxy_handle_info)
+
+        with self._lock:
+            if not self._sock:
+                raise Error("the SSH broker connection is closed")
+            try:
+                _send_msg(self._sock, data)
+                data = _recv_msg(self._sock)
+            except OSError as err:
+                raise Error(f"SSH broker communication error: {err}") from None
+
+        if data is None:
+            raise Error("the SSH broker closed the connection")
+
+        status, result = _load_msg(data, self._get_proxy)
+        if status == "err":
+            raise result
+        return result
+
+    def _get_proxy(self, hid, typename):
+        """Return a forwarding object for handle 'hid' of a remote object of type 'typename'."""
+        return _ObjectProxy(self, hid, typename)
+
+    def close(self):
+        """Close the connection."""
+
+        with self._lock:
+            if self._sock:
+                self._sock.close()
+                self._sock = None
+
+    def __init__(self, sock):
+        """The class constructor."""
+
+        self._sock = sock
+        self._lock = threading.Lock()
+
+def _get_proxy_handle_info(obj):
+    """Return the '(hid, typename)' tuple for forwarding object 'obj' (see '_encode()')."""
+
+    if isinstance(obj, _ObjectProxy):
+        return object.__getattribute__(obj, "_hid"), object.__getattribute__(obj, "_typename")
+    raise Error(f"BUG: can't send an object of type '{type(obj).__name__}' to the SSH broker")
+
+class _ObjectProxy:
+    """
+    A forwarding object: forward all the attribute look-ups and method calls to an object which
+    stays in the broker.
+    """
+
+    # Names of methods of the remote objects, indexed by the object type name.
+    _methods = {}
+
+    def _call(self, name, *args, **kwargs):
+        """Call method 'name' of the remote object."""
+        return self._conn.request(("call", self._hid, name, args, kwargs))
+
+    def __getattr__(self, name):
+        """Return the remote object attribute 'name'."""
+
+        if name.startswith("__"):
+            raise AttributeError(name)
+
+        methods = _ObjectProxy._methods.setdefault(self._typename, set())
+        if name not in methods:
+            val = self._conn.request(("getattr", self._hid, name))
+            if val is not _METHOD:
+                return val
+            methods.add(name)
+
+        def _method(*args, **kwargs):
+            """Forward the method call to the broker."""
+            return self._call(name, *args, **kwargs)
+
+        return _method
+
+    def __iter__(self):
+        """Return the iterator for the remote object."""
+        return self._call("__iter__")
+
+    def __next__(self):
+        """Return the next item of the remote iterator."""
+        return self._call("__next__")
+
+    def __enter__(self):
+        """Enter the runtime context."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Exit the runtime context."""
+        self.close()
+
+    def close(self):
+        """Close the remote object and release the handle."""
+
+        with contextlib.suppress(Error):
+            self._call("close")
+        with contextlib.suppress(Error):
+            self._conn.request(("release", self._hid))
+
+    def __init__(self, conn, hid, typename):
+        """
+        The class constructor. The arguments are as follows.
+          * conn - the '_Connection' object to the broker.
+          * hid - the remote object handle.
+          * typename - name of the remote object type.
+        """
+
+        self._conn = conn
+        self._hid = hid
+        self._typename = typename
+
+class BrokerProcessManager(_ObjectProxy):
+    """
+    A process manager which forwards everything to the 'SSHProcessManager' object in the broker.
+    Provides the same API as 'SSHProcessManager'.
+    """
+
+    def close(self):
+        """Detach from the broker. The connection to the host is kept by the broker."""
+
+        conn = getattr(self, "_conn", None)
+        if conn:
+            conn.close()
+        ClassHelpers.close(self, unref_attrs=("_conn",))
+
+    def __init__(self, conn, hid):
+        """The class constructor."""
+
+        super().__init__(conn, hid, "SSHProcessManager")
+
+        # These attributes never change, so fetch them only once.
+        self.hostname = self.__getattr__("hostname")
+        self.hostmsg = self.__getattr__("hostmsg")
+        self.is_remote = True
+
+def _connect(sockpath):
+    """Connect to the broker socket 'sockpath'. Return the socket or 'None' on failure."""
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(sockpath))
+    except OSError:
+        sock.close()
+        return None
+
+    # Talk only to a broker running as the same user.
+    uid = _get_peer_uid(sock)
+    if uid != os.getuid():
+        sock.close()
+        raise ErrorPermissionDenied(f"refusing to use the SSH broker socket '{sockpath}': the "
+                                    f"broker runs as UID {uid}, expected UID {os.getuid()}")
+    return sock
+
+def get_pman(sockpath=None, idle_timeout=IDLE_TIMEOUT, **kwargs):
+    """
+    Return a process manager object for a host, which uses the SSH connection kept by the broker.
+    Start the broker if it is not running. The arguments are as follows.
+      * sockpath - path to the broker Unix socket, default is 'get_socket_path()'.
+      * idle_timeout - the idle timeout for the broker, in case it has to be started.
+      * kwargs - the 'SSHProcessManager' constructor arguments defining the host to connect to.
+    """
+
+    if not sockpath:
+        sockpath = get_socket_path()
+    sockpath = Path(sockpath)
+
+    _prepare_sockdir(sockpath.parent)
+
+    sock = _connect(sockpath)
+    if not sock:
+        _start_broker(sockpath, idle_timeout)
+
+        start_time = time.monotonic()
+        while not sock:
+            if time.monotonic() - start_time > _START_TIMEOUT:
+                raise ErrorConnect(f"failed to start the SSH broker: socket '{sockpath}' did "
+                                   f"not appear in {_START_TIMEOUT} seconds")
+            time.sleep(0.05)
+            sock = _connect(sockpath)
+
+    conn = _Connection(sock)
+    try:
+        hid = conn.request(("attach", kwargs))
+        return BrokerProcessManager(conn, hid)
+    except BaseException:
+        conn.close()
+        raise
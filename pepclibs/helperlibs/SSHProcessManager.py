@@ -42,11 +42,13 @@ import types
 import shlex
 import random
 import logging
+import selectors
 import threading
 import contextlib
 from pathlib import Path
 from operator import itemgetter
 import paramiko
+from paramiko import sftp as _sftp
 from pepclibs.helperlibs import _ProcessManagerBase, ClassHelpers, Trivial
 from pepclibs.helperlibs._ProcessManagerBase import ProcResult # pylint: disable=unused-import
 from pepclibs.helperlibs.Exceptions import Error, ErrorPermissionDenied, ErrorTimeOut, ErrorConnect
@@ -57,6 +59,33 @@ _LOG = logging.getLogger()
 # Paramiko is a bit too noisy, lower its log level.
 logging.getLogger("paramiko").setLevel(logging.WARNING)
 
+# Maximum count of interactive shell sessions in the pool.
+_INTSH_POOL_SIZE = 4
+# Maximum count of SFTP sessions in the pool used by 'read_many()'.
+_SFTP_POOL_SIZE = 4
+# Maximum count of SFTP requests 'read_many()' keeps in flight.
+_SFTP_PIPELINE_DEPTH = 64
+# Size of a single SFTP read request.
+_SFTP_READ_SIZE = 32768
+
+class _SFTPResponses():
+    """
+    Collect responses to pipelined SFTP requests. Paramiko's SFTP client passes responses to
+    asynchronous requests to the '_async_response()' method of the object the request was sent
+    with.
+    """
+
+    def _async_response(self, rtype, msg, num):
+        """Save response 'msg' of type 'rtype' for request number 'num'."""
+
+        self.responses[num] = (rtype, msg)
+
+    def __init__(self):
+        """The class constructor."""
+
+        # The responses received so far, indexed by the request number.
+        self.responses = {}
+
 class SSHProcess(_ProcessManagerBase.ProcessBase):
     """
     This class represents a remote process that was executed by 'SSHProcessManager'.
@@ -70,6 +99,42 @@ class SSHProcess(_ProcessManagerBase.ProcessBase):
         except BaseException as err:
             raise Error(str(err)) from err
 
+    def _get_ready_streams(self):
+        """
+        Return the list of stream IDs which can be read without blocking, including the streams
+        that reached the end of file.
+        """
+
+        chan = self.pobj
+        eof = chan.eof_received or chan.closed
+
+        streamids = []
+        for streamid, ready in ((0, chan.recv_ready), (1, chan.recv_stderr_ready)):
+            if self._streams[streamid] and not self._eof[streamid] and (eof or ready()):
+                streamids.append(streamid)
+        return streamids
+
+    def _wait_for_streams(self, timeout):
+        """
+        Wait for up to 'timeout' seconds for the stdout or stderr streams of the process to become
+        readable. Refer to 'ProcessBase._wait_for_streams()' for more information.
+
+        The paramiko channel provides a file descriptor, which becomes readable when there are data
+        in the stdout or stderr buffers of the channel, or when the channel is closed. So the
+        streams are waited for without any helper threads.
+        """
+
+        streamids = self._get_ready_streams()
+        if streamids or not timeout:
+            return streamids
+
+        if not self._selector:
+            self._selector = selectors.DefaultSelector()
+            self._selector.register(self.pobj.fileno(), selectors.EVENT_READ)
+
+        self._selector.select(timeout=timeout)
+        return self._get_ready_streams()
+
     def _recv_exit_status_timeout(self, timeout):
         """
         This is a version of paramiko channel's 'recv_exit_status()' which supports a timeout.
@@ -194,7 +259,7 @@ class SSHProcess(_ProcessManagerBase.ProcessBase):
                   "\n%s", str(self._check_ll), str(self._ll), self._partial, str(self._output))
 
         while not _ProcessManagerBase.have_enough_lines(self._output, lines=lines):
-            if self.exitcode is not None and self._queue.empty():
+            if self.exitcode is not None and not self._queue:
                 self._dbg("_wait_intsh: process exited with status %d", self.exitcode)
                 break
 
@@ -226,13 +291,8 @@ class SSHProcess(_ProcessManagerBase.ProcessBase):
         result = self._get_lines_to_return(lines)
 
         if self._process_is_done():
-            # Mark the interactive shell process as vacant.
-            acquired = self.pman._acquire_intsh_lock(self.cmd)
-            if not acquired:
-                _LOG.warning("failed to mark the interactive shell process as free")
-            else:
-                self.pman._intsh_busy = False
-                self.pman._intsh_lock.release()
+            # Return the interactive shell process to the pool.
+            self.pman._release_intsh(self)
 
         return result
 
@@ -263,8 +323,7 @@ class SSHProcess(_ProcessManagerBase.ProcessBase):
             else:
                 self._dbg("_wait_nointsh: stream %d closed", streamid)
                 # One of the output streams closed.
-                self._threads[streamid].join()
-                self._threads[streamid] = self._streams[streamid] = None
+                self._streams[streamid] = None
 
                 if not self._streams[0] and not self._streams[1]:
                     self._dbg("_wait_nointsh: both streams closed")
@@ -287,7 +346,7 @@ class SSHProcess(_ProcessManagerBase.ProcessBase):
         lists: '(stdout_lines, stderr_lines)' (lists of stdout/stderr lines).
         """
 
-        if self.pman._intsh and self.pobj == self.pman._intsh.pobj:
+        if self._marker:
             func = self._wait_intsh
         else:
             func = self._wait_nointsh
@@ -450,22 +509,16 @@ class SSHProcessManager(_ProcessManagerBase.ProcessManagerBase):
         streams = (stdin, chan.recv, chan.recv_stderr)
         return SSHProcess(self, chan, command, cmd, shell, streams)
 
-    def _run_in_intsh(self, command, cwd=None):
-        """Run command 'command' in the interactive shell."""
+    def _run_in_intsh(self, proc, command, cwd=None):
+        """Run command 'command' in the interactive shell process 'proc'."""
 
-        if not self._intsh:
-            cmd = "sh -s"
-            _LOG.debug("starting interactive shell%s: %s", self.hostmsg, cmd)
-            self._intsh = self._run_in_new_session(cmd, shell=False)
-
-        proc = self._intsh
         cmd = self._format_cmd_for_pid(command, cwd=cwd)
 
         # Pick a new marker for the new interactive shell command.
         proc._reinit_marker()
-        # Run the command.
+        # Run the command. Note, 'send()' may send only a part of a long command, use 'sendall()'.
         cmd = "sh -c " + shlex.quote(cmd) + "\n" + f'printf "%s, %d ---" "{proc._marker}" "$?"\n'
-        proc.pobj.send(cmd)
+        proc.pobj.sendall(cmd)
         # Re-initialize the interactive shell process object to match the new command.
         proc._reinit(command, cmd, True)
 
@@ -488,6 +541,92 @@ class SSHProcessManager(_ProcessManagerBase.ProcessManagerBase):
             _LOG.warning(msg)
         return acquired
 
+    @staticmethod
+    def _intsh_is_alive(proc):
+        """Return 'True' if the interactive shell process 'proc' is still usable."""
+
+        chan = proc.pobj
+        return not chan.closed and not chan.exit_status_ready()
+
+    def _discard_intsh(self, proc):
+        """Terminate interactive shell process 'proc' and remove it from the pool."""
+
+        with contextlib.suppress(BaseException):
+            proc.pobj.send("exit\n")
+            proc.pobj.close()
+
+        if self._acquire_intsh_lock():
+            if proc in self._intsh_idle:
+                self._intsh_idle.remove(proc)
+            if proc in self._intsh_all:
+                self._intsh_all.remove(proc)
+            self._intsh_count -= 1
+            self._intsh_lock.release()
+
+    def _acquire_intsh(self, command):
+        """
+        Take an idle interactive shell process from the pool. Start a new one if there are no idle
+        processes and the pool is not full. Returns 'None' if the pool is exhausted.
+        """
+
+        if not self._acquire_intsh_lock(command=command):
+            return None
+
+        proc = None
+        dead = []
+        try:
+            while self._intsh_idle:
+                candidate = self._intsh_idle.pop()
+                if self._intsh_is_alive(candidate):
+                    proc = candidate
+                    break
+                dead.append(candidate)
+                self._intsh_all.remove(candidate)
+
+            self._intsh_count -= len(dead)
+            if not proc and self._intsh_count < _INTSH_POOL_SIZE:
+                # Reserve a slot for the new interactive shell process.
+                self._intsh_count += 1
+                new = True
+            else:
+                new = False
+        finally:
+            self._intsh_lock.release()
+
+        for candidate in dead:
+            _LOG.debug("dropping dead interactive shell%s", self.hostmsg)
+            with contextlib.suppress(BaseException):
+                candidate.pobj.close()
+
+        if new:
+            cmd = "sh -s"
+            _LOG.debug("starting interactive shell%s: %s", self.hostmsg, cmd)
+            try:
+                proc = self._run_in_new_session(cmd, shell=False)
+            except BaseException:
+                if self._acquire_intsh_lock():
+                    self._intsh_count -= 1
+                    self._intsh_lock.release()
+                raise
+
+            # Do not use the lock acquisition timeout here: the process must be added to the list,
+            # otherwise 'close()' would not terminate it.
+            with self._intsh_lock:
+                self._intsh_all.append(proc)
+
+        return proc
+
+    def _release_intsh(self, proc):
+        """Return interactive shell process 'proc' to the pool of idle processes."""
+
+        if not self._acquire_intsh_lock(proc.cmd):
+            _LOG.warning("failed to mark the interactive shell process as free")
+            return
+
+        if proc not in self._intsh_idle:
+            self._intsh_idle.append(proc)
+        self._intsh_lock.release()
+
     def _run_async(self, command, cwd=None, shell=True, intsh=False):
         """Implements 'run_async()'."""
 
@@ -498,43 +637,24 @@ class SSHProcessManager(_ProcessManagerBase.ProcessManagerBase):
             return self._run_in_new_session(command, cwd=cwd, shell=shell)
 
         try:
-            acquired = self._acquire_intsh_lock(command=command)
-            if not acquired or self._intsh_busy:
-                intsh = False
-
-            if intsh:
-                self._intsh_busy = True
-        finally:
-            # Release the interactive shell lock if we acquired it.
-            if acquired:
-                self._intsh_lock.release()
+            proc = self._acquire_intsh(command)
+        except Error as err:
+            _LOG.warning("failed to start an interactive shell%s:\n%s", self.hostmsg, err.indent(2))
+            proc = None
 
-        if not intsh:
-            _LOG.warning("interactive shell is busy, running the following command in a new "
+        if not proc:
+            _LOG.warning("all interactive shells are busy, running the following command in a new "
                          "SSH session:\n%s", command)
             return self._run_in_new_session(command, cwd=cwd, shell=shell)
 
         try:
-            return self._run_in_intsh(command, cwd=cwd)
+            return self._run_in_intsh(proc, command, cwd=cwd)
         except BaseException as err: # pylint: disable=broad-except
             _LOG.warning("failed to run the following command in an interactive shell: %s\n"
                          "The error was: %s", command, err)
 
-            # Close the internal shell and try to run in a new session.
-            with contextlib.suppress(BaseException):
-                acquired = self._acquire_intsh_lock(command=command)
-
-            if acquired:
-                self._intsh_busy = False
-                self._intsh_lock.release()
-                if self._intsh:
-                    with contextlib.suppress(BaseException):
-                        self._intsh.pobj.send("exit\n")
-                        self._intsh.close()
-                    self._intsh = None
-            else:
-                _LOG.warning("failed to acquire the interactive shell process lock")
-
+            # Close the interactive shell and try to run in a new session.
+            self._discard_intsh(proc)
             return self._run_in_new_session(command, cwd=cwd, shell=shell)
 
     def run_async(self, command, cwd=None, shell=True, intsh=False, stdin=None, stdout=None,
@@ -716,20 +836,238 @@ class SSHProcessManager(_ProcessManagerBase.ProcessManagerBase):
 
         self._scp(f"\"{local_path}\"", f"{self.hostname}:\"{remote_path}\"")
 
-    def _get_sftp(self):
-        """Get an SFTP server object."""
-
-        if self._sftp:
-            return self._sftp
+    def _new_sftp(self):
+        """Establish a new SFTP session and return the SFTP client object."""
 
         try:
-            self._sftp = self.ssh.open_sftp()
+            return self.ssh.open_sftp()
         except BaseException as err:
             msg = Error(err).indent(2)
             raise Error(f"failed to establish SFTP session with {self.hostname}:\n{msg}") from err
 
+    def _get_sftp(self):
+        """Get an SFTP server object."""
+
+        if not self._sftp:
+            self._sftp = self._new_sftp()
+
         return self._sftp
 
+    @contextlib.contextmanager
+    def _pooled_sftp(self):
+        """
+        A context manager which takes an SFTP session from the pool and returns it back to the pool
+        on exit. A new session is established if there are no idle sessions and the pool is not
+        full yet, otherwise this method waits for another thread to release a session. The session
+        is closed and dropped from the pool if an exception is raised, because it may have
+        unfinished requests.
+        """
+
+        sftp = None
+        with self._sftp_pool_cond:
+            while not self._sftp_idle and self._sftp_count >= _SFTP_POOL_SIZE:
+                self._sftp_pool_cond.wait()
+            if self._sftp_idle:
+                sftp = self._sftp_idle.pop()
+            else:
+                self._sftp_count += 1
+
+        if not sftp:
+            try:
+                sftp = self._new_sftp()
+            except Error:
+                with self._sftp_pool_cond:
+                    self._sftp_count -= 1
+                    self._sftp_pool_cond.notify()
+                raise
+
+        try:
+            yield sftp
+        except BaseException:
+            with contextlib.suppress(BaseException):
+                sftp.close()
+            with self._sftp_pool_cond:
+                self._sftp_count -= 1
+                self._sftp_pool_cond.notify()
+            raise
+
+        with self._sftp_pool_cond:
+            self._sftp_idle.append(sftp)
+            self._sftp_pool_cond.notify()
+
+    def _sftp_status_error(self, path, msg):
+        """
+        Parse SFTP status message 'msg' received for file 'path' and return the exception object
+        describing the failure.
+        """
+
+        code = msg.get_int()
+        text = msg.get_text()
+
+        errmsg = f"failed to read file '{path}'{self.hostmsg} via SFTP: {text}"
+        if code == _sftp.SFTP_NO_SUCH_FILE:
+            return ErrorNotFound(errmsg)
+        if code == _sftp.SFTP_PERMISSION_DENIED:
+            return ErrorPermissionDenied(errmsg)
+        return Error(errmsg)
+
+    def _sequential_read(self, sftp, paths):
+        """
+        Read files in 'paths' one by one using SFTP session 'sftp'. Returns the same dictionary as
+        '_pipelined_read()'.
+        """
+
+        results = {}
+        for path in paths:
+            try:
+                with sftp.file(str(path), "rb") as fobj:
+                    results[path] = fobj.read()
+            except PermissionError as err:
+                msg = Error(err).indent(2)
+                results[path] = ErrorPermissionDenied(f"failed to read file '{path}'{self.hostmsg} "
+                                                      f"via SFTP:\n{msg}")
+            except FileNotFoundError as err:
+                msg = Error(err).indent(2)
+                results[path] = ErrorNotFound(f"failed to read file '{path}'{self.hostmsg} via "
+                                              f"SFTP:\n{msg}")
+            except OSError as err:
+                msg = Error(err).indent(2)
+                results[path] = Error(f"failed to read file '{path}'{self.hostmsg} via SFTP:\n"
+                                      f"{msg}")
+
+        return results
+
+    def _pipelined_read(self, sftp, paths):
+        """
+        Read files in 'paths' using SFTP session 'sftp'. The open, read and close requests are
+        pipelined: up to '_SFTP_PIPELINE_DEPTH' requests are sent without waiting for the replies,
+        so reading many files takes a few network round trips instead of several round trips per
+        file. Returns a '{path: data}' dictionary, where 'data' is either the file contents in
+        binary form, or the exception object describing the failure.
+
+        Paramiko does not provide a public API for pipelining SFTP requests, so this method uses
+        paramiko's private methods. Raises 'AttributeError' if they are not available.
+        """
+
+        # pylint: disable=protected-access
+        results = {}
+        collector = _SFTPResponses()
+        # The in flight requests: '{request number: (request type, path, handle, chunks)}'.
+        inflight = {}
+        todo = list(reversed(paths))
+
+        def _send(rtype, path, handle=None, chunks=None, offset=0):
+            """Send an SFTP request of type 'rtype' without waiting for the response."""
+
+            if rtype == _sftp.CMD_OPEN:
+                args = (str(path), _sftp.SFTP_FLAG_READ, paramiko.SFTPAttributes())
+            elif rtype == _sftp.CMD_READ:
+                args = (handle, _sftp.int64(offset), _SFTP_READ_SIZE)
+            else:
+                args = (handle,)
+
+            num = sftp._async_request(collector, rtype, *args)
+            inflight[num] = (rtype, path, handle, chunks)
+
+        while todo or inflight:
+            while todo and len(inflight) < _SFTP_PIPELINE_DEPTH:
+                _send(_sftp.CMD_OPEN, todo.pop())
+
+            while not collector.responses:
+                sftp._read_response()
+
+            for num, (rtype, msg) in collector.responses.items():
+                reqtype, path, handle, chunks = inflight.pop(num)
+
+                if reqtype == _sftp.CMD_OPEN:
+                    if rtype == _sftp.CMD_HANDLE:
+                        handle = msg.get_binary()
+                        _send(_sftp.CMD_READ, path, handle=handle, chunks=[])
+                    else:
+                        results[path] = self._sftp_status_error(path, msg)
+                elif reqtype == _sftp.CMD_READ:
+                    if rtype == _sftp.CMD_DATA:
+                        chunks.append(msg.get_string())
+                        offset = sum(len(chunk) for chunk in chunks)
+                        _send(_sftp.CMD_READ, path, handle=handle, chunks=chunks, offset=offset)
+                        continue
+
+                    # The 'SFTP_EOF' status means that the entire file has been read.
+                    if msg.get_int() == _sftp.SFTP_EOF:
+                        results[path] = b"".join(chunks)
+                    else:
+                        msg.rewind()
+                        msg.get_int() # Skip the request number.
+                        results[path] = self._sftp_status_error(path, msg)
+                    _send(_sftp.CMD_CLOSE, path, handle=handle)
+
+            collector.responses = {}
+
+        return results
+
+    def read_many(self, paths, must_exist=True):
+        """
+        Read files at paths in 'paths'. Refer to '_ProcessManagerBase.ProcessManagerBase().
+        read_many()' for more information.
+
+        This implementation sends the SFTP requests for all the files without waiting for the
+        replies, so the files are read in a few network round trips. The SFTP session is taken from
+        a pool of sessions, so that multiple threads can read files concurrently.
+        """
+
+        paths = Trivial.list_dedup(paths)
+        if not paths:
+            return {}
+
+        data = None
+        try:
+            with self._pooled_sftp() as sftp:
+                if self._sftp_pipelining:
+                    data = self._pipelined_read(sftp, paths)
+                else:
+                    data = self._sequential_read(sftp, paths)
+        except Error:
+            raise
+        except AttributeError as err:
+            if not self._sftp_pipelining:
+                msg = Error(err).indent(2)
+                raise Error(f"failed to read {len(paths)} files{self.hostmsg} via SFTP:\n"
+                            f"{msg}") from err
+            # The private paramiko APIs used by '_pipelined_read()' are not available in this
+            # paramiko version. The session has already been dropped from the pool, because it may
+            # have unfinished requests.
+            _LOG.debug("SFTP pipelining is not supported by paramiko version %s, falling back to "
+                       "sequential reads: %s", paramiko.__version__, err)
+            self._sftp_pipelining = False
+        except Exception as err:
+            msg = Error(err).indent(2)
+            raise Error(f"failed to read {len(paths)} files{self.hostmsg} via SFTP:\n"
+                        f"{msg}") from err
+
+        if data is None:
+            with self._pooled_sftp() as sftp:
+                data = self._sequential_read(sftp, paths)
+
+        results = {}
+        for path in paths:
+            val = data[path]
+            if isinstance(val, Exception):
+                if isinstance(val, ErrorNotFound) and not must_exist:
+                    val = None
+                else:
+                    raise val
+            else:
+                try:
+                    val = val.decode("utf-8")
+                except UnicodeError as err:
+                    msg = Error(err).indent(2)
+                    raise Error(f"failed to decode contents of file '{path}'{self.hostmsg}:\n"
+                                f"{msg}") from None
+
+            results[path] = val
+
+        return results
+
     def open(self, path, mode):
         """
         Open a file. Refer to '_ProcessManagerBase.ProcessManagerBase().open()' for more
@@ -1099,12 +1437,23 @@ for entry in os.listdir(path):
         self.privkeypath = privkeypath
 
         self._sftp = None
-        # The interactive shell session.
-        self._intsh = None
-        # Whether we already run a process in the interactive shell.
-        self._intsh_busy = False
-        # A lock protecting 'self._intsh_busy' and 'self._intsh'. Basically this lock makes sure we
-        # always run exactly one process in the interactive shell.
+        # The pool of SFTP sessions used by 'read_many()': the idle sessions and the count of all
+        # the sessions in the pool.
+        self._sftp_idle = []
+        self._sftp_count = 0
+        # A condition variable protecting 'self._sftp_idle' and 'self._sftp_count'.
+        self._sftp_pool_cond = threading.Condition()
+        # Whether 'read_many()' pipelines the SFTP requests. Cleared if the paramiko private APIs
+        # pipelining relies on are not available.
+        self._sftp_pipelining = True
+        # The pool of interactive shell processes: the idle processes and the count of all the
+        # processes in the pool.
+        self._intsh_idle = []
+        self._intsh_count = 0
+        # All the interactive shell processes ever started, used for terminating them on close.
+        self._intsh_all = []
+        # A lock protecting 'self._intsh_idle' and 'self._intsh_count'. Basically this lock makes
+        # sure we always run at most one process in an interactive shell.
         self._intsh_lock = threading.Lock()
         # The "verbose" host name. The 'self.hostname', but with more details, like the IP address.
         self._vhostname = None
@@ -1173,10 +1522,22 @@ for entry in os.listdir(path):
                    "object ID: %s", self._vhostname, self.port, self.username, self.privkeypath,
                    id(self))
 
-        if self._intsh:
-            with contextlib.suppress(BaseException):
-                self._intsh.pobj.send("exit\n")
+        if getattr(self, "_intsh_lock", None):
+            with self._intsh_lock:
+                intsh_all = self._intsh_all
+                self._intsh_all = []
+                self._intsh_idle = []
+
+            for proc in intsh_all:
+                with contextlib.suppress(BaseException):
+                    proc.pobj.send("exit\n")
+
+        if getattr(self, "_sftp_idle", None):
+            for sftp in self._sftp_idle:
+                with contextlib.suppress(BaseException):
+                    sftp.close()
+            self._sftp_idle = []
 
-        ClassHelpers.close(self, close_attrs=("_sftp", "_intsh", "ssh",))
+        ClassHelpers.close(self, close_attrs=("_sftp", "ssh",))
 
         super().close()
@@ -14,14 +14,13 @@ between different process manager implementations.
 # pylint: disable=protected-access
 
 import re
-import queue
+import time
 import codecs
 import logging
-import threading
 import contextlib
 from pathlib import Path
-from collections import namedtuple
-from pepclibs.helperlibs import Human, Trivial, ClassHelpers
+from collections import namedtuple, deque
+from pepclibs.helperlibs import Human, Trivial, ClassHelpers, IOStats
 from pepclibs.helperlibs.Exceptions import Error, ErrorNotFound
 
 _LOG = logging.getLogger()
@@ -81,61 +80,74 @@ class ProcessBase(ClassHelpers.SimpleCloseContext):
         # pylint: disable=unused-argument
         return _bug_method_not_defined("ProcessBase._fetch_stream_data")
 
-    def _stream_fetcher(self, streamid):
+    def _wait_for_streams(self, timeout):
         """
-        This method runs in a separate thread. All it does is it fetches one of the output streams
-        of the executed program (either stdout or stderr) and puts the result into the queue.
+        Wait for up to 'timeout' seconds for the stdout or stderr streams of the process to become
+        readable. Returns the list of stream IDs (0 for stdout, 1 for stderr) which can be read
+        without blocking. A stream which reached the end of file is considered to be readable.
         """
 
-        try:
-            decoder = codecs.getincrementaldecoder('utf8')(errors="surrogateescape")
-            while not self._threads_exit:
-                if not self._streams[streamid]:
-                    self._dbg("stream %d: stream is closed", streamid)
-                    break
-
-                data = None
-                try:
-                    data = self._fetch_stream_data(streamid, 4096)
-                except Error as err:
-                    _LOG.error("failed reading from stream %d: %s\nThe command of the process:\n%s",
-                               streamid, err, self.cmd)
-                    break
-
-                if not data:
-                    self._dbg("stream %d: no more data", streamid)
-                    break
-
-                data = decoder.decode(data)
-                if not data:
-                    self._dbg("stream %d: read more data", streamid)
-                    continue
-
-                self._dbg("stream %d: read data:\n%s", streamid, data)
-                self._queue.put((streamid, data))
-        except BaseException as err: # pylint: disable=broad-except
-            _LOG.error(err)
+        # pylint: disable=unused-argument
+        return _bug_method_not_defined("ProcessBase._wait_for_streams")
+
+    def _read_stream(self, streamid):
+        """
+        Read data from stream 'streamid', which is ready for reading, and add it to the output
+        queue. Add the end of stream indicator to the queue if there are no more data.
+        """
 
-        # The end of stream indicator.
-        self._queue.put((streamid, None))
-        self._dbg("stream %d: thread exists", streamid)
+        data = None
+        try:
+            data = self._fetch_stream_data(streamid, 4096)
+        except Error as err:
+            _LOG.error("failed reading from stream %d: %s\nThe command of the process:\n%s",
+                       streamid, err, self.cmd)
+
+        if not data:
+            self._dbg("stream %d: no more data", streamid)
+            self._eof[streamid] = True
+            # The end of stream indicator.
+            self._queue.append((streamid, None))
+            return
+
+        data = self._decoders[streamid].decode(data)
+        if not data:
+            self._dbg("stream %d: read more data", streamid)
+            return
+
+        self._dbg("stream %d: read data:\n%s", streamid, data)
+        self._queue.append((streamid, data))
 
     def _get_next_queue_item(self, timeout):
         """
-        Read the next data item from the stream fetcher queue. The items in the queue have the
-        following format: '(streamid, data)'.
+        Read the next data item from the output queue, read the stdout and stderr streams of the
+        process if the queue is empty. The items in the queue have the following format:
+        '(streamid, data)'.
            * streamid - 0 for stdout, 1 for stderr.
-           * data - stream data (can be a partial line).
+           * data - stream data (can be a partial line), or 'None' if the stream was closed.
 
         Returns '(-1, None)' in case of time out.
         """
 
-        try:
+        start_time = time.time()
+
+        while not self._queue:
+            if all(self._eof[streamid] or not self._streams[streamid] for streamid in (0, 1)):
+                break
+
+            remaining = 0
             if timeout:
-                return self._queue.get(timeout=timeout)
-            return self._queue.get(block=False)
-        except queue.Empty:
-            return (-1, None)
+                remaining = max(timeout - (time.time() - start_time), 0)
+
+            for streamid in self._wait_for_streams(remaining):
+                self._read_stream(streamid)
+
+            if not remaining:
+                break
+
+        if self._queue:
+            return self._queue.popleft()
+        return (-1, None)
 
     def _handle_queue_item(self, streamid, data, capture_output=True, output_fobjs=(None, None)):
         """
@@ -196,7 +208,7 @@ class ProcessBase(ClassHelpers.SimpleCloseContext):
         return self.exitcode is not None and \
                not self._output[0] and \
                not self._output[1] and \
-               self._queue.empty()
+               not self._queue
 
     def _wait(self, timeout=None, capture_output=True, output_fobjs=(None, None),
               lines=(None, None)):
@@ -262,23 +274,10 @@ class ProcessBase(ClassHelpers.SimpleCloseContext):
                   "real command: %s", timeout, capture_output, str(lines), join, self.cmd,
                   self.real_cmd)
 
-        if self._threads_exit:
-            raise Error("this process has 'threads_exit' flag set and it cannot be used")
-
         if self._process_is_done():
             return ProcResult(stdout="", stderr="", exitcode=self.exitcode)
 
-        if not self._queue:
-            self._queue = queue.Queue()
-            for streamid in (0, 1):
-                if self._streams[streamid]:
-                    assert self._threads[streamid] is None
-                    self._threads[streamid] = threading.Thread(target=self._stream_fetcher,
-                                                               name='stream-fetcher',
-                                                               args=(streamid,), daemon=True)
-                    self._threads[streamid].start()
-        else:
-            self._dbg("wait: queue is empty: %s", self._queue.empty())
+        self._dbg("wait: queue is empty: %s", not self._queue)
 
         output = self._wait(timeout=timeout, capture_output=capture_output,
                             output_fobjs=output_fobjs, lines=lines)
@@ -358,7 +357,6 @@ class ProcessBase(ClassHelpers.SimpleCloseContext):
         self.pid = None
         self.exitcode = None
 
-        self._threads_exit = False
         self._output = [[], []]
         self._partial = ["", ""]
 
@@ -410,17 +408,22 @@ class ProcessBase(ClassHelpers.SimpleCloseContext):
         # message related to different processes.
         self.debug_id = None
 
-        # The stream fetcher threads have to exit if the '_threads_exit' flag becomes 'True'.
-        self._threads_exit = False
         # The output for the process that was read from 'self._queue', but not yet sent to the user
         # (separate for 'stdout' and 'stderr').
         self._output = [[], []]
         # The last partial lines of the stdout and stderr streams of the process.
         self._partial = ["", ""]
-        # The threads fetching data from the stdout/stderr streams of the process.
-        self._threads = [None, None]
-        # The queue for passing process output from stream fetcher threads.
-        self._queue = None
+        # The queue of '(streamid, data)' items read from the stdout/stderr streams of the process,
+        # but not yet processed.
+        self._queue = deque()
+        # Whether the end of the stdout/stderr streams was reached.
+        self._eof = [False, False]
+        # The UTF-8 decoders for the stdout/stderr streams (a multi-byte character may be split
+        # between two reads).
+        self._decoders = [codecs.getincrementaldecoder("utf8")(errors="surrogateescape")
+                          for _ in range(2)]
+        # The selector object for waiting for the stdout/stderr streams to become readable.
+        self._selector = None
 
         if self.stdin:
             if not getattr(self.stdin, "name", None):
@@ -432,20 +435,13 @@ class ProcessBase(ClassHelpers.SimpleCloseContext):
 
         self._dbg("close()")
 
-        if hasattr(self, "_threads_exit"):
-            self._threads_exit = True
+        if getattr(self, "_selector", None):
+            with contextlib.suppress(BaseException):
+                self._selector.close()
+            self._selector = None
 
         ClassHelpers.close(self, unref_attrs=("pman", "pobj"))
 
-    def __del__(self):
-        """Class destructor."""
-
-        with contextlib.suppress(BaseException):
-            self._dbg("__del__()")
-
-        if hasattr(self, "_threads_exit"):
-            self._threads_exit = True
-
 class ProcessManagerBase(ClassHelpers.SimpleCloseContext):
     """
     The base class for process managers, which can manage both local and remote processes.
@@ -673,6 +669,29 @@ class ProcessManagerBase(ClassHelpers.SimpleCloseContext):
 
         return val
 
+    def read_small(self, path, must_exist=True):
+        """
+        Read a small file at path 'path', such as a sysfs or procfs file. The arguments and the
+        return value are the same as in 'read()'. This implementation just calls 'read()', but
+        process managers may override it with a more efficient implementation.
+        """
+
+        return self.read(path, must_exist=must_exist)
+
+    def read_many(self, paths, must_exist=True):
+        """
+        Read files at paths in 'paths' and return a '{path: contents}' dictionary. The arguments are
+        as follows.
+          * paths - an iterable collection of paths to the files to read.
+          * must_exist - same as in 'read()', the contents of a non-existing file is 'None' if
+                         'must_exist' is 'False'.
+
+        This implementation reads the files one-by-one using 'read_small()', but process managers
+        may override it with a more efficient implementation.
+        """
+
+        return {path: self.read_small(path, must_exist=must_exist) for path in paths}
+
     def get_python_path(self):
         """
         Some FS operations have to execute python scripts. This method finds and returns python
@@ -832,6 +851,56 @@ class ProcessManagerBase(ClassHelpers.SimpleCloseContext):
         # pylint: disable=unused-argument
         return _bug_method_not_defined("ProcessManagerBase.which")
 
+    def enable_stats(self, tracepath=None):
+        """
+        Enable I/O statistics: count calls, bytes and wall time of the 'open()', 'read()', 'run()',
+        'exists()', 'lsdir()' and similar methods, as well as reads and writes of the file objects
+        returned by 'open()'. The arguments are as follows.
+          * tracepath - path to the file to write the trace of every operation to (no trace by
+                        default).
+
+        The statistics are reset every time this method is called. Refer to the 'IOStats' module
+        for more information.
+        """
+
+        self.disable_stats()
+
+        self._iostats = IOStats.IOStats(tracepath=tracepath)
+        for name in IOStats.METHODS:
+            setattr(self, name, self._iostats.wrap_method(name, getattr(self, name)))
+
+    def disable_stats(self):
+        """Disable I/O statistics."""
+
+        if not self._iostats:
+            return
+
+        for name in IOStats.METHODS:
+            if name in self.__dict__:
+                delattr(self, name)
+
+        self._iostats.close()
+        self._iostats = None
+
+    def get_stats(self):
+        """
+        Return the I/O statistics dictionary. Refer to 'IOStats.IOStats.get_stats()' for the
+        dictionary format.
+        """
+
+        if not self._iostats:
+            raise Error(f"I/O statistics are not enabled{self.hostmsg}")
+
+        return self._iostats.get_stats()
+
+    def reset_stats(self):
+        """Reset the I/O statistics."""
+
+        if not self._iostats:
+            raise Error(f"I/O statistics are not enabled{self.hostmsg}")
+
+        self._iostats.reset_stats()
+
     def __init__(self):
         """Initialize a class instance."""
 
@@ -843,6 +912,11 @@ class ProcessManagerBase(ClassHelpers.SimpleCloseContext):
         self._python_path = None
         # The command to use for figuring out full paths in the 'which()' method.
         self._which_cmd = None
+        # The I/O statistics object, 'None' if I/O statistics are disabled.
+        self._iostats = None
 
     def close(self):
         """Free allocated resources."""
+
+        if getattr(self, "_iostats", None):
+            self.disable_stats()
@@ -20,10 +20,14 @@ Terminology.
     scope.
 """
 
+import os
 import logging
+import contextlib
 from pathlib import Path
 from pepclibs.helperlibs import LocalProcessManager, FSHelpers, KernelModule, Trivial, ClassHelpers
-from pepclibs.helperlibs.Exceptions import Error, ErrorVerifyFailed
+from pepclibs.helperlibs import BatchIO
+from pepclibs.helperlibs.Exceptions import Error, ErrorVerifyFailed, ErrorPermissionDenied
+from pepclibs.helperlibs.Exceptions import ErrorNotFound, ErrorNotSupported
 from pepclibs import CPUInfo, _PropsCache
 
 _CPU_BYTEORDER = "little"
@@ -50,6 +54,7 @@ class MSR(ClassHelpers.SimpleCloseContext):
     1. Multi-CPU I/O.
         * Read/write entire MSR: 'read()', 'write()'.
         * Read/write MSR bits range: 'read_bits()', 'write_bits()'.
+        * Read multiple MSRs in one pass: 'read_many()'.
     2. Single-CPU I/O.
         * Read/write entire MSR: 'read_cpu()', 'write_cpu()'.
         * Read/write MSR bits range: 'read_cpu_bits()', 'write_cpu_bits()'.
@@ -59,6 +64,7 @@ class MSR(ClassHelpers.SimpleCloseContext):
         * Commit the transaction: commit_transaction().
     4. Miscellaneous helpers.
         * Get/set bits from/in a user-provided MSR value: 'get_bits()', 'set_bits()'.
+        * Close the cached MSR device handles (e.g., after CPU hotplug): 'invalidate_devs()'.
     """
 
     def _add_for_transation(self, regaddr, regval, cpu):
@@ -109,21 +115,32 @@ class MSR(ClassHelpers.SimpleCloseContext):
         if self._transaction_buffer:
             _LOG.debug("flushing MSR transaction buffer")
 
-        for cpu, to_write in self._transaction_buffer.items():
-            # Write all the dirty data.
-            path = Path(f"/dev/cpu/{cpu}/msr")
-            with self._pman.open(path, "r+b") as fobj:
+        batched = False
+        if self._pman.is_remote:
+            # Write all the dirty data in one batch to avoid a network round trip per MSR.
+            ops = []
+            for cpu, to_write in self._transaction_buffer.items():
                 for regaddr, regval in to_write.items():
-                    try:
-                        fobj.seek(regaddr)
-                        regval_bytes = regval.to_bytes(self.regbytes, byteorder=_CPU_BYTEORDER)
-                        fobj.write(regval_bytes)
-                        _LOG.debug("CPU%d: commit MSR 0x%x: wrote 0x%x%s",
-                                   cpu, regaddr, regval, self._pman.hostmsg)
-                    except Error as err:
-                        raise Error(f"failed to write '{regval:#x}' to MSR '{regaddr:#x}' of CPU "
-                                    f"{cpu}:\nfailed to write to file '{path}'"
-                                    f"{self._pman.hostmsg}:\n{err.indent(2)}") from err
+                    ops.append(("msr_write", cpu, regaddr, regval))
+                    _LOG.debug("CPU%d: commit MSR 0x%x: write 0x%x%s",
+                               cpu, regaddr, regval, self._pman.hostmsg)
+
+            try:
+                BatchIO.execute(ops, pman=self._pman)
+                batched = True
+            except ErrorNotSupported as err:
+                # The host does not support running shell commands (e.g., an emulated host).
+                _LOG.debug("batch I/O is not supported%s, falling back to writing MSRs one by "
+                           "one:\n%s", self._pman.hostmsg, err.indent(2))
+            except Error as err:
+                raise Error(f"failed to flush the MSR transaction buffer{self._pman.hostmsg}:\n"
+                            f"{err.indent(2)}") from err
+
+        if not batched:
+            for cpu, to_write in self._transaction_buffer.items():
+                # Write all the dirty data.
+                for regaddr, regval in to_write.items():
+                    self._write_cpu(regaddr, regval, cpu)
 
         self._transaction_buffer.clear()
 
@@ -176,17 +193,139 @@ class MSR(ClassHelpers.SimpleCloseContext):
         mask = (1 << bits_cnt) - 1
         return (regval >> bits[1]) & mask
 
+    def _open_dev(self, cpu):
+        """
+        Open the MSR device node of CPU 'cpu' and return the handle. The handle is a raw file
+        descriptor if the MSR device is accessed directly (see '_use_raw_fds'), otherwise it is a
+        file object returned by the process manager.
+        """
+
+        path = Path(f"/dev/cpu/{cpu}/msr")
+
+        if not self._use_raw_fds:
+            try:
+                return self._pman.open(path, "r+b")
+            except ErrorPermissionDenied:
+                # Reading MSRs does not require write access.
+                return self._pman.open(path, "rb")
+
+        errmsg = f"failed to open file '{path}': "
+        try:
+            with self._measure_raw_io("open", cpu):
+                try:
+                    return os.open(path, os.O_RDWR)
+                except PermissionError:
+                    # Reading MSRs does not require write access.
+                    return os.open(path, os.O_RDONLY)
+        except PermissionError as err:
+            msg = Error(err).indent(2)
+            raise ErrorPermissionDenied(f"{errmsg}\n{msg}") from None
+        except FileNotFoundError as err:
+            msg = Error(err).indent(2)
+            raise ErrorNotFound(f"{errmsg}\n{msg}") from None
+        except OSError as err:
+            msg = Error(err).indent(2)
+            raise Error(f"{errmsg}\n{msg}") from None
+
+    def _measure_raw_io(self, op, cpu):
+        """
+        Return a context manager which accounts operation 'op' on the MSR device of CPU 'cpu' in the
+        I/O statistics of the process manager (see 'ProcessManagerBase.enable_stats()'). The raw
+        file descriptor I/O bypasses the process manager, so it has to be accounted explicitly.
+        """
+
+        iostats = self._pman._iostats # pylint: disable=protected-access
+        if not iostats:
+            return contextlib.nullcontext({"bytes": 0})
+        return iostats.measure(op, f"/dev/cpu/{cpu}/msr")
+
+    def _get_dev(self, cpu):
+        """Return the MSR device handle of CPU 'cpu', open the device if necessary."""
+
+        if cpu not in self._devs:
+            self._devs[cpu] = self._open_dev(cpu)
+
+        return self._devs[cpu]
+
+    def _close_dev(self, cpu):
+        """Close the MSR device handle of CPU 'cpu', if it is open."""
+
+        dev = self._devs.pop(cpu, None)
+        if dev is None:
+            return
+
+        with contextlib.suppress(Exception):
+            if self._use_raw_fds:
+                os.close(dev)
+            else:
+                dev.close()
+
+    def _dev_pread(self, cpu, regaddr):
+        """Read MSR at 'regaddr' on CPU 'cpu' using the pooled device handle."""
+
+        dev = self._get_dev(cpu)
+        if self._use_raw_fds:
+            with self._measure_raw_io("read", cpu) as info:
+                regval = os.pread(dev, self.regbytes, regaddr)
+                info["bytes"] = len(regval)
+        else:
+            dev.seek(regaddr)
+            regval = dev.read(self.regbytes)
+
+        return regval
+
+    def _dev_pwrite(self, cpu, regaddr, regval_bytes):
+        """Write 'regval_bytes' to MSR at 'regaddr' on CPU 'cpu' using the pooled device handle."""
+
+        dev = self._get_dev(cpu)
+        if self._use_raw_fds:
+            with self._measure_raw_io("write", cpu) as info:
+                info["bytes"] = os.pwrite(dev, regval_bytes, regaddr)
+        else:
+            dev.seek(regaddr)
+            dev.write(regval_bytes)
+            dev.flush()
+
+    def _dev_io(self, func, cpu, *args):
+        """
+        Run MSR device I/O function 'func' for CPU 'cpu'. The pooled device handle becomes stale if
+        the CPU is taken offline, so if the I/O fails, re-open the device and try one more time.
+        """
+
+        try:
+            return func(cpu, *args)
+        except (OSError, Error) as err:
+            if cpu not in self._devs:
+                raise
+            _LOG.debug("CPU%d: MSR device I/O failed, re-opening the device:\n%s",
+                       cpu, Error(err).indent(2))
+            self._close_dev(cpu)
+
+        return func(cpu, *args)
+
+    def invalidate_devs(self, cpus="all"):
+        """
+        Close the MSR device handles of CPUs in 'cpus', they will be re-opened on the next access.
+        The 'cpus' argument is similar to the 'cpus' argument in 'read()', but the CPU numbers are
+        not validated, so that offline CPUs can be specified as well. This method is useful after
+        CPU hotplug operations.
+        """
+
+        if cpus == "all":
+            cpus = list(self._devs)
+
+        for cpu in cpus:
+            self._close_dev(cpu)
+
     def _read_cpu(self, regaddr, cpu):
         """Read an MSR at address 'regaddr' on CPU 'cpu'."""
 
-        path = Path(f"/dev/cpu/{cpu}/msr")
         try:
-            with self._pman.open(path, "rb") as fobj:
-                fobj.seek(regaddr)
-                regval = fobj.read(self.regbytes)
-        except Error as err:
+            regval = self._dev_io(self._dev_pread, cpu, regaddr)
+        except (OSError, Error) as err:
+            path = Path(f"/dev/cpu/{cpu}/msr")
             raise Error(f"failed to read MSR '{regaddr:#x}' from file '{path}'"
-                        f"{self._pman.hostmsg}:\n{err.indent(2)}") from err
+                        f"{self._pman.hostmsg}:\n{Error(err).indent(2)}") from err
 
         regval = int.from_bytes(regval, byteorder=_CPU_BYTEORDER)
         _LOG.debug("CPU%d: MSR 0x%x: read 0x%x%s", cpu, regaddr, regval, self._pman.hostmsg)
@@ -218,6 +357,96 @@ class MSR(ClassHelpers.SimpleCloseContext):
 
             yield (cpu, regval)
 
+    def _read_many_remote(self, to_read):
+        """
+        Read MSRs on a remote host in one batch, in order to avoid a network round trip per MSR. The
+        'to_read' argument is a dictionary mapping CPU numbers to lists of MSR addresses to read.
+        Returns a '{cpu: {regaddr: regval}}' dictionary.
+        """
+
+        ops = []
+        for cpu, regaddrs in to_read.items():
+            for regaddr in regaddrs:
+                ops.append(("msr_read", cpu, regaddr))
+
+        try:
+            results = BatchIO.execute(ops, pman=self._pman)
+        except ErrorNotSupported as err:
+            # The host does not support running shell commands (e.g., an emulated host).
+            _LOG.debug("batch I/O is not supported%s, falling back to reading MSRs one by one:\n%s",
+                       self._pman.hostmsg, err.indent(2))
+            results = [None] * len(ops)
+
+        regvals = {}
+        for (_, cpu, regaddr), regval in zip(ops, results):
+            if regval is None:
+                # Read the MSR directly to get a meaningful error message.
+                regval = self._read_cpu(regaddr, cpu)
+            else:
+                _LOG.debug("CPU%d: MSR 0x%x: read 0x%x%s",
+                           cpu, regaddr, regval, self._pman.hostmsg)
+            regvals.setdefault(cpu, {})[regaddr] = regval
+
+        return regvals
+
+    def read_many(self, regaddrs, cpus="all", snames=None):
+        """
+        Read multiple MSRs on CPUs 'cpus' and yield the results. Compared to calling 'read()' for
+        every MSR, this method visits every CPU only once, and reads all the MSRs the CPU needs in
+        one go. On a remote host, all the MSRs are read in one batch (see 'BatchIO'). The arguments
+        are as follows.
+          * regaddrs - collection of addresses of the MSRs to read.
+          * cpus - collection of integer CPU numbers. Special value 'all' means "all CPUs".
+          * snames - a dictionary mapping MSR addresses to MSR scope names (e.g. "package", "core").
+                     The MSRs not in the dictionary are assumed to have "CPU" scope.
+
+        Yields tuples of '(cpu, regvals)'.
+          * cpu - the CPU number the MSRs were read from.
+          * regvals - a dictionary mapping MSR addresses to the read MSR values.
+        """
+
+        cpus = self._cpuinfo.normalize_cpus(cpus)
+        regaddrs = Trivial.list_dedup(regaddrs)
+        if snames is None:
+            snames = {}
+
+        # Figure out which MSRs should be read on which CPU. The MSR values cache is scope-aware, so
+        # only one CPU per scope instance (e.g., one CPU per package) has to be read.
+        to_read = {}
+        for regaddr in regaddrs:
+            sname = snames.get(regaddr, "CPU")
+            covered = set()
+            for cpu in cpus:
+                if cpu in covered or self._pcache.is_cached(regaddr, cpu):
+                    continue
+
+                to_read.setdefault(cpu, []).append(regaddr)
+                if self._enable_cache and sname != "CPU":
+                    covered.update(self._cpuinfo.get_cpu_siblings(cpu, sname))
+
+        if self._pman.is_remote and to_read:
+            regvals = self._read_many_remote(to_read)
+        else:
+            regvals = {}
+            for cpu, cpu_regaddrs in to_read.items():
+                regvals[cpu] = {}
+                for regaddr in cpu_regaddrs:
+                    regvals[cpu][regaddr] = self._read_cpu(regaddr, cpu)
+
+        for cpu, cpu_regvals in regvals.items():
+            for regaddr, regval in cpu_regvals.items():
+                self._pcache.add(regaddr, cpu, regval, sname=snames.get(regaddr, "CPU"))
+
+        for cpu in cpus:
+            cpu_regvals = {}
+            for regaddr in regaddrs:
+                if regaddr in regvals.get(cpu, {}):
+                    cpu_regvals[regaddr] = regvals[cpu][regaddr]
+                else:
+                    cpu_regvals[regaddr] = self._pcache.get(regaddr, cpu)
+
+            yield (cpu, cpu_regvals)
+
     def read_cpu(self, regaddr, cpu, sname="CPU"):
         """
         Read an MSR at 'regaddr' on CPU 'cpu' and return read result. The arguments are as follows.
@@ -294,16 +523,15 @@ class MSR(ClassHelpers.SimpleCloseContext):
         if regval_bytes is None:
             regval_bytes = regval.to_bytes(self.regbytes, byteorder=_CPU_BYTEORDER)
 
-        path = Path(f"/dev/cpu/{cpu}/msr")
-        with self._pman.open(path, "r+b") as fobj:
-            try:
-                fobj.seek(regaddr)
-                fobj.write(regval_bytes)
-                _LOG.debug("CPU%d: MSR 0x%x: wrote 0x%x", cpu, regaddr, regval)
-            except Error as err:
-                raise Error(f"failed to write '{regval:#x}' to MSR '{regaddr:#x}' of CPU {cpu}:\n"
-                            f"failed to write to file '{path}'{self._pman.hostmsg}:\n"
-                            f"{err.indent(2)}") from err
+        try:
+            self._dev_io(self._dev_pwrite, cpu, regaddr, regval_bytes)
+        except (OSError, Error) as err:
+            path = Path(f"/dev/cpu/{cpu}/msr")
+            raise Error(f"failed to write '{regval:#x}' to MSR '{regaddr:#x}' of CPU {cpu}:\n"
+                        f"failed to write to file '{path}'{self._pman.hostmsg}:\n"
+                        f"{Error(err).indent(2)}") from err
+
+        _LOG.debug("CPU%d: MSR 0x%x: wrote 0x%x%s", cpu, regaddr, regval, self._pman.hostmsg)
 
     def write(self, regaddr, regval, cpus="all", sname="CPU", verify=False):
         """
@@ -320,8 +548,7 @@ class MSR(ClassHelpers.SimpleCloseContext):
         cpus = self._cpuinfo.normalize_cpus(cpus)
         regval_bytes = None
 
-        for cpu in cpus:
-            self._pcache.remove(regaddr, cpu, sname=sname)
+        self._pcache.remove_many(regaddr, cpus, sname=sname)
 
         # Removing 'cpus' from the cache will make sure the following '_pcache.is_cached()' returns
         # 'False' for every CPU number that was not yet modified by the scope-aware '_pcache.add()'
@@ -347,8 +574,7 @@ class MSR(ClassHelpers.SimpleCloseContext):
             if self._in_transaction:
                 self.flush_transaction()
 
-            for cpu in cpus:
-                self._pcache.remove(regaddr, cpu, sname=sname)
+            self._pcache.remove_many(regaddr, cpus, sname=sname)
 
             for cpu in cpus:
                 if self._pcache.is_cached(regaddr, cpu):
@@ -478,6 +704,14 @@ class MSR(ClassHelpers.SimpleCloseContext):
         self._msr_drv = None
         self._unload_msr_drv = False
 
+        # The MSR device handles pool, one handle per CPU, kept open for the lifetime of the object.
+        self._devs = {}
+        # Whether the MSR devices are accessed directly with 'os.pread()' and 'os.pwrite()', which
+        # is only possible when they are on the local host. Note, emulated process managers are
+        # derived from the local process manager, so the exact type has to be checked.
+        # pylint: disable-next=unidiomatic-typecheck
+        self._use_raw_fds = type(self._pman) is LocalProcessManager.LocalProcessManager
+
         # The write-through per-CPU MSR values cache.
         self._pcache = _PropsCache.PropsCache(cpuinfo=self._cpuinfo, pman=self._pman,
                                               enable_cache=self._enable_cache)
@@ -491,6 +725,9 @@ class MSR(ClassHelpers.SimpleCloseContext):
     def close(self):
         """Uninitialize the class object."""
 
+        if getattr(self, "_devs", None):
+            self.invalidate_devs()
+
         if self._unload_msr_drv:
             self._msr_drv.unload()
 
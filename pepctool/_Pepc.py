@@ -23,9 +23,10 @@ except ImportError:
     # We can live without argcomplete, we only lose tab completions.
     argcomplete = None
 
-from pepclibs.helperlibs import ArgParse, Human, Logging, ProcessManager, ProjectFiles
+from pepclibs.helperlibs import ArgParse, Human, Logging, ProcessManager, ProjectFiles, SSHBroker
 from pepclibs.helperlibs.Exceptions import Error
 from pepclibs import CStates, PStates, Power, CPUInfo
+from pepctool import _PepcCommon, _PepcFleet
 
 if sys.version_info < (3,7):
     raise SystemExit("Error: this tool requires python version 3.7 or higher")
@@ -100,7 +101,7 @@ class PepcArgsParser(ArgParse.ArgsParser):
         if uargs:
             raise Error(f"unrecognized option(s): {' '.join(uargs)}")
 
-        if args.dataset and args.hostname != "localhost":
+        if args.dataset and (args.hostname != "localhost" or args.hosts_file):
             raise Error("can't use dataset on remote host")
 
         return args
@@ -230,6 +231,46 @@ def build_arguments_parser():
 
     text = "Force coloring of the text output."
     parser.add_argument("--force-color", action="store_true", help=text)
+    text = """Do not use the CPU information cache. By default, information about the CPU topology
+              and model of the target host is cached in '$XDG_CACHE_HOME/pepc/<hostname>/' (or
+              '$HOME/.cache/pepc/<hostname>/'), which makes 'pepc' start faster. The cache is
+              automatically invalidated when the target host reboots or CPUs are onlined or
+              offlined."""
+    parser.add_argument("--no-cache", action="store_true", help=text)
+    text = """Run the 'pepclibs' library on the target host with its own python interpreter, and send
+              only the results back (the "remote agent" mode). This makes reading many properties
+              from a remote host a lot faster. The 'pepclibs' sources are copied to
+              '$XDG_CACHE_HOME/pepc/agent/' (or '$HOME/.cache/pepc/agent/') on the target host on
+              first use. Supported only by the 'info' sub-commands of the 'pstates', 'cstates' and
+              'power' commands, ignored for the local host."""
+    parser.add_argument("--agent", action="store_true", help=text)
+    text = """Path to a file with names of the hosts to run the command on, one host name per line.
+              Empty lines and lines starting with '#' are ignored. The command runs on multiple
+              hosts concurrently, and the output is printed per host. Note, multiple hosts can also
+              be specified as a comma-separated list of host names with the '-H' option."""
+    parser.add_argument("--hosts-file", help=text)
+    text = f"""The maximum number of hosts to run the command on concurrently, default is
+               {_PepcFleet.DEFAULT_JOBS}. Used only when running on multiple hosts."""
+    parser.add_argument("--jobs", type=int, help=text)
+    text = """When running on multiple hosts, print every output line (e.g., a property value) once
+              for the group of hosts that printed it, instead of printing the output for every
+              host."""
+    parser.add_argument("--group-hosts", action="store_true", help=text)
+    text = f"""Use the SSH broker: a background process which keeps SSH connections to remote
+               hosts open between 'pepc' invocations, which makes 'pepc' start faster. The broker
+               is started on first use and exits after {SSHBroker.IDLE_TIMEOUT // 60} minutes of
+               inactivity."""
+    parser.add_argument("--ssh-broker", action="store_true", help=text)
+    text = """Print I/O statistics to the standard error stream when the command finishes: the
+              count, size and wall time of file reads, writes, command runs and other operations
+              on the target host, grouped by path. This helps finding out which operations take
+              the most time, especially on remote hosts."""
+    parser.add_argument("--stats", action="store_true", help=text)
+    text = """Write a trace of all I/O operations on the target host to file 'STATS_TRACE', one
+              line per operation: the time stamp, the operation, the path or command, the size,
+              and the duration. When running on multiple hosts, the host name is appended to the
+              file name."""
+    parser.add_argument("--stats-trace", help=text)
     subparsers = parser.add_subparsers(title="commands", dest="a command")
     subparsers.required = True
 
@@ -772,17 +813,22 @@ def main():
             return -1
 
         # pylint: disable=no-member
-        if args.hostname == "localhost":
+        hostnames = _PepcFleet.get_hostnames(args)
+        if args.hostname == "localhost" and not hostnames:
             args.username = args.privkey = args.timeout = None
 
         if args.dataset:
             for path in _get_next_dataset(args.dataset):
                 with _get_emul_pman(args, path) as pman:
-                    args.func(args, pman)
+                    _PepcCommon.run_command(args, pman)
+        elif hostnames:
+            if _PepcFleet.run(args, hostnames):
+                return -1
         else:
             with ProcessManager.get_pman(args.hostname, username=args.username,
-                                         privkeypath=args.privkey, timeout=args.timeout) as pman:
-                args.func(args, pman)
+                                         privkeypath=args.privkey, timeout=args.timeout,
+                                         broker=args.ssh_broker) as pman:
+                _PepcCommon.run_command(args, pman)
 
     except KeyboardInterrupt:
         _LOG.info("\nInterrupted, exiting")
@@ -18,10 +18,11 @@ from pepctool import _PepcCommon
 
 _LOG = logging.getLogger()
 
-def cpu_hotplug_info_command(_, pman):
+def cpu_hotplug_info_command(args, pman):
     """Implements the 'cpu-hotplug info' command."""
 
-    with CPUInfo.CPUInfo(pman=pman) as cpuinfo:
+    cachedir = _PepcCommon.get_cpuinfo_cachedir(args, pman)
+    with CPUInfo.CPUInfo(pman=pman, cachedir=cachedir) as cpuinfo:
         for func, word in (("get_cpus", "online"), ("get_offline_cpus", "offline")):
             cpus = getattr(cpuinfo, func)()
             if cpus:
@@ -47,7 +48,8 @@ def cpu_hotplug_online_command(args, pman):
 def cpu_hotplug_offline_command(args, pman):
     """Implements the 'cpu-hotplug offline' command."""
 
-    with CPUInfo.CPUInfo(pman=pman) as cpuinfo, \
+    cachedir = _PepcCommon.get_cpuinfo_cachedir(args, pman)
+    with CPUInfo.CPUInfo(pman=pman, cachedir=cachedir) as cpuinfo, \
         CPUOnline.CPUOnline(progress=logging.INFO, pman=pman, cpuinfo=cpuinfo) as onl:
 
         # Some CPUs may not support offlining. Suppose it is CPU 0. If CPU 0 is in the 'cpus' list,
@@ -33,13 +33,18 @@ def cstates_info_command(args, pman):
     fmt = "yaml" if args.yaml else "human"
 
     with contextlib.ExitStack() as stack:
-        cpuinfo = CPUInfo.CPUInfo(pman=pman)
+        cpuinfo = CPUInfo.CPUInfo(pman=pman, cachedir=_PepcCommon.get_cpuinfo_cachedir(args, pman))
         stack.enter_context(cpuinfo)
 
         if args.override_cpu_model:
             _PepcCommon.override_cpu_model(cpuinfo, args.override_cpu_model)
 
-        csobj = CStates.CStates(pman=pman, cpuinfo=cpuinfo)
+        agent = _PepcCommon.get_remote_agent(args, pman, cpuinfo)
+        if agent:
+            stack.enter_context(agent)
+            csobj = agent.get_pobj("CStates")
+        else:
+            csobj = CStates.CStates(pman=pman, cpuinfo=cpuinfo)
         stack.enter_context(csobj)
 
         csprint = _PepcPrinter.CStatesPrinter(csobj, cpuinfo, fmt=fmt)
@@ -96,7 +101,7 @@ def cstates_config_command(args, pman):
         _PepcCommon.check_tuned_presence(pman)
 
     with contextlib.ExitStack() as stack:
-        cpuinfo = CPUInfo.CPUInfo(pman=pman)
+        cpuinfo = CPUInfo.CPUInfo(pman=pman, cachedir=_PepcCommon.get_cpuinfo_cachedir(args, pman))
         stack.enter_context(cpuinfo)
 
         if args.override_cpu_model:
@@ -142,7 +147,7 @@ def cstates_save_command(args, pman):
     """Implements the 'cstates save' command."""
 
     with contextlib.ExitStack() as stack:
-        cpuinfo = CPUInfo.CPUInfo(pman=pman)
+        cpuinfo = CPUInfo.CPUInfo(pman=pman, cachedir=_PepcCommon.get_cpuinfo_cachedir(args, pman))
         stack.enter_context(cpuinfo)
 
         csobj = CStates.CStates(pman=pman, cpuinfo=cpuinfo)
@@ -187,7 +192,7 @@ def cstates_restore_command(args, pman):
                     "input)")
 
     with contextlib.ExitStack() as stack:
-        cpuinfo = CPUInfo.CPUInfo(pman=pman)
+        cpuinfo = CPUInfo.CPUInfo(pman=pman, cachedir=_PepcCommon.get_cpuinfo_cachedir(args, pman))
         stack.enter_context(cpuinfo)
 
         msr = MSR.MSR(pman, cpuinfo=cpuinfo)
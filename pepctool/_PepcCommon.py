@@ -10,12 +10,42 @@
 Misc. helpers shared between various 'pepc' commands.
 """
 
+import os
+import sys
 import logging
+from pathlib import Path
 from pepclibs.helperlibs.Exceptions import Error, ErrorNotFound
-from pepclibs.helperlibs import Systemctl, Trivial, ArgParse
+from pepclibs import RemoteAgent
+from pepclibs.helperlibs import Systemctl, Trivial, ArgParse, IOStats
 
 _LOG = logging.getLogger()
 
+def run_command(args, pman):
+    """
+    Run the command defined by 'args' on the host defined by 'pman'. Collect the I/O statistics if
+    the '--stats' or '--stats-trace' options were used, and print the statistics to the standard
+    error stream if the '--stats' option was used.
+    """
+
+    stats = getattr(args, "stats", False)
+    tracepath = getattr(args, "stats_trace", None)
+    if not stats and not tracepath:
+        return args.func(args, pman)
+
+    if tracepath:
+        # The process manager may write the trace from a different working directory (e.g., the SSH
+        # broker process).
+        tracepath = str(Path(tracepath).resolve())
+
+    pman.enable_stats(tracepath=tracepath)
+    try:
+        return args.func(args, pman)
+    finally:
+        if stats:
+            sys.stderr.write(IOStats.format_stats(pman.get_stats(), hostmsg=pman.hostmsg))
+            sys.stderr.flush()
+        pman.disable_stats()
+
 def check_tuned_presence(pman):
     """Check if the 'tuned' service is active, and if it is, print a warning message."""
 
@@ -30,6 +60,37 @@ def check_tuned_presence(pman):
     except Error as err:
         _LOG.warning("failed to check for 'tuned' presence:\n%s", err.indent(2))
 
+def get_cpuinfo_cachedir(args, pman):
+    """
+    Return path to the directory for caching CPU information of the host defined by 'pman' (see
+    'CPUInfo.CPUInfo()'). Returns 'None' if the cache should not be used.
+    """
+
+    if getattr(args, "no_cache", False) or getattr(args, "dataset", None):
+        return None
+
+    basedir = os.environ.get("XDG_CACHE_HOME")
+    if not basedir:
+        basedir = Path("~/.cache").expanduser()
+
+    return Path(basedir) / "pepc" / pman.hostname
+
+def get_remote_agent(args, pman, cpuinfo):
+    """
+    Start and return the 'pepclibs' agent on the host defined by 'pman' (see
+    'RemoteAgent.RemoteAgent()'), if it was requested with the '--agent' option. Returns 'None' if
+    the agent was not requested or if 'pman' defines the local host.
+    """
+
+    if not getattr(args, "agent", False) or not pman.is_remote:
+        return None
+
+    model = None
+    if getattr(args, "override_cpu_model", None):
+        model = cpuinfo.info["model"]
+
+    return RemoteAgent.RemoteAgent(pman, model=model)
+
 def parse_cpus_string(string):
     """
     Parse string of comma-separated numbers and number ranges, and return them as a list of
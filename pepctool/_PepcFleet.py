@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+# vim: ts=4 sw=4 tw=100 et ai si
+#
+# Copyright (C) 2023 Intel Corporation
+# SPDX-License-Identifier: BSD-3-Clause
+#
+# Author: Artem Bityutskiy <artem.bityutskiy@linux.intel.com>
+
+"""
+This module implements the "fleet" mode of 'pepc': running the same command on multiple hosts.
+
+The hosts are processed concurrently by a bounded pool of worker threads. Every worker connects to a
+host and runs the command, and the command output is captured instead of being printed. When the
+command finishes on all hosts, the captured output is printed either per host, or grouped: every
+output entry (e.g., a property value line) is printed once for the group of hosts which printed it.
+"""
+
+import sys
+import copy
+import logging
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from pepclibs.helperlibs import ProcessManager, Trivial
+from pepclibs.helperlibs.Exceptions import Error, ErrorNotFound
+from pepctool import _PepcCommon
+
+_LOG = logging.getLogger()
+
+# The default maximum number of hosts to process concurrently.
+DEFAULT_JOBS = 16
+
+class _OutputRouter:
+    """
+    A file-like object which captures the output of the worker threads. The data written by a worker
+    thread goes to the buffer of the host the thread is working on, the data written by any other
+    thread goes to the original stream.
+    """
+
+    def write(self, data):
+        """Write string 'data' to the buffer of the current thread or to the original stream."""
+
+        chunks = getattr(self._tls, "chunks", None)
+        if chunks is None:
+            return self._stream.write(data)
+
+        chunks.append(data)
+        return len(data)
+
+    def flush(self):
+        """Flush the original stream."""
+
+        if getattr(self._tls, "chunks", None) is None:
+            self._stream.flush()
+
+    def __getattr__(self, name):
+        """Provide the other attributes (e.g., 'name', 'isatty()') of the original stream."""
+        return getattr(self._stream, name)
+
+    def start_capture(self):
+        """Start capturing the output of the current thread. Return the list of captured chunks."""
+
+        self._tls.chunks = []
+        return self._tls.chunks
+
+    def stop_capture(self):
+        """Stop capturing the output of the current thread."""
+        self._tls.chunks = None
+
+    def __init__(self, stream):
+        """The class constructor. The 'stream' argument is the original stream object."""
+
+        self._stream = stream
+        self._tls = threading.local()
+
+@contextlib.contextmanager
+def _routed_output(routers):
+    """
+    Route standard output and error streams, as well as the logger handlers writing to them, via the
+    '(stdout_router, stderr_router)' tuple of '_OutputRouter' objects.
+    """
+
+    streams = (sys.stdout, sys.stderr)
+    handlers = []
+
+    for handler in _LOG.handlers:
+        stream = getattr(handler, "stream", None)
+        if isinstance(handler, logging.StreamHandler) and stream in streams:
+            handlers.append((handler, stream))
+            handler.setStream(routers[streams.index(stream)])
+
+    sys.stdout, sys.stderr = routers
+    try:
+        yield
+    finally:
+        sys.stdout, sys.stderr = streams
+        for handler, stream in handlers:
+            handler.setStream(stream)
+
+def get_hostnames(args):
+    """
+    Return the list of host names to run the command on, or 'None' if a single host was specified.
+    The host names come from the comma-separated '-H' option value and the '--hosts-file' file, which
+    includes one host name per line.
+    """
+
+    hosts_file = getattr(args, "hosts_file", None)
+    if "," not in args.hostname and not hosts_file:
+        return None
+
+    hostnames = []
+    if args.hostname != "localhost" or not hosts_file:
+        hostnames += [name.strip() for name in args.hostname.split(",") if name.strip()]
+
+    if hosts_file:
+        try:
+            with open(hosts_file, "r", encoding="utf-8") as fobj:
+                for line in fobj:
+                    # Ignore empty lines and comments.
+                    line = line.split("#", 1)[0].strip()
+                    if line:
+                        hostnames.append(line)
+        except FileNotFoundError:
+            raise ErrorNotFound(f"hosts file '{hosts_file}' does not exist") from None
+        except OSError as err:
+            msg = Error(err).indent(2)
+            raise Error(f"failed to read hosts file '{hosts_file}':\n{msg}") from None
+
+    if not hostnames:
+        raise Error(f"bad host names list '{args.hostname}'")
+
+    return Trivial.list_dedup(hostnames)
+
+def _run_on_host(args, hostname, routers):
+    """
+    Run the command on host 'hostname' and capture its output. Return a '(stdout, stderr, ok)'
+    tuple, where 'ok' is 'False' if the command failed.
+    """
+
+    chunks = [router.start_capture() for router in routers]
+
+    # Do not share the mutable arguments between the worker threads.
+    hargs = copy.deepcopy(args)
+    hargs.hostname = hostname
+    if hostname == "localhost":
+        hargs.username = hargs.privkey = hargs.timeout = None
+    if getattr(hargs, "stats_trace", None):
+        hargs.stats_trace = f"{hargs.stats_trace}.{hostname}"
+
+    ok = True
+    try:
+        with ProcessManager.get_pman(hostname, username=hargs.username,
+                                     privkeypath=hargs.privkey, timeout=hargs.timeout,
+                                     broker=getattr(hargs, "ssh_broker", False)) as pman:
+            _PepcCommon.run_command(hargs, pman)
+    except Error as err:
+        _LOG.error(err)
+        ok = False
+    except Exception as err: # pylint: disable=broad-except
+        # A bug should not prevent reporting the results for the other hosts.
+        _LOG.debug("unexpected exception on host '%s':", hostname, exc_info=True)
+        _LOG.error("unexpected error on host '%s': %s: %s", hostname, type(err).__name__, err)
+        ok = False
+    finally:
+        for router in routers:
+            router.stop_capture()
+
+    return "".join(chunks[0]), "".join(chunks[1]), ok
+
+def _print_header(args, hostnames):
+    """Print the header line for the output of hosts in 'hostnames'."""
+
+    hosts = ", ".join(hostnames)
+    if getattr(args, "yaml", False):
+        # Start a new YAML document, so that the entire output is a valid multi-document YAML.
+        sys.stdout.write(f"--- # {hosts}\n")
+    else:
+        _LOG.info("\n======= %s =======", hosts)
+
+def _split_entries(text):
+    """
+    Split the command output 'text' into entries and return the list of entries. An entry is a line
+    along with the following lines which are indented or start with '-'. For example, in YAML
+    format an entry is a top-level key with its value.
+    """
+
+    entries = []
+    for line in text.splitlines(keepends=True):
+        if entries and (line[:1].isspace() or line.startswith("-")):
+            entries[-1] += line
+        else:
+            entries.append(line)
+
+    return entries
+
+def _print_grouped(args, results):
+    """
+    Print the command output for all hosts grouped by entries (see '_split_entries()'): every entry
+    is printed once for the group of hosts which printed it. The 'results' argument is the
+    '{hostname: (stdout, stderr, ok)}' dictionary.
+    """
+
+    # Map every '(entry, occurrence number)' to the list of hosts which printed the entry.
+    entry2hosts = {}
+    for hostname, (stdout, _, _) in results.items():
+        counts = {}
+        for entry in _split_entries(stdout):
+            counts[entry] = counts.get(entry, 0) + 1
+            entry2hosts.setdefault((entry, counts[entry]), []).append(hostname)
+
+    # Group the entries by the hosts which printed them.
+    groups = {}
+    for (entry, _), hosts in entry2hosts.items():
+        groups.setdefault(tuple(hosts), []).append(entry)
+
+    for hosts, entries in groups.items():
+        _print_header(args, hosts)
+        sys.stdout.write("".join(entries))
+        sys.stdout.flush()
+
+    # The error messages are printed per host.
+    for hostname, (_, stderr, _) in results.items():
+        if stderr:
+            _print_header(args, [hostname])
+            sys.stderr.write(stderr)
+            sys.stderr.flush()
+
+def run(args, hostnames):
+    """
+    Run the command defined by 'args' on every host in 'hostnames' and print the output. Returns
+    the list of host names the command failed on.
+    """
+
+    jobs = getattr(args, "jobs", None)
+    if jobs is None:
+        jobs = DEFAULT_JOBS
+    if not Trivial.is_int(jobs) or int(jobs) < 1:
+        raise Error(f"bad jobs count '{jobs}', should be a positive integer")
+    jobs = min(int(jobs), len(hostnames))
+
+    _LOG.debug("running on %d hosts, %d jobs", len(hostnames), jobs)
+
+    routers = (_OutputRouter(sys.stdout), _OutputRouter(sys.stderr))
+    with _routed_output(routers), ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(_run_on_host, args, hostname, routers)
+                   for hostname in hostnames]
+        results = dict(zip(hostnames, (future.result() for future in futures)))
+
+    if getattr(args, "group_hosts", False):
+        _print_grouped(args, results)
+    else:
+        for hostname, (stdout, stderr, _) in results.items():
+            _print_header(args, [hostname])
+            sys.stdout.write(stdout)
+            sys.stdout.flush()
+            sys.stderr.write(stderr)
+            sys.stderr.flush()
+
+    failed = [hostname for hostname, (_, _, ok) in results.items() if not ok]
+    if failed:
+        _LOG.error("failed on %d out of %d hosts: %s", len(failed), len(hostnames),
+                   ", ".join(failed))
+
+    return failed
@@ -33,13 +33,18 @@ def power_info_command(args, pman):
     fmt = "yaml" if args.yaml else "human"
 
     with contextlib.ExitStack() as stack:
-        cpuinfo = CPUInfo.CPUInfo(pman=pman)
+        cpuinfo = CPUInfo.CPUInfo(pman=pman, cachedir=_PepcCommon.get_cpuinfo_cachedir(args, pman))
         stack.enter_context(cpuinfo)
 
         if args.override_cpu_model:
             _PepcCommon.override_cpu_model(cpuinfo, args.override_cpu_model)
 
-        pobj = Power.Power(pman=pman, cpuinfo=cpuinfo)
+        agent = _PepcCommon.get_remote_agent(args, pman, cpuinfo)
+        if agent:
+            stack.enter_context(agent)
+            pobj = agent.get_pobj("Power")
+        else:
+            pobj = Power.Power(pman=pman, cpuinfo=cpuinfo)
         stack.enter_context(pobj)
 
         pprint = _PepcPrinter.CStatesPrinter(pobj, cpuinfo, fmt=fmt)
@@ -78,7 +83,7 @@ def power_config_command(args, pman):
         _PepcCommon.check_tuned_presence(pman)
 
     with contextlib.ExitStack() as stack:
-        cpuinfo = CPUInfo.CPUInfo(pman=pman)
+        cpuinfo = CPUInfo.CPUInfo(pman=pman, cachedir=_PepcCommon.get_cpuinfo_cachedir(args, pman))
         stack.enter_context(cpuinfo)
 
         if args.override_cpu_model:
@@ -107,7 +112,7 @@ def power_save_command(args, pman):
     """Implements the 'power save' command."""
 
     with contextlib.ExitStack() as stack:
-        cpuinfo = CPUInfo.CPUInfo(pman=pman)
+        cpuinfo = CPUInfo.CPUInfo(pman=pman, cachedir=_PepcCommon.get_cpuinfo_cachedir(args, pman))
         stack.enter_context(cpuinfo)
 
         pobj = Power.Power(pman=pman, cpuinfo=cpuinfo)
@@ -148,7 +153,7 @@ def power_restore_command(args, pman):
                     "input)")
 
     with contextlib.ExitStack() as stack:
-        cpuinfo = CPUInfo.CPUInfo(pman=pman)
+        cpuinfo = CPUInfo.CPUInfo(pman=pman, cachedir=_PepcCommon.get_cpuinfo_cachedir(args, pman))
         stack.enter_context(cpuinfo)
 
         msr = MSR.MSR(pman, cpuinfo=cpuinfo)
@@ -204,6 +204,56 @@ class _PropsPrinter(ClassHelpers.SimpleCloseContext):
 
         return aggr_pinfo
 
+    @staticmethod
+    def _build_aggr_pinfo_from_table(ptable, spnames="all"):
+        """
+        Same as '_build_aggr_pinfo()', but build the aggregate properties dictionary from the
+        properties table 'ptable' (see 'PropsClassBase.get_props_table()').
+        """
+
+        aggr_pinfo = {}
+
+        for pname in ptable.pnames:
+            aggr_pinfo[pname] = {}
+
+            # Sub-properties of an unsupported property are not printed.
+            unsupported_cpus = set()
+            for val, cpus in ptable.get_groups(pname):
+                if val is None:
+                    unsupported_cpus.update(cpus)
+
+            for key in ptable.columns[pname]:
+                if key != pname:
+                    if spnames is None:
+                        continue
+                    if spnames != "all" and key not in spnames:
+                        continue
+
+                for val, cpus in ptable.get_groups(pname, key=key):
+                    if key != pname and unsupported_cpus:
+                        cpus = [cpu for cpu in cpus if cpu not in unsupported_cpus]
+                        if not cpus:
+                            continue
+
+                    # Make sure 'val' is "hashable" and can be used as a dictionary key.
+                    if isinstance(val, list):
+                        if not val:
+                            continue
+                        val = ", ".join(val)
+                    elif isinstance(val, dict):
+                        if not val:
+                            continue
+                        val = ", ".join(f"{k}={v}" for k, v in val.items())
+
+                    if key not in aggr_pinfo[pname]:
+                        aggr_pinfo[pname][key] = {}
+                    if val not in aggr_pinfo[pname][key]:
+                        aggr_pinfo[pname][key][val] = []
+
+                    aggr_pinfo[pname][key][val] += cpus
+
+        return aggr_pinfo
+
     @staticmethod
     def _adjust_aggr_pinfo_pcs_limit(aggr_pinfo):
         """
@@ -267,8 +317,8 @@ class _PropsPrinter(ClassHelpers.SimpleCloseContext):
         else:
             spnames = "all"
 
-        pinfo_iter = self._pcsobj.get_props(pnames, cpus=cpus)
-        aggr_pinfo = self._build_aggr_pinfo(pinfo_iter, spnames=spnames)
+        ptable = self._pcsobj.get_props_table(pnames, cpus=cpus)
+        aggr_pinfo = self._build_aggr_pinfo_from_table(ptable, spnames=spnames)
 
         if skip_ro and "pkg_cstate_limit" in aggr_pinfo:
             # Special case: the package C-state limit option is read-write in general, but if it is
@@ -53,7 +53,8 @@ def _get_default_colnames(cpuinfo):
 def topology_info_command(args, pman):
     """Implements the 'topology info' command."""
 
-    with CPUInfo.CPUInfo(pman=pman) as cpuinfo:
+    cachedir = _PepcCommon.get_cpuinfo_cachedir(args, pman)
+    with CPUInfo.CPUInfo(pman=pman, cachedir=cachedir) as cpuinfo:
         if args.columns is None:
             colnames = _get_default_colnames(cpuinfo)
         else:
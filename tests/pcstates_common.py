@@ -110,3 +110,53 @@ def verify_props_value_type(props, pinfo):
         for subpname in props[pname]["subprops"]:
             _verify_value_type(subpname, props[pname]["subprops"][subpname]["type"],
                                pinfo[pname][subpname])
+
+def verify_get_props_per_cpu(pcobj, cpus):
+    """
+    Verify that 'get_props()', which reads properties once per scope instance, yields the same
+    values as reading the properties CPU-by-CPU.
+
+    The argument are as follows.
+     * pcobj - 'CStates', 'PStates' or 'Power' object.
+     * cpus - list of CPUs.
+    """
+
+    pnames = list(pcobj.props)
+    for cpu, pinfo in pcobj.get_props(pnames, cpus):
+        cpu_pinfo = pcobj.get_cpu_props(pnames, cpu)
+        assert pinfo == cpu_pinfo, f"'get_props()' and 'get_cpu_props()' returned different " \
+                                   f"values for CPU {cpu}:\n{pinfo}\n{cpu_pinfo}"
+
+def verify_get_props_table(pcobj, cpus):
+    """
+    Verify that the properties table returned by 'get_props_table()' includes the same values as
+    yielded by 'get_props()', and verify the table value groups.
+
+    The argument are as follows.
+     * pcobj - 'CStates', 'PStates' or 'Power' object.
+     * cpus - list of CPUs or "all".
+    """
+
+    pnames = list(pcobj.props)
+    ptable = pcobj.get_props_table(pnames, cpus)
+    assert ptable.pnames == pnames
+
+    cpus = []
+    for cpu, pinfo in pcobj.get_props(pnames, ptable.cpus):
+        cpus.append(cpu)
+        for pname, kinfo in pinfo.items():
+            for key, val in kinfo.items():
+                tval = ptable.get_value(pname, cpu, key=key)
+                assert tval == val, f"'get_props_table()' and 'get_props()' returned different " \
+                                    f"'{key}' values for CPU {cpu}: {tval} and {val}"
+
+    assert list(ptable.cpus) == cpus
+
+    for pname, pcolumns in ptable.columns.items():
+        for key in pcolumns:
+            gcpus = []
+            for val, group in ptable.get_groups(pname, key=key):
+                gcpus += group
+                for cpu in group:
+                    assert ptable.get_value(pname, cpu, key=key) == val
+            assert sorted(gcpus) == sorted(cpus)
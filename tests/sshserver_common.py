@@ -0,0 +1,669 @@
+#!/usr/bin/env python3
+#
+# -*- coding: utf-8 -*-
+# vim: ts=4 sw=4 tw=100 et ai si
+#
+# Copyright (C) 2023 Intel Corporation
+# SPDX-License-Identifier: BSD-3-Clause
+#
+# Author: Artem Bityutskiy <artem.bityutskiy@linux.intel.com>
+
+"""
+An in-process SSH server for exercising 'SSHProcessManager' without a real SSH server and without a
+network. The server listens on the loopback interface and accepts any user name and password or key.
+
+The server supports SFTP and command execution, and it is backed by a process manager.
+  * A 'LocalProcessManager' backend: SFTP is backed by the local file-system, and the commands are
+    run with the local shell. This is similar to an SSH connection to 'localhost'.
+  * An 'EmulProcessManager' backend: SFTP is backed by the emulated files of the dataset, and the
+    commands are run by a tiny emulated shell, which understands the interactive shell protocol of
+    'SSHProcessManager' and runs the commands with the 'EmulProcessManager.run()' method. This makes
+    it possible to run 'pepc' against a test dataset via SSH.
+
+SECURITY NOTICE: the server accepts any credentials, use it only for testing.
+"""
+
+import os
+import re
+import shlex
+import socket
+import struct
+import logging
+import threading
+import subprocess
+import paramiko
+from pepclibs.helperlibs import ClassHelpers, LocalProcessManager, SSHProcessManager
+from pepclibs.helperlibs.Exceptions import Error, ErrorNotFound, ErrorPermissionDenied
+
+_LOG = logging.getLogger()
+
+# The host key, generated on first use.
+_HOST_KEY = None
+_HOST_KEY_LOCK = threading.Lock()
+
+# The PID prefix 'SSHProcessManager' adds to commands run via shell (see '_format_cmd_for_pid()').
+_PID_PREFIX_RE = re.compile(r'^printf "%s\\n" "\$\$";( cd "(?P<cwd>[^"]*)" &&)? exec (?P<cmd>.*)$',
+                            re.DOTALL)
+# The 'shell_test()' command of 'SSHProcessManager'.
+_SHELL_TEST_RE = re.compile(r'^sh -c (-l )?\'test (?P<opt>-[efdxS]) "(?P<path>[^"]*)"\'$')
+
+# The 'mkdtemp()' command of 'SSHProcessManager'.
+_MKTEMP_RE = re.compile(r"^mktemp -d -t '(?P<prefix>[^']*)XXXXXX'( -p '(?P<basedir>[^']*)')?$")
+# The commands which do not depend on the emulated host, and are run on the local host instead.
+_LOCAL_CMD_RE = re.compile(r"^((/usr/bin/)?python3? --version|date \+%s)$")
+# The 'which()' command of 'SSHProcessManager'.
+_WHICH_RE = re.compile(r"^which -- '(?P<prog>[^']*)'$")
+# The shell helper command of the 'BatchIO' module, with the operations in a here-document.
+_BATCH_IO_RE = re.compile(r"^sh -c '.*' batch_io '(?P<marker>[^']*)' <<'(?P<eof>\w+)'\n"
+                          r"(?P<ops>.*)\n(?P=eof)$", re.DOTALL)
+# An octal escape sequence in the MSR value of the 'BatchIO' MSR write operation.
+_OCTAL_RE = re.compile(r"\\([0-7]{3})")
+
+# How long a command waits for the reply to its exec request to be sent, in seconds.
+_EXEC_REPLY_TIMEOUT = 10
+
+# Map 'test' command options to the process manager methods.
+_SHELL_TEST_METHODS = {"-e": "exists", "-f": "is_file", "-d": "is_dir", "-x": "is_exe",
+                       "-S": "is_socket"}
+
+def _get_host_key():
+    """Return the server host key. Generate it on first use."""
+
+    global _HOST_KEY # pylint: disable=global-statement
+
+    with _HOST_KEY_LOCK:
+        if not _HOST_KEY:
+            _HOST_KEY = paramiko.RSAKey.generate(2048)
+    return _HOST_KEY
+
+def _find_command_end(buf):
+    """
+    Return index of the new line character which terminates the first shell command in 'buf', or
+    'None' if 'buf' does not include a complete command yet. New lines inside quotes do not
+    terminate the command.
+    """
+
+    quote = None
+    escape = False
+    for idx, char in enumerate(buf):
+        if escape:
+            escape = False
+        elif quote:
+            if char == quote:
+                quote = None
+            elif char == "\\" and quote == '"':
+                escape = True
+        elif char in ("'", '"'):
+            quote = char
+        elif char == "\\":
+            escape = True
+        elif char == "\n":
+            return idx
+    return None
+
+def _flags_to_mode(flags):
+    """Convert 'os.open()' flags 'flags' to a python 'open()' mode string."""
+
+    if flags & os.O_APPEND:
+        mode = "a"
+    elif flags & os.O_TRUNC or flags & os.O_CREAT:
+        mode = "w"
+    else:
+        mode = "r"
+
+    if flags & os.O_RDWR:
+        mode += "+"
+    return mode
+
+def _error_to_sftp(err):
+    """Convert 'pepclibs' exception 'err' to an SFTP error code."""
+
+    if isinstance(err, ErrorNotFound):
+        return paramiko.SFTP_NO_SUCH_FILE
+    if isinstance(err, ErrorPermissionDenied):
+        return paramiko.SFTP_PERMISSION_DENIED
+    return paramiko.SFTP_FAILURE
+
+class _LocalHandle(paramiko.SFTPHandle):
+    """An SFTP file handle backed by a local file."""
+
+    def stat(self):
+        """Return the file attributes."""
+
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+        except OSError as err:
+            return paramiko.SFTPServer.convert_errno(err.errno)
+
+class _EmulHandle(paramiko.SFTPHandle):
+    """An SFTP file handle backed by an emulated file object."""
+
+    def read(self, offset, length):
+        """Read 'length' bytes at offset 'offset'."""
+
+        try:
+            if self._binary:
+                self._fobj.seek(offset)
+                return self._fobj.read(length)
+
+            # The emulated text files may override 'read()' and do not support partial reads, so
+            # read the entire file at once.
+            if self._data is None:
+                self._data = self._fobj.read().encode("utf-8")
+            return self._data[offset:offset + length]
+        except Error as err:
+            _LOG.debug("failed to read '%s':\n%s", self.filename, err.indent(2))
+            return paramiko.SFTP_FAILURE
+
+    def write(self, offset, data):
+        """Write 'data' at offset 'offset'."""
+
+        try:
+            if self._binary:
+                self._fobj.seek(offset)
+            else:
+                data = data.decode("utf-8")
+            self._fobj.write(data)
+            self._fobj.flush()
+        except Error as err:
+            _LOG.debug("failed to write to '%s':\n%s", self.filename, err.indent(2))
+            return paramiko.SFTP_FAILURE
+
+        return paramiko.SFTP_OK
+
+    def stat(self):
+        """Return the file attributes. The size is not known."""
+        return paramiko.SFTP_OP_UNSUPPORTED
+
+    def close(self):
+        """Close the file."""
+
+        if self._fobj:
+            self._fobj.close()
+            self._fobj = None
+
+    def __init__(self, fobj, filename, binary, flags=0):
+        """
+        The class constructor. The arguments are as follows.
+          * fobj - the emulated file object.
+          * filename - path to the file.
+          * binary - 'True' if the file object is opened in binary mode.
+          * flags - the 'os.open()' flags the file was opened with.
+        """
+
+        super().__init__(flags)
+
+        self._fobj = fobj
+        self.filename = filename
+        self._binary = binary
+        self._data = None
+
+class _SFTPInterface(paramiko.SFTPServerInterface):
+    """The SFTP server interface, which forwards the requests to the backend."""
+
+    def open(self, path, flags, attr):
+        """Open file 'path'."""
+        return self._backend.sftp_open(path, flags)
+
+    def stat(self, path):
+        """Return attributes of file 'path'."""
+        return self._backend.sftp_stat(path)
+
+    def lstat(self, path):
+        """Return attributes of file 'path'."""
+        return self._backend.sftp_stat(path)
+
+    def __init__(self, server, *args, backend=None, **kwargs):
+        """The class constructor. The 'backend' argument is the server backend object."""
+
+        super().__init__(server, *args, **kwargs)
+        self._backend = backend
+
+class _LocalBackend:
+    """The local host backend: the local file-system and the local shell."""
+
+    @staticmethod
+    def sftp_open(path, flags):
+        """Open file 'path' with 'os.open()' flags 'flags' and return the SFTP handle."""
+
+        try:
+            fd = os.open(path, flags, 0o644)
+        except OSError as err:
+            return paramiko.SFTPServer.convert_errno(err.errno)
+
+        # Note, 'os.fdopen()' does not truncate the file, the 'flags' define the behavior.
+        if flags & os.O_RDWR:
+            mode = "r+b"
+        elif flags & os.O_WRONLY:
+            mode = "ab" if flags & os.O_APPEND else "wb"
+        else:
+            mode = "rb"
+
+        handle = _LocalHandle(flags)
+        # pylint: disable=consider-using-with
+        fobj = os.fdopen(fd, mode, buffering=0)
+        handle.readfile = handle.writefile = fobj
+        handle.filename = path
+        return handle
+
+    @staticmethod
+    def sftp_stat(path):
+        """Return attributes of file 'path'."""
+
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.stat(path))
+        except OSError as err:
+            return paramiko.SFTPServer.convert_errno(err.errno)
+
+    @staticmethod
+    def execute(chan, command):
+        """Run command 'command' with the local shell and forward its I/O to channel 'chan'."""
+
+        # pylint: disable=consider-using-with
+        proc = subprocess.Popen(command, shell=True, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE)
+
+        def _forward_stdin():
+            """Forward the channel data to the process standard input."""
+
+            try:
+                while True:
+                    data = chan.recv(65536)
+                    if not data:
+                        break
+                    proc.stdin.write(data)
+                    proc.stdin.flush()
+            except (OSError, EOFError):
+                pass
+            finally:
+                proc.stdin.close()
+
+        def _forward_stderr():
+            """Forward the process standard error to the channel."""
+
+            for data in iter(lambda: proc.stderr.read1(65536), b""):
+                chan.sendall_stderr(data)
+
+        threading.Thread(target=_forward_stdin, daemon=True).start()
+        stderr_thread = threading.Thread(target=_forward_stderr, daemon=True)
+        stderr_thread.start()
+
+        for data in iter(lambda: proc.stdout.read1(65536), b""):
+            chan.sendall(data)
+
+        stderr_thread.join()
+        return proc.wait()
+
+class _EmulBackend:
+    """
+    The emulated host backend: the files and commands emulated by an 'EmulProcessManager' object.
+    """
+
+    def sftp_open(self, path, flags):
+        """Open file 'path' with 'os.open()' flags 'flags' and return the SFTP handle."""
+
+        # The emulated MSR device files are binary files, all the others are text files.
+        binary = path.endswith("/msr")
+        mode = _flags_to_mode(flags)
+        if binary:
+            mode += "b"
+
+        try:
+            fobj = self._pman.open(path, mode)
+        except Error as err:
+            return _error_to_sftp(err)
+
+        return _EmulHandle(fobj, path, binary, flags=flags)
+
+    def sftp_stat(self, path):
+        """Return attributes of file 'path'."""
+
+        attrs = paramiko.SFTPAttributes()
+        if self._pman.is_dir(path):
+            attrs.st_mode = 0o40755
+            return attrs
+
+        try:
+            with self._pman.open(path, "r") as fobj:
+                attrs.st_size = len(fobj.read())
+        except Error as err:
+            return _error_to_sftp(err)
+
+        attrs.st_mode = 0o100644
+        return attrs
+
+    def _run_batch_io_op(self, line):
+        """
+        Run a single operation line of the 'BatchIO' shell helper. Return the '(status, data)'
+        tuple.
+        """
+
+        op, _, args = line.partition(" ")
+        try:
+            if op == "r":
+                with self._pman.open(args, "r") as fobj:
+                    return 0, fobj.read().rstrip("\n")
+            if op == "w":
+                path, _, val = args.partition(" ")
+                with self._pman.open(path, "r+") as fobj:
+                    fobj.write(val)
+                return 0, ""
+            if op in ("m", "M"):
+                args = args.split()
+                with self._pman.open(f"/dev/cpu/{args[0]}/msr", "rb" if op == "m" else "r+b") \
+                     as fobj:
+                    fobj.seek(int(args[1]))
+                    if op == "m":
+                        return 0, str(int.from_bytes(fobj.read(8), byteorder="little"))
+                    fobj.write(bytes(int(val, 8) for val in _OCTAL_RE.findall(args[2])))
+                    return 0, ""
+        except Error as err:
+            return 1, str(err)
+
+        return 1, f"bad operation '{op}'"
+
+    def _run_batch_io(self, marker, ops, out):
+        """Emulate the 'BatchIO' shell helper for operation lines 'ops'."""
+
+        for idx, line in enumerate(ops.split("\n")):
+            status, data = self._run_batch_io_op(line)
+            out[0](f"{marker} {idx} {status}\n{data}\n".encode("utf-8"))
+        return 0
+
+    def _run(self, command, out):
+        """
+        Run command 'command' and write the output to 'out', which is a '(stdout, stderr)' tuple of
+        functions sending data. Return the exit code.
+        """
+
+        match = re.match(_PID_PREFIX_RE, command)
+        if match:
+            # Emulate printing the PID by the shell.
+            out[0](f"{os.getpid()}\n".encode("utf-8"))
+            command = match.group("cmd")
+
+        match = re.match(_SHELL_TEST_RE, command)
+        if match:
+            method = getattr(self._pman, _SHELL_TEST_METHODS[match.group("opt")])
+            return 0 if method(match.group("path")) else 1
+
+        match = re.match(_MKTEMP_RE, command)
+        if match:
+            path = self._pman.mkdtemp(prefix=match.group("prefix"), basedir=match.group("basedir"))
+            out[0](f"{path}\n".encode("utf-8"))
+            return 0
+
+        match = re.match(_WHICH_RE, command)
+        if match:
+            path = self._pman.which(match.group("prog"), must_find=False)
+            if not path:
+                return 1
+            out[0](f"{path}\n".encode("utf-8"))
+            return 0
+
+        match = re.match(_BATCH_IO_RE, command)
+        if match:
+            return self._run_batch_io(match.group("marker"), match.group("ops"), out)
+
+        if re.match(_LOCAL_CMD_RE, command):
+            result = subprocess.run(command, shell=True, capture_output=True, check=False)
+            out[0](result.stdout)
+            out[1](result.stderr)
+            return result.returncode
+
+        try:
+            stdout, stderr, exitcode = self._pman.run(command, join=True)
+        except ErrorNotFound as err:
+            out[1](f"sh: {err}\n".encode("utf-8"))
+            return 127
+        except Error as err:
+            out[1](f"sh: command is not supported by the emulated host: {command}\n{err}\n"
+                   .encode("utf-8"))
+            return 127
+
+        if stdout:
+            out[0](stdout.encode("utf-8"))
+        if stderr:
+            out[1](stderr.encode("utf-8"))
+        return exitcode
+
+    def _run_shell(self, chan, out):
+        """
+        Emulate the interactive shell ('sh -s'): read the commands from channel 'chan' and run them.
+        Supports the commands 'SSHProcessManager' sends to the interactive shell.
+        """
+
+        buf = ""
+        exitcode = 0
+        while True:
+            data = chan.recv(65536)
+            if not data:
+                return exitcode
+            buf += data.decode("utf-8")
+
+            while True:
+                # A command may span multiple lines if it includes quoted new lines.
+                idx = _find_command_end(buf)
+                if idx is None:
+                    break
+                line = buf[:idx]
+                buf = buf[idx + 1:]
+                words = shlex.split(line)
+
+                if not words:
+                    continue
+                if words == ["exit"]:
+                    return exitcode
+                if words[0] == "printf":
+                    # Print the command finish marker.
+                    args = [str(exitcode) if arg == "$?" else arg for arg in words[2:]]
+                    out[0]((words[1].replace("%d", "%s") % tuple(args)).encode("utf-8"))
+                elif words[:2] == ["sh", "-c"] and len(words) == 3:
+                    exitcode = self._run(words[2], out)
+                else:
+                    exitcode = self._run(line, out)
+
+    def execute(self, chan, command):
+        """Run command 'command' on the emulated host and send its output to channel 'chan'."""
+
+        out = (chan.sendall, chan.sendall_stderr)
+        if command == "sh -s":
+            return self._run_shell(chan, out)
+        return self._run(command, out)
+
+    def __init__(self, pman):
+        """The class constructor. The 'pman' argument is the 'EmulProcessManager' object."""
+        self._pman = pman
+
+class _ServerInterface(paramiko.ServerInterface):
+    """The SSH server interface: accepts any credentials and runs commands via the backend."""
+
+    def get_allowed_auths(self, username):
+        """Return the allowed authentication methods."""
+        return "password,publickey"
+
+    def check_auth_none(self, username):
+        """Accept any user."""
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_auth_password(self, username, password):
+        """Accept any password."""
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_auth_publickey(self, username, key):
+        """Accept any key."""
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_channel_request(self, kind, chanid):
+        """Accept session channels."""
+
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_exec_request(self, channel, command):
+        """
+        Run command 'command' in a separate thread. The reply to the exec request is sent only after
+        this method returns, so the thread waits for it. Otherwise a fast command could close the
+        channel before the reply is sent, and the client would fail with "Channel closed".
+        """
+
+        replied = channel.get_transport().expect_reply(channel)
+
+        def _execute():
+            """Wait for the exec request reply, run the command and close the channel."""
+
+            if not replied.wait(timeout=_EXEC_REPLY_TIMEOUT):
+                _LOG.debug("SSH server: exec request reply was not sent in %d seconds",
+                           _EXEC_REPLY_TIMEOUT)
+
+            exitcode = 255
+            try:
+                exitcode = self._backend.execute(channel, command.decode("utf-8"))
+            except Exception as err: # pylint: disable=broad-except
+                _LOG.debug("failed to run command '%s': %s", command, err)
+            finally:
+                try:
+                    channel.send_exit_status(exitcode)
+                    channel.close()
+                except (OSError, EOFError):
+                    pass
+
+        threading.Thread(target=_execute, daemon=True).start()
+        return True
+
+    def __init__(self, backend):
+        """The class constructor. The 'backend' argument is the server backend object."""
+        self._backend = backend
+
+class _Transport(paramiko.Transport):
+    """
+    The SSH server transport. Paramiko sends the reply to a channel request after the server
+    interface method handling the request returns, and does not provide a way to find out when the
+    reply has been sent. This class signals an event when it sends the reply.
+    """
+
+    def expect_reply(self, channel):
+        """
+        Return an event which is set once the reply to the current request on channel 'channel' has
+        been sent.
+        """
+
+        event = threading.Event()
+        with self._replies_lock:
+            self._replies[channel.remote_chanid] = event
+        return event
+
+    def _send_user_message(self, data):
+        """Send message 'data' and signal the event if it is a channel request reply."""
+
+        super()._send_user_message(data)
+
+        raw = data.asbytes()
+        if raw[0] not in (paramiko.common.MSG_CHANNEL_SUCCESS,
+                          paramiko.common.MSG_CHANNEL_FAILURE):
+            return
+
+        chanid = struct.unpack(">I", raw[1:5])[0]
+        with self._replies_lock:
+            event = self._replies.pop(chanid, None)
+        if event:
+            event.set()
+
+    def __init__(self, sock):
+        """The class constructor. The 'sock' argument is the connected socket."""
+
+        super().__init__(sock)
+
+        # The events to signal when the channel request reply is sent, indexed by the remote
+        # channel ID.
+        self._replies = {}
+        self._replies_lock = threading.Lock()
+
+class SSHServer(ClassHelpers.SimpleCloseContext):
+    """
+    An in-process SSH server backed by a process manager. Refer to the module docstring for more
+    information.
+    """
+
+    def _serve(self):
+        """Accept connections and start an SSH server transport for every connection."""
+
+        while True:
+            try:
+                conn, _ = self._lsock.accept()
+            except OSError:
+                # The listening socket has been closed.
+                return
+
+            # Disable the Nagle algorithm, otherwise small SSH packets get delayed.
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            transport = _Transport(conn)
+            transport.add_server_key(_get_host_key())
+            transport.set_subsystem_handler("sftp", paramiko.SFTPServer,
+                                            sftp_si=_SFTPInterface, backend=self._backend)
+            with self._lock:
+                self._transports.append(transport)
+            try:
+                transport.start_server(server=_ServerInterface(self._backend))
+            except (paramiko.SSHException, EOFError, OSError) as err:
+                _LOG.debug("SSH server: failed to start a session: %s", err)
+
+    def get_pman(self, **kwargs):
+        """
+        Connect to the server and return the 'SSHProcessManager' object. The 'kwargs' are passed to
+        the 'SSHProcessManager' constructor.
+        """
+
+        kwargs.setdefault("hostname", self.hostname)
+        kwargs.setdefault("username", "pepc")
+        kwargs.setdefault("password", "pepc")
+        return SSHProcessManager.SSHProcessManager(ipaddr=self.ipaddr, port=self.port, **kwargs)
+
+    def close(self):
+        """Stop the server."""
+
+        if getattr(self, "_lsock", None):
+            self._lsock.close()
+            self._lsock = None
+
+        for transport in getattr(self, "_transports", []):
+            transport.close()
+        self._transports = []
+
+        ClassHelpers.close(self, close_attrs=("_pman",))
+
+    def __init__(self, pman=None, hostname=None):
+        """
+        Start the server. The arguments are as follows.
+          * pman - the process manager to back the server with, the local host by default. Must be
+                   a 'LocalProcessManager' or an 'EmulProcessManager' object.
+          * hostname - the host name for the process managers connecting to the server, default is
+                       the data set name for an emulated host, and "sshserver" otherwise.
+        """
+
+        self._pman = pman
+        self._close_pman = pman is None
+        self._lsock = None
+        self._transports = []
+        self._lock = threading.Lock()
+
+        if not self._pman:
+            self._pman = LocalProcessManager.LocalProcessManager()
+
+        if hasattr(self._pman, "datapath"):
+            self._backend = _EmulBackend(self._pman)
+            default_hostname = self._pman.hostname
+        else:
+            self._backend = _LocalBackend()
+            default_hostname = "sshserver"
+
+        self.hostname = hostname or default_hostname
+        self.ipaddr = "127.0.0.1"
+
+        self._lsock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._lsock.bind((self.ipaddr, 0))
+        self._lsock.listen(16)
+        self.port = self._lsock.getsockname()[1]
+
+        threading.Thread(target=self._serve, daemon=True).start()
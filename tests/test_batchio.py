@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+#
+# -*- coding: utf-8 -*-
+# vim: ts=4 sw=4 tw=100 et ai si
+#
+# Copyright (C) 2023 Intel Corporation
+# SPDX-License-Identifier: BSD-3-Clause
+#
+# Author: Artem Bityutskiy <artem.bityutskiy@linux.intel.com>
+
+"""Test the 'BatchIO' module."""
+
+import pytest
+import common
+from pepclibs.helperlibs import BatchIO, LocalProcessManager
+from pepclibs.helperlibs.Exceptions import Error
+
+def _get_pman(hostspec):
+    """
+    Return a process manager for testing. The batch I/O helper is a shell script, which cannot run
+    on an emulated host, so use the local host instead of an emulated one.
+    """
+
+    pman = common.get_pman(hostspec)
+    if common.is_emulated(pman):
+        pman.close()
+        pman = LocalProcessManager.LocalProcessManager()
+
+    return pman
+
+def test_batchio(hostspec):
+    """Test the 'execute()', 'read_files()' and 'grep_files()' functions."""
+
+    with _get_pman(hostspec) as pman:
+        tmpdir = pman.mkdtemp(prefix="test_batchio_")
+        try:
+            contents = {tmpdir / "multiline": "line 1\nline 2", tmpdir / "empty": "",
+                        tmpdir / "int": "123"}
+            for path, data in contents.items():
+                with pman.open(path, "w") as fobj:
+                    fobj.write(data + "\n")
+
+            missing = tmpdir / "missing"
+            result = BatchIO.read_files(list(contents) + [missing], pman=pman)
+            assert result == {**contents, missing: None}
+
+            path = tmpdir / "int"
+            ops = [("write", path, "456 789"), ("read", path), ("read", missing)]
+            assert BatchIO.execute(ops, pman=pman) == [None, "456 789", None]
+
+            with pytest.raises(Error):
+                BatchIO.execute([("write", missing / "file", "1")], pman=pman)
+
+            with pytest.raises(Error):
+                BatchIO.execute([("bad_op", path)], pman=pman)
+
+            result = BatchIO.grep_files([tmpdir / "*i*", missing], pman=pman)
+            assert result == {tmpdir / "multiline": "line 1\nline 2", tmpdir / "int": "456 789"}
+
+            with pytest.raises(Error):
+                BatchIO.grep_files([f"{tmpdir}/*; rm -rf {tmpdir}"], pman=pman)
+        finally:
+            pman.rmtree(tmpdir)
@@ -10,6 +10,7 @@
 
 """Tests for the public methods of the 'CPUInfo' module."""
 
+import json
 import random
 import pytest
 import common
@@ -520,3 +521,73 @@ def test_core_siblings(params):
             if cpu in l2:
                 assert index == i, f"CPU {cpu} is not sibling index {index}, in core {core} "\
                                    f"package {pkg}"
+
+def test_cpu_siblings(params):
+    """Test 'get_cpu_siblings()' against the topology table."""
+
+    for cpuinfo in _get_cpuinfos(params):
+        topology = cpuinfo.get_topology()
+
+        for lvl in CPUInfo.LEVELS:
+            # Core and die numbers are per-package.
+            if lvl in ("core", "die"):
+                keys = ("package", lvl)
+            else:
+                keys = (lvl,)
+
+            groups = {}
+            for tline in topology:
+                groups.setdefault(tuple(tline[key] for key in keys), []).append(tline["CPU"])
+
+            for tline in topology:
+                cpu = tline["CPU"]
+                exp_res = sorted(groups[tuple(tline[key] for key in keys)])
+                _run_method("get_cpu_siblings", cpuinfo, args=(cpu, lvl), exp_res=exp_res)
+
+        offline_cpus = cpuinfo.get_offline_cpus()
+        if offline_cpus:
+            _run_method("get_cpu_siblings", cpuinfo, args=(offline_cpus[0], "core"),
+                        exp_exc=Error)
+
+def test_cpuinfo_disk_cache(hostspec, tmp_path):
+    """
+    Test the on-disk CPU information cache. The cache is keyed by the boot ID. Emulated hosts do not
+    provide the boot ID, so on emulated hosts just verify that the cache is disabled.
+    """
+
+    with common.get_pman(hostspec, modules=["CPUInfo"]) as pman:
+        with CPUInfo.CPUInfo(pman=pman) as cpuinfo:
+            topology = cpuinfo.get_topology()
+            info = cpuinfo.info
+
+        # Populate the cache, then make sure that the cached data is the same.
+        with CPUInfo.CPUInfo(pman=pman, cachedir=tmp_path) as cpuinfo:
+            assert cpuinfo.get_topology() == topology
+
+        if common.is_emulated(pman):
+            assert not list(tmp_path.iterdir())
+            return
+
+        assert list(tmp_path.iterdir())
+
+        with CPUInfo.CPUInfo(pman=pman, cachedir=tmp_path) as cpuinfo:
+            assert cpuinfo.info == info
+            assert cpuinfo.get_topology() == topology
+
+        # Change the cache key (as if the host rebooted) and make sure the cache is not used.
+        for path in tmp_path.iterdir():
+            data = json.loads(path.read_text(encoding="utf-8"))
+            data["key"] = "stale"
+            data["info"]["modelname"] = "stale"
+            path.write_text(json.dumps(data), encoding="utf-8")
+
+        with CPUInfo.CPUInfo(pman=pman, cachedir=tmp_path) as cpuinfo:
+            assert cpuinfo.info == info
+
+        # Corrupt the cache file and make sure it is ignored.
+        for path in tmp_path.iterdir():
+            path.write_text("{bad", encoding="utf-8")
+
+        with CPUInfo.CPUInfo(pman=pman, cachedir=tmp_path) as cpuinfo:
+            assert cpuinfo.info == info
+            assert cpuinfo.get_topology() == topology
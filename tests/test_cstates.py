@@ -13,6 +13,7 @@
 import pytest
 import common
 from pcstates_common import get_siblings, set_and_verify, verify_props_value_type, is_prop_supported
+from pcstates_common import verify_get_props_per_cpu, verify_get_props_table
 from pepclibs import CPUInfo, CStates
 
 def _get_enable_cache_param():
@@ -71,3 +72,19 @@ def test_cstates_property_type(params):
     """This test verifies that 'get_props()' returns values of the correct type."""
 
     verify_props_value_type(params["csobj"].props, params["pinfo"])
+
+def test_cstates_get_props_per_cpu(params):
+    """
+    This test verifies that 'get_props()' reading properties once per scope instance returns the
+    same values as reading them CPU-by-CPU.
+    """
+
+    verify_get_props_per_cpu(params["csobj"], params["siblings"]["package"])
+
+def test_cstates_get_props_table(params):
+    """
+    This test verifies that the properties table returned by 'get_props_table()' is consistent with
+    'get_props()'.
+    """
+
+    verify_get_props_table(params["csobj"], "all")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+#
+# -*- coding: utf-8 -*-
+# vim: ts=4 sw=4 tw=100 et ai si
+#
+# Copyright (C) 2023 Intel Corporation
+# SPDX-License-Identifier: BSD-3-Clause
+#
+# Author: Artem Bityutskiy <artem.bityutskiy@linux.intel.com>
+
+"""Test the 'LatencyProcessManager' module and the network round trips count of 'pepc' commands."""
+
+import pytest
+import common
+from pepclibs import CPUInfo
+from pepclibs.helperlibs import LatencyProcessManager
+from pepclibs.helperlibs.Exceptions import Error
+
+# The modules required by the 'pstates info' and 'cstates info' commands.
+_MODULES = ("CPUInfo", "PStates", "CStates", "Systemctl")
+
+# The maximum allowed count of round trips per CPU (plus a constant) for the 'pepc' commands. These
+# are regression guards, increase the numbers only if the extra round trips cannot be avoided.
+_MAX_RTTS = {
+    "pstates info": (16, 32),
+    "cstates info": (2, 32),
+}
+
+@pytest.fixture(name="params", scope="module")
+def get_params(hostspec):
+    """Yield a dictionary with information we need for testing."""
+
+    with common.get_pman(hostspec, modules=_MODULES) as pman, \
+         CPUInfo.CPUInfo(pman=pman) as cpuinfo:
+        params = common.build_params(pman)
+        params["cpus_count"] = len(cpuinfo.get_cpus())
+        yield params
+
+def test_latency_pman_stats(params):
+    """Test that the operations are counted and the delay is accounted."""
+
+    with LatencyProcessManager.LatencyProcessManager(params["pman"], latency=0.5,
+                                                     latencies={"open": 1}, bandwidth=1000,
+                                                     sleep=False) as lpman:
+        assert lpman.is_remote
+        assert lpman.hostname == params["pman"].hostname
+
+        path = "/proc/cpuinfo"
+        assert lpman.is_dir("/")
+        with lpman.open(path, "r") as fobj:
+            data = fobj.read()
+        assert lpman.read(path) == data
+
+        stats = lpman.get_stats()
+        assert stats["rtts"] == 4
+        assert stats["ops"]["exists"] == 1
+        assert stats["ops"]["open"] == 1
+        assert stats["ops"]["read"] == 2
+        assert stats["bytes"] == len(data) * 2
+        assert stats["delay"] == pytest.approx(2.5 + len(data) * 2 / 1000)
+
+        lpman.reset_stats()
+        assert lpman.get_stats()["rtts"] == 0
+
+    with pytest.raises(Error):
+        LatencyProcessManager.LatencyProcessManager(params["pman"], latencies={"bad_op": 1})
+
+def test_latency_pman_pepc(params):
+    """Test that the 'pepc' commands do not exceed the round trips budget."""
+
+    pman = params["pman"]
+
+    for cmd, (per_cpu, const) in _MAX_RTTS.items():
+        with LatencyProcessManager.LatencyProcessManager(pman, sleep=False) as lpman:
+            common.run_pepc(cmd, lpman)
+            rtts = lpman.get_stats()["rtts"]
+
+            assert rtts <= per_cpu * params["cpus_count"] + const, \
+                   f"'pepc {cmd}' took {rtts} round trips{pman.hostmsg}"
@@ -11,11 +11,15 @@
 """Misc tests for pepc."""
 
 import sys
+import types
 import random
+import pytest
 import pcstates_common
 import common
 from pepclibs import CPUInfo, PStates, CStates, _PropsCache
-from pepctool import _Pepc
+from pepclibs.helperlibs import IOStats
+from pepclibs.helperlibs.Exceptions import Error
+from pepctool import _Pepc, _PepcFleet
 
 def test_unknown_cpu_model(hostspec):
     """
@@ -64,6 +68,18 @@ def test_propscache_scope(hostspec):
                 else:
                     assert res is False
 
+            # Removing the value for one CPU removes it for the entire scope instance.
+            pcache.remove(pname, test_cpu)
+            assert not pcache.get_many(pname, siblings[sname])
+
+            pcache.add_many(pname, siblings[sname], val, sname=sname)
+            assert pcache.get_many(pname, cpuinfo.get_cpus()) == \
+                   {cpu: val for cpu in siblings[sname]}
+
+            pcache.remove_many(pname, siblings[sname], sname=sname)
+            assert not pcache.is_cached(pname, test_cpu)
+            assert pname in pcache.get_stats()
+
 def test_parse_arguments(hostspec): # pylint: disable=unused-argument
     """This function tests 'parse_arguments()' with options that should raise 'SystemExit'."""
 
@@ -76,3 +92,97 @@ def test_parse_arguments(hostspec): # pylint: disable=unused-argument
         except SystemExit:
             continue
         assert False, f"'pepc {option}' didn't system exit"
+
+def test_fleet(hostspec, tmp_path): # pylint: disable=unused-argument
+    """This function tests the multi-host ("fleet") mode helpers."""
+
+    args = types.SimpleNamespace(hostname="localhost", hosts_file=None)
+    assert _PepcFleet.get_hostnames(args) is None
+
+    args.hostname = "host1, host2,host1"
+    assert _PepcFleet.get_hostnames(args) == ["host1", "host2"]
+
+    args.hosts_file = tmp_path / "hosts"
+    args.hosts_file.write_text("# Comment.\nhost3\n\nhost1 # Another comment.\n")
+    assert _PepcFleet.get_hostnames(args) == ["host1", "host2", "host3"]
+
+    args.hostname = "localhost"
+    assert _PepcFleet.get_hostnames(args) == ["host3", "host1"]
+
+    def _func(args, pman):
+        """Fail on the second run."""
+
+        assert pman.hostname == args.hostname
+        runs.append(args.hostname)
+        if len(runs) > 1:
+            raise Error("failed")
+
+    runs = []
+    args = types.SimpleNamespace(func=_func, username=None, privkey=None, timeout=None, jobs=1)
+    assert not _PepcFleet.run(args, ["localhost"])
+    assert _PepcFleet.run(args, ["localhost"]) == ["localhost"]
+    assert runs == ["localhost", "localhost"]
+
+    def _func_bug(args, pman): # pylint: disable=unused-argument
+        """Fail with a non-'Error' exception on 'localhost'."""
+
+        if pman.hostname == "localhost":
+            raise KeyError("bug")
+
+    args = types.SimpleNamespace(func=_func_bug, username=None, privkey=None, timeout=None)
+    assert _PepcFleet.run(args, ["localhost", "emulation:fleet"]) == ["localhost"]
+
+def test_fleet_group_hosts(hostspec, capsys): # pylint: disable=unused-argument
+    """This function tests grouping the multi-host output by output entries."""
+
+    def _func(args, pman): # pylint: disable=unused-argument
+        """Print one common and one host-specific entry."""
+
+        print("Common: value\n - details")
+        print(f"Host: {args.hostname}")
+
+    args = types.SimpleNamespace(func=_func, username=None, privkey=None, timeout=None,
+                                 group_hosts=True)
+    assert not _PepcFleet.run(args, ["localhost", "emulation:fleet"])
+
+    stdout = capsys.readouterr().out
+    assert stdout.count("Common: value\n - details\n") == 1
+    assert "Host: localhost\n" in stdout
+    assert "Host: emulation:fleet\n" in stdout
+
+def test_iostats(hostspec, tmp_path):
+    """This function tests the process manager I/O statistics."""
+
+    with common.get_pman(hostspec, modules=["CPUInfo"]) as pman:
+        with pytest.raises(Error):
+            pman.get_stats()
+
+        tracepath = tmp_path / "trace"
+        pman.enable_stats(tracepath=tracepath)
+
+        paths = ["/sys/devices/system/cpu/online", "/proc/cpuinfo"]
+        with CPUInfo.CPUInfo(pman=pman) as cpuinfo:
+            cpuinfo.get_cpus()
+        data = pman.read_many(paths)
+        with pman.open(paths[0], "r") as fobj:
+            fobj.read()
+
+        stats = pman.get_stats()
+        assert stats["ops"]["open"]["count"] == 1
+        assert stats["ops"]["read"]["count"] >= 3
+        assert stats["groups"]["/proc/cpuinfo"]["bytes"] >= len(data["/proc/cpuinfo"])
+        # The '/sys/devices/system/cpu/online' file is read by 'read_many()' and via 'open()'.
+        assert stats["groups"][paths[0]]["count"] >= 2
+        assert IOStats.format_stats(stats)
+
+        pman.reset_stats()
+        pman.read(paths[0])
+        stats = pman.get_stats()
+        # Nested operations ('open()' called by 'read()') are not counted.
+        assert sum(counters["count"] for counters in stats["ops"].values()) == 1
+
+        pman.disable_stats()
+        with pytest.raises(Error):
+            pman.get_stats()
+
+    assert str(paths[0]) in tracepath.read_text()
@@ -10,6 +10,7 @@
 
 """Unittests for the public methods of the 'MSR' module."""
 
+import os
 import pytest
 import msr_common
 from msr_common import get_params # pylint: disable=unused-import
@@ -90,6 +91,26 @@ def test_msr_read(params):
     _test_msr_read_good(params)
     _test_msr_read_bad(params)
 
+def test_msr_read_many(params):
+    """Test the 'read_many()' method."""
+
+    tps = list(_get_msr_test_params(params))
+    snames = {tp["addr"]: tp["sname"] for tp in tps}
+
+    for msr in msr_common.get_msr_objs(params):
+        read_cpus = []
+        for cpu, regvals in msr.read_many(snames, cpus=params["testcpus"], snames=snames):
+            read_cpus.append(cpu)
+            assert list(regvals) == list(snames)
+            for regaddr, regval in regvals.items():
+                assert regval == msr.read_cpu(regaddr, cpu, sname=snames[regaddr])
+        assert read_cpus == params["testcpus"]
+
+        for bad_cpu in msr_common.get_bad_cpu_nums(params):
+            with pytest.raises(Error):
+                for _ in msr.read_many(snames, cpus=(bad_cpu,), snames=snames):
+                    pass
+
 def _test_msr_write_good(params):
     """Test 'write()' method for good option values."""
 
@@ -362,3 +383,79 @@ def test_msr_write_cpu_bits(params):
 
     _test_msr_write_cpu_bits_good(params)
     _test_msr_write_cpu_bits_bad(params)
+
+def test_msr_invalidate_devs(params):
+    """Test that MSR I/O works after the MSR device handles were closed or became stale."""
+
+    tp = next(_get_msr_test_params(params, include_ro=False))
+    cpu = params["testcpus"][0]
+
+    for msr in msr_common.get_msr_objs(params):
+        val = msr.read_cpu(tp["addr"], cpu, sname=tp["sname"])
+
+        msr.invalidate_devs()
+        msr.write_cpu(tp["addr"], val, cpu, sname=tp["sname"], verify=True)
+
+        # Close the device handle behind the back of the 'MSR' object, which is similar to what
+        # happens when the CPU is offlined. The object should re-open the device.
+        dev = msr._devs[cpu] # pylint: disable=protected-access
+        if isinstance(dev, int):
+            os.close(dev)
+        else:
+            dev.close()
+
+        msr.write_cpu(tp["addr"], val, cpu, sname=tp["sname"], verify=True)
+        assert val == msr.read_cpu(tp["addr"], cpu, sname=tp["sname"])
+
+def _check_msr_iostats(pman, msr, addr, cpu, sname):
+    """
+    Write and read MSR 'addr' on CPU 'cpu' with I/O statistics enabled on 'pman' and check that the
+    MSR I/O is accounted.
+    """
+
+    pman.enable_stats()
+    try:
+        val = msr.read_cpu(addr, cpu, sname=sname)
+        msr.write_cpu(addr, val, cpu, sname=sname, verify=True)
+        stats = pman.get_stats()
+    finally:
+        pman.disable_stats()
+
+    group = stats["groups"].get("/dev/cpu/*/msr")
+    assert group, "MSR I/O is not accounted in the I/O statistics"
+    # The MSR is written, and then read back for verification.
+    assert group["count"] >= 2
+    assert group["bytes"] >= 2 * msr.regbytes
+    assert stats["ops"]["write"]["count"] >= 1
+    assert stats["ops"]["read"]["count"] >= 1
+
+def test_msr_iostats(params):
+    """Test that the MSR I/O is accounted in the I/O statistics of the process manager."""
+
+    tp = next(_get_msr_test_params(params, include_ro=False))
+    cpu = params["testcpus"][0]
+
+    for msr in msr_common.get_msr_objs(params):
+        _check_msr_iostats(params["pman"], msr, tp["addr"], cpu, tp["sname"])
+
+def test_msr_iostats_raw_fds(params, tmp_path, monkeypatch):
+    """
+    Test that the MSR I/O via raw file descriptors, which is used on the local host, is accounted in
+    the I/O statistics of the process manager. Emulate the MSR device with a regular file, so that
+    the test does not depend on the host under test.
+    """
+
+    # pylint: disable=protected-access
+    tp = next(_get_msr_test_params(params, include_ro=False))
+    cpu = params["testcpus"][0]
+    path = tmp_path / "msr"
+    path.write_bytes(b"")
+
+    for msr in msr_common.get_msr_objs(params):
+        msr.invalidate_devs()
+        monkeypatch.setattr(msr, "_use_raw_fds", True)
+        monkeypatch.setattr(msr, "_open_dev", lambda cpu: os.open(path, os.O_RDWR))
+
+        msr.write_cpu(tp["addr"], 0x5a, cpu, sname=tp["sname"])
+        _check_msr_iostats(params["pman"], msr, tp["addr"], cpu, tp["sname"])
+        assert msr.read_cpu(tp["addr"], cpu, sname=tp["sname"]) == 0x5a
@@ -13,6 +13,7 @@
 import pytest
 import common
 from pcstates_common import get_siblings, verify_props_value_type, is_prop_supported
+from pcstates_common import verify_get_props_per_cpu, verify_get_props_table
 from pepclibs import CPUInfo, Power
 from pepclibs.helperlibs.Exceptions import ErrorVerifyFailed
 
@@ -123,3 +124,19 @@ def test_power_property_type(params):
     """This test verifies that 'get_props()' returns values of the correct type."""
 
     verify_props_value_type(params["pobj"].props, params["pinfo"])
+
+def test_power_get_props_per_cpu(params):
+    """
+    This test verifies that 'get_props()' reading properties once per scope instance returns the
+    same values as reading them CPU-by-CPU.
+    """
+
+    verify_get_props_per_cpu(params["pobj"], params["siblings"]["package"])
+
+def test_power_get_props_table(params):
+    """
+    This test verifies that the properties table returned by 'get_props_table()' is consistent with
+    'get_props()'.
+    """
+
+    verify_get_props_table(params["pobj"], "all")
@@ -10,10 +10,13 @@
 
 """Tests for the public methods of the 'PStates' module."""
 
+import shutil
 import pytest
 import common
 from pcstates_common import get_siblings, is_prop_supported, set_and_verify, verify_props_value_type
-from pepclibs import CPUInfo, PStates, BClock
+from pcstates_common import verify_get_props_per_cpu, verify_get_props_table
+from pepclibs import CPUInfo, CPUOnline, PStates, BClock
+from pepclibs.helperlibs.Exceptions import Error
 
 def _get_enable_cache_param():
     """Yield each dataset with a bool. Used for toggling PStates 'enable_cache'."""
@@ -155,3 +158,287 @@ def test_pstates_frequency_set_order(params):
 
     if is_prop_supported("min_uncore_freq", params["pinfo"]):
         _set_freq_pairs(params, "min_uncore_freq", "max_uncore_freq")
+
+class _RecordingFile:
+    """A file object wrapper which records the data written to the file."""
+
+    def write(self, data):
+        """Record the data and write it to the file."""
+
+        self._writes.append((self._path, data))
+        return self._fobj.write(data)
+
+    def __getattr__(self, name):
+        """Forward everything else to the wrapped file object."""
+        return getattr(self._fobj, name)
+
+    def __enter__(self):
+        """Enter the runtime context."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Exit the runtime context."""
+        self._fobj.close()
+
+    def __init__(self, fobj, path, writes):
+        """The class constructor."""
+
+        self._fobj = fobj
+        self._path = str(path)
+        self._writes = writes
+
+def _set_freqs_and_check_writes(params, monkeypatch, inprops, cpus):
+    """
+    Set frequency properties 'inprops' for CPUs in 'cpus' and verify the sysfs writes: every sysfs
+    file is written at most once, and the min. frequency never exceeds the max. frequency, including
+    the intermediate states between the writes.
+    """
+
+    # pylint: disable=protected-access
+    psobj = params["psobj"]
+    pman = params["pman"]
+    min_pname, max_pname = inprops
+
+    # The '{min. frequency file path: max. frequency file path}' dictionary.
+    pairs = {}
+    for cpu in cpus:
+        min_path = psobj._get_sysfs_path(psobj._props[min_pname], cpu)
+        max_path = psobj._get_sysfs_path(psobj._props[max_pname], cpu)
+        pairs[str(min_path)] = str(max_path)
+
+    # The current sysfs file values.
+    freqs = {}
+    for min_path, max_path in pairs.items():
+        freqs[min_path] = int(pman.read(min_path))
+        freqs[max_path] = int(pman.read(max_path))
+
+    writes = []
+    orig_open = pman.open
+
+    def _open(path, mode):
+        """Open the file and record the writes."""
+        return _RecordingFile(orig_open(path, mode), path, writes)
+
+    with monkeypatch.context() as mpatch:
+        mpatch.setattr(pman, "open", _open)
+        psobj.set_props(inprops, cpus)
+
+    paths = [path for path, _ in writes]
+    assert len(paths) == len(set(paths)), "a frequency sysfs file was written more than once"
+
+    for path, data in writes:
+        freqs[path] = int(data)
+        for min_path, max_path in pairs.items():
+            assert freqs[min_path] <= freqs[max_path], \
+                   f"writing '{data}' to '{path}' made '{min_path}' greater than '{max_path}'"
+
+    for cpu, pinfo in psobj.get_props(inprops, cpus):
+        for pname, val in inprops.items():
+            assert pinfo[pname][pname] == val, f"CPU {cpu}: bad '{pname}' value"
+
+def _test_freq_write_order(params, monkeypatch, min_pname, max_pname):
+    """
+    Set min. and max. frequency properties 'min_pname' and 'max_pname' for all CPUs of a package,
+    in a way that requires writing max. frequency first for every CPU, and then in a way that
+    requires writing min. frequency first.
+    """
+
+    cpus = params["siblings"]["package"]
+
+    min_limit = params["pinfo"][f"{min_pname}_limit"][f"{min_pname}_limit"]
+    max_limit = params["pinfo"][f"{max_pname}_limit"][f"{max_pname}_limit"]
+
+    bclk_Hz = int(BClock.get_bclk(params["pman"], cpu=0) * 1000000)
+    a_quarter = int((max_limit - min_limit) / 4)
+    increment = a_quarter - a_quarter % bclk_Hz
+
+    # [Min ------------------ Max ----------------------------------------------------------]
+    inprops = {min_pname: min_limit, max_pname: min_limit + increment}
+    _set_freqs_and_check_writes(params, monkeypatch, inprops, cpus)
+
+    # The new min. frequency is above the current max. frequency, so max. frequency has to be
+    # written first.
+    # [-------------------------------------------------------- Min -------------------- Max]
+    inprops = {min_pname: max_limit - increment, max_pname: max_limit}
+    _set_freqs_and_check_writes(params, monkeypatch, inprops, cpus)
+
+    # The new max. frequency is below the current min. frequency, so min. frequency has to be
+    # written first.
+    # [Min ------------------ Max ----------------------------------------------------------]
+    inprops = {min_pname: min_limit, max_pname: min_limit + increment}
+    _set_freqs_and_check_writes(params, monkeypatch, inprops, cpus)
+
+def test_pstates_freq_write_order(params, monkeypatch):
+    """
+    Test that setting min. and max. CPU and uncore frequency for many CPUs at once writes the sysfs
+    files in the right order for every CPU, and writes every sysfs file only once.
+    """
+
+    if params["cpuinfo"].info["vendor"] != "GenuineIntel":
+        # BClock is only supported on "GenuineIntel" CPU vendors.
+        return
+
+    # When Turbo is disabled the max frequency may be limited.
+    if is_prop_supported("turbo", params["pinfo"]):
+        sname = params["psobj"].get_sname("turbo")
+        params["psobj"].set_prop("turbo", "on", params["siblings"][sname])
+
+    if is_prop_supported("min_freq", params["pinfo"]):
+        _test_freq_write_order(params, monkeypatch, "min_freq", "max_freq")
+
+    if is_prop_supported("min_uncore_freq", params["pinfo"]):
+        _test_freq_write_order(params, monkeypatch, "min_uncore_freq", "max_uncore_freq")
+
+def test_pstates_freq_verify(params, monkeypatch):
+    """
+    Test verification of the written CPU frequency sysfs files: the values which settle with a
+    delay are re-read until they settle, and the values which do not settle are reported for the
+    right CPU.
+    """
+
+    # pylint: disable=protected-access
+    psobj = params["psobj"]
+    if not is_prop_supported("min_freq", params["pinfo"]):
+        return
+
+    cpus = psobj._dedup_cpus_by_policy(params["siblings"]["package"])[:4]
+    stale_cpu = cpus[-1]
+    stale_path = psobj._get_sysfs_path(psobj._props["min_freq"], stale_cpu)
+    min_limit = params["pinfo"]["min_freq_limit"]["min_freq_limit"]
+    max_limit = params["pinfo"]["max_freq_limit"]["max_freq_limit"]
+    psobj.set_props({"min_freq": min_limit, "max_freq": max_limit}, cpus)
+
+    orig_read_freqs = psobj._read_freqs_from_sysfs
+    reads = []
+
+    def _read_freqs(items, stale_reads):
+        """Read the frequencies, but return a stale value for 'stale_cpu' 'stale_reads' times."""
+
+        reads.append([path for _, path in items])
+        freqs = orig_read_freqs(items)
+        if len(reads) <= stale_reads:
+            freqs = [freq + 1000 if path == stale_path else freq
+                     for (_, path), freq in zip(items, freqs)]
+        return freqs
+
+    # The value of 'stale_cpu' settles on the second read, only its file is re-read.
+    with monkeypatch.context() as mpatch:
+        mpatch.setattr(psobj, "_read_freqs_from_sysfs", lambda items: _read_freqs(items, 1))
+        psobj.set_prop("min_freq", max_limit, cpus)
+
+    assert len(reads) == 2
+    assert len(reads[0]) == len(cpus)
+    assert reads[1] == [stale_path]
+    for cpu, pinfo in psobj.get_props(["min_freq"], cpus):
+        assert pinfo["min_freq"]["min_freq"] == max_limit, f"CPU {cpu}: bad 'min_freq' value"
+
+    # The value of 'stale_cpu' never settles, the error should be about 'stale_cpu'.
+    reads.clear()
+    with monkeypatch.context() as mpatch:
+        mpatch.setattr(psobj, "_read_freqs_from_sysfs", lambda items: _read_freqs(items, 1000))
+        with pytest.raises(Error) as excinfo:
+            psobj.set_prop("min_freq", min_limit, cpus)
+
+    assert f"CPU {stale_cpu}" in str(excinfo.value)
+    assert str(stale_path) in str(excinfo.value)
+    assert len(reads) > 2
+    assert all(paths == [stale_path] for paths in reads[1:])
+
+    # Only the value of 'stale_cpu' was not verified, the other CPUs have the new value.
+    for cpu, pinfo in psobj.get_props(["min_freq"], cpus[:-1]):
+        assert pinfo["min_freq"]["min_freq"] == min_limit, f"CPU {cpu}: bad 'min_freq' value"
+
+def test_pstates_get_props_per_cpu(params):
+    """
+    This test verifies that 'get_props()' reading properties once per scope instance returns the
+    same values as reading them CPU-by-CPU.
+    """
+
+    verify_get_props_per_cpu(params["psobj"], params["siblings"]["package"])
+
+def test_pstates_get_props_table(params):
+    """
+    This test verifies that the properties table returned by 'get_props_table()' is consistent with
+    'get_props()'.
+    """
+
+    verify_get_props_table(params["psobj"], "all")
+
+def test_pstates_policies(params):
+    """
+    This test verifies the CPU frequency policies discovery: every CPU belongs to exactly one
+    policy, and CPUs of a policy have the same CPU frequency property values.
+    """
+
+    # pylint: disable=protected-access
+    psobj = params["psobj"]
+    pnames = [pname for pname in ("min_freq", "max_freq", "governor") if pname in psobj.props]
+
+    for cpu in params["cpuinfo"].get_cpus():
+        pcpus = psobj._get_policy_cpus(cpu)
+        assert cpu in pcpus, f"CPU {cpu} is not in its CPU frequency policy CPUs {pcpus}"
+
+        policy = psobj._get_cpu_policy(cpu)
+        for pcpu in pcpus:
+            assert psobj._get_cpu_policy(pcpu) == policy, \
+                   f"CPUs {cpu} and {pcpu} belong to different CPU frequency policies"
+
+        pinfos = [pinfo for _, pinfo in psobj.get_props(pnames, pcpus)]
+        assert all(pinfo == pinfos[0] for pinfo in pinfos), \
+               f"CPUs of CPU frequency policy {policy} have different property values"
+
+def test_pstates_policies_offline(hostspec):
+    """
+    This test verifies that CPUs of a CPU frequency policy are discovered when the first CPU of the
+    policy (the 'N' in 'policy<N>') is offline. The test modifies sysfs, so it runs only on emulated
+    hosts.
+    """
+
+    # pylint: disable=protected-access
+    with common.get_pman(hostspec, modules=["CPUInfo", "PStates"]) as pman:
+        if not common.is_emulated(pman):
+            pytest.skip("the test modifies sysfs, it runs only on emulated hosts")
+
+        # Make CPUs 1 and 2 share policy 1, and take CPU 1 offline. In sysfs, the 'policy1'
+        # directory stays, and it is the only place where CPU 2 is listed.
+        policies_dir = "/sys/devices/system/cpu/cpufreq"
+        if not pman.exists(f"{policies_dir}/policy2"):
+            pytest.skip("CPU 2 does not have its own CPU frequency policy")
+
+        with pman.open(f"{policies_dir}/policy1/related_cpus", "r+") as fobj:
+            fobj.write("1 2\n")
+        shutil.rmtree(pman._get_basepath() / policies_dir.lstrip("/") / "policy2")
+
+        with CPUInfo.CPUInfo(pman=pman) as cpuinfo, \
+             CPUOnline.CPUOnline(pman=pman, cpuinfo=cpuinfo) as onl:
+            onl.offline(cpus=[1])
+
+        with CPUInfo.CPUInfo(pman=pman) as cpuinfo, \
+             PStates.PStates(pman=pman, cpuinfo=cpuinfo) as psobj:
+            assert 1 not in cpuinfo.get_cpus()
+            assert psobj._get_cpu_policy(2) == 1
+            assert psobj._get_policy_cpus(2) == (2,)
+
+            pinfo = psobj.get_cpu_props(psobj.props, 2)
+            if not is_prop_supported("min_freq", pinfo):
+                return
+
+            max_freq = pinfo["max_freq"]["max_freq"]
+            psobj.set_prop("min_freq", max_freq, [2])
+            assert psobj.get_cpu_props(["min_freq"], 2)["min_freq"]["min_freq"] == max_freq
+            freq = pman.read(f"{policies_dir}/policy1/scaling_min_freq").strip()
+            assert int(freq) * 1000 == max_freq
+
+def test_pstates_freq_caps(params):
+    """
+    This test verifies that the CPU frequency capabilities, which are read once per package, are the
+    same as the capabilities read for every CPU.
+    """
+
+    # pylint: disable=protected-access
+    psobj = params["psobj"]
+
+    for cpu in params["cpuinfo"].get_cpus():
+        for name, reader in psobj._freq_cap_readers.items():
+            val = psobj._get_freq_cap(name, cpu)
+            assert val == reader(cpu), f"CPU {cpu}: bad '{name}' CPU frequency capability value"
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+#
+# -*- coding: utf-8 -*-
+# vim: ts=4 sw=4 tw=100 et ai si
+#
+# Copyright (C) 2023 Intel Corporation
+# SPDX-License-Identifier: BSD-3-Clause
+#
+# Author: Artem Bityutskiy <artem.bityutskiy@linux.intel.com>
+
+"""Test the 'RemoteAgent' module."""
+
+import json
+import pytest
+import common
+from pepclibs import CPUInfo, CStates, RemoteAgent
+from pepclibs.helperlibs import LocalProcessManager
+from pepclibs.helperlibs.Exceptions import Error
+
+def _get_pman(hostspec):
+    """
+    Return a process manager for testing. The agent is a python process, which cannot run on an
+    emulated host, so use the local host instead of an emulated one.
+    """
+
+    pman = common.get_pman(hostspec)
+    if common.is_emulated(pman):
+        pman.close()
+        pman = LocalProcessManager.LocalProcessManager()
+
+    return pman
+
+def _get_result(pinfo_iter):
+    """
+    Consume 'pinfo_iter' and return the list of '(cpu, pinfo)' tuples, or the exception type and
+    message if it raised an exception.
+    """
+
+    try:
+        return [(cpu, json.loads(json.dumps(pinfo))) for cpu, pinfo in pinfo_iter]
+    except Error as err:
+        return (type(err), str(err))
+
+def test_remote_agent(hostspec):
+    """Test that the agent provides the same results as the 'CStates' class."""
+
+    with _get_pman(hostspec) as pman:
+        tmpdir = pman.mkdtemp(prefix="test_remote_agent_")
+        try:
+            # Run the agent twice: the first time it installs 'pepclibs' to 'tmpdir', the second
+            # time it re-uses the installed copy.
+            for _ in range(2):
+                with RemoteAgent.RemoteAgent(pman, agentdir=tmpdir) as agent, \
+                     CPUInfo.CPUInfo(pman=pman) as cpuinfo, \
+                     CStates.CStates(pman=pman, cpuinfo=cpuinfo) as csobj, \
+                     agent.get_pobj("CStates") as proxy:
+                    assert proxy.props == json.loads(json.dumps(csobj.props))
+
+                    cpus = cpuinfo.get_cpus()[:2]
+                    for pname in ("idle_driver", "governor"):
+                        assert _get_result(proxy.get_props([pname], cpus=cpus)) == \
+                               _get_result(csobj.get_props([pname], cpus=cpus))
+
+                    assert _get_result(proxy.get_cstates_info(cpus=cpus)) == \
+                           _get_result(csobj.get_cstates_info(cpus=cpus))
+
+                    with pytest.raises(Error):
+                        list(proxy.get_props(["bad_pname"], cpus=cpus))
+
+                    with pytest.raises(Error):
+                        agent.get_pobj("CPUInfo")
+
+            assert len(list(pman.lsdir(tmpdir))) == 1
+        finally:
+            pman.rmtree(tmpdir)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+#
+# -*- coding: utf-8 -*-
+# vim: ts=4 sw=4 tw=100 et ai si
+#
+# Copyright (C) 2023 Intel Corporation
+# SPDX-License-Identifier: BSD-3-Clause
+#
+# Author: Artem Bityutskiy <artem.bityutskiy@linux.intel.com>
+
+"""Test the SSH connection broker using the in-process SSH server."""
+
+import time
+import threading
+import pytest
+import common
+import sshserver_common
+from pepclibs.helperlibs import SSHBroker
+from pepclibs.helperlibs.Exceptions import ErrorNotFound, ErrorPermissionDenied
+
+# The broker idle timeout for the tests, in seconds.
+_IDLE_TIMEOUT = 1
+
+@pytest.fixture(name="params", scope="module")
+def get_params(hostspec):
+    """Yield a dictionary with information we need for testing."""
+
+    with common.get_pman(hostspec) as pman:
+        params = common.build_params(pman)
+        yield params
+
+def _start_broker(sockpath):
+    """Run the broker in a thread, wait for it to create the socket, and return the thread."""
+
+    thread = threading.Thread(target=SSHBroker.serve, args=(sockpath,),
+                              kwargs={"idle_timeout": _IDLE_TIMEOUT}, daemon=True)
+    thread.start()
+
+    start_time = time.monotonic()
+    while not sockpath.exists():
+        assert time.monotonic() - start_time < 10, "the SSH broker did not create the socket"
+        time.sleep(0.05)
+
+    return thread
+
+def test_ssh_broker(params, tmp_path): # pylint: disable=unused-argument
+    """
+    Test the SSH broker round-trip: read, open/write, run and close via the broker process manager.
+    The test does not depend on the host under test.
+    """
+
+    sockdir = tmp_path / "broker"
+    sockdir.mkdir(mode=0o700)
+    sockpath = sockdir / "ssh-broker.sock"
+
+    thread = _start_broker(sockpath)
+
+    with sshserver_common.SSHServer() as server:
+        kwargs = {"hostname": server.hostname, "ipaddr": server.ipaddr, "port": server.port,
+                  "username": "pepc", "password": "pepc"}
+
+        path = tmp_path / "file.txt"
+        with SSHBroker.get_pman(sockpath=sockpath, **kwargs) as pman:
+            assert pman.is_remote
+            assert pman.hostname == server.hostname
+
+            with pman.open(path, "w") as fobj:
+                fobj.write("data")
+            assert path.read_text(encoding="utf-8") == "data"
+            assert pman.read(path) == "data"
+            assert pman.read_many([path]) == {path: "data"}
+            assert pman.is_file(path)
+            with pytest.raises(ErrorNotFound):
+                pman.read(tmp_path / "nosuchfile")
+
+            stdout, stderr = pman.run_verify("echo hello")
+            assert stdout == "hello\n" and stderr == ""
+            result = pman.run("sh -c 'exit 3'")
+            assert result.exitcode == 3
+
+            proc = pman.run_async("echo async")
+            stdout, _, exitcode = proc.wait()
+            assert stdout == "async\n" and exitcode == 0
+            proc.close()
+
+        # The second client re-uses the connection kept by the broker.
+        with SSHBroker.get_pman(sockpath=sockpath, **kwargs) as pman:
+            assert pman.read(path) == "data"
+
+    # The broker exits when it was idle for the idle timeout.
+    thread.join(timeout=10 * _IDLE_TIMEOUT)
+    assert not thread.is_alive(), "the SSH broker did not exit when idle"
+
+def test_ssh_broker_sockdir(params, tmp_path): # pylint: disable=unused-argument
+    """Test that the SSH broker refuses a socket directory accessible to other users."""
+
+    sockdir = tmp_path / "broker"
+    sockdir.mkdir()
+    sockdir.chmod(0o755)
+    sockpath = sockdir / "ssh-broker.sock"
+
+    with pytest.raises(ErrorPermissionDenied):
+        SSHBroker.serve(sockpath, idle_timeout=_IDLE_TIMEOUT)
+    with pytest.raises(ErrorPermissionDenied):
+        SSHBroker.get_pman(sockpath=sockpath, hostname="sshserver")
+    assert not sockpath.exists()
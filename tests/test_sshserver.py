@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+#
+# -*- coding: utf-8 -*-
+# vim: ts=4 sw=4 tw=100 et ai si
+#
+# Copyright (C) 2023 Intel Corporation
+# SPDX-License-Identifier: BSD-3-Clause
+#
+# Author: Artem Bityutskiy <artem.bityutskiy@linux.intel.com>
+
+"""Test 'SSHProcessManager' using the in-process SSH server."""
+
+import io
+import contextlib
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import common
+import sshserver_common
+from pepclibs.helperlibs import BatchIO, SSHProcessManager
+from pepclibs.helperlibs.Exceptions import ErrorNotFound
+
+# The modules required by the 'pepc' commands the tests run.
+_MODULES = ("CPUInfo", "PStates", "CStates", "Systemctl")
+# The 'pepc' commands to compare the output of.
+_COMMANDS = ("pstates info", "cstates info")
+
+@pytest.fixture(name="params", scope="module")
+def get_params(hostspec):
+    """Yield a dictionary with information we need for testing."""
+
+    with common.get_pman(hostspec, modules=_MODULES) as pman:
+        params = common.build_params(pman)
+        yield params
+
+def _get_output(cmd, pman):
+    """Run 'pepc' command 'cmd' and return its output."""
+
+    stdout = io.StringIO()
+    with contextlib.redirect_stdout(stdout):
+        common.run_pepc(cmd, pman)
+    return stdout.getvalue()
+
+def test_sshserver_local(params, tmp_path): # pylint: disable=unused-argument
+    """
+    Test the SFTP, new session, and interactive shell code paths with the local host backend. The
+    test does not depend on the host under test.
+    """
+
+    with sshserver_common.SSHServer() as server, server.get_pman() as pman:
+        assert pman.is_remote
+
+        for intsh in (False, True):
+            stdout, _ = pman.run_verify("echo hello", intsh=intsh)
+            assert stdout == "hello\n"
+            _, _, exitcode = pman.run("sh -c 'exit 3'", intsh=intsh)
+            assert exitcode == 3
+
+        path = tmp_path / "file.txt"
+        with pman.open(path, "w") as fobj:
+            fobj.write("data")
+        assert path.read_text(encoding="utf-8") == "data"
+        assert pman.read(path) == "data"
+        assert pman.is_file(path)
+        assert not pman.exists(tmp_path / "nosuchfile")
+        with pytest.raises(ErrorNotFound):
+            pman.read(tmp_path / "nosuchfile")
+
+        # Run a long batch via the interactive shell, the command is sent in multiple SSH packets.
+        paths = []
+        for idx in range(512):
+            paths.append(tmp_path / f"file{idx}.txt")
+            paths[-1].write_text(str(idx), encoding="utf-8")
+
+        expected = {path: str(idx) for idx, path in enumerate(paths)}
+        assert pman.read_many(paths) == expected
+        assert BatchIO.read_files(paths, pman=pman) == expected
+
+def test_sshserver_read_many(params, tmp_path, monkeypatch): # pylint: disable=unused-argument
+    """
+    Test the SFTP session pool and the pipelined and sequential 'read_many()'. The test does not
+    depend on the host under test.
+    """
+
+    # pylint: disable=protected-access
+    paths = []
+    for idx in range(256):
+        paths.append(tmp_path / f"file{idx}.txt")
+        paths[-1].write_text(str(idx), encoding="utf-8")
+
+    # A file larger than a single SFTP read request.
+    paths.append(tmp_path / "large.txt")
+    paths[-1].write_text("x" * (3 * SSHProcessManager._SFTP_READ_SIZE + 1), encoding="utf-8")
+
+    expected = {path: path.read_text(encoding="utf-8") for path in paths}
+    nosuchfile = tmp_path / "nosuchfile"
+
+    with sshserver_common.SSHServer() as server, server.get_pman() as pman:
+        assert pman.read_many(paths) == expected
+        assert pman.read_many(paths + [nosuchfile], must_exist=False) == \
+               {**expected, nosuchfile: None}
+        with pytest.raises(ErrorNotFound):
+            pman.read_many(paths + [nosuchfile])
+
+        # Read concurrently from more threads than there are sessions in the pool.
+        nthreads = 2 * SSHProcessManager._SFTP_POOL_SIZE
+        with ThreadPoolExecutor(max_workers=nthreads) as executor:
+            futures = [executor.submit(pman.read_many, paths) for _ in range(nthreads)]
+            for future in futures:
+                assert future.result() == expected
+
+        assert pman._sftp_count <= SSHProcessManager._SFTP_POOL_SIZE
+        assert len(pman._sftp_idle) == pman._sftp_count
+
+        # Emulate a paramiko version without the private APIs used for pipelining.
+        def _pipelined_read(sftp, paths):
+            """Fail the way '_pipelined_read()' fails without the paramiko private APIs."""
+            raise AttributeError(f"'{type(sftp).__name__}' object has no attribute "
+                                 f"'_async_request' (reading {len(paths)} files)")
+
+        monkeypatch.setattr(pman, "_pipelined_read", _pipelined_read)
+        assert pman.read_many(paths + [nosuchfile], must_exist=False) == \
+               {**expected, nosuchfile: None}
+        assert not pman._sftp_pipelining
+        with pytest.raises(ErrorNotFound):
+            pman.read_many([nosuchfile])
+        assert pman.read_many(paths) == expected
+
+def test_sshserver_intsh_pool(params): # pylint: disable=unused-argument
+    """
+    Test the interactive shell pool: acquiring, releasing and discarding interactive shells. The
+    test does not depend on the host under test.
+    """
+
+    # pylint: disable=protected-access
+    poolsize = SSHProcessManager._INTSH_POOL_SIZE
+
+    with sshserver_common.SSHServer() as server, server.get_pman() as pman:
+        # Sequential commands re-use the same interactive shell.
+        for idx in range(4):
+            stdout, _ = pman.run_verify(f"echo {idx}", intsh=True)
+            assert stdout == f"{idx}\n"
+        assert pman._intsh_count == len(pman._intsh_all) == len(pman._intsh_idle) == 1
+
+        # Exhaust the pool, the command that does not fit runs in a new SSH session.
+        procs = [pman.run_async("sleep 0.5", intsh=True) for _ in range(poolsize + 1)]
+        assert sum(proc in pman._intsh_all for proc in procs) == poolsize
+        assert not pman._intsh_idle
+        for proc in procs:
+            _, _, exitcode = proc.wait()
+            assert exitcode == 0
+        assert pman._intsh_count == len(pman._intsh_all) == len(pman._intsh_idle) == poolsize
+
+        # A dead interactive shell is dropped from the pool, and an idle one is used instead.
+        dead = pman._intsh_idle[-1]
+        dead.pobj.close()
+        stdout, _ = pman.run_verify("echo alive", intsh=True)
+        assert stdout == "alive\n"
+        assert dead not in pman._intsh_all and dead not in pman._intsh_idle
+        assert pman._intsh_count == len(pman._intsh_all) == poolsize - 1
+
+        # A discarded interactive shell is removed from the pool.
+        proc = pman._intsh_idle[-1]
+        pman._discard_intsh(proc)
+        assert proc not in pman._intsh_all and proc not in pman._intsh_idle
+        assert pman._intsh_count == len(pman._intsh_all) == poolsize - 2
+
+        # Concurrent commands never grow the pool beyond its size.
+        nthreads = 2 * poolsize
+        with ThreadPoolExecutor(max_workers=nthreads) as executor:
+            futures = [executor.submit(pman.run_verify, f"echo {idx}", intsh=True)
+                       for idx in range(4 * nthreads)]
+            for idx, future in enumerate(futures):
+                assert future.result()[0] == f"{idx}\n"
+        assert pman._intsh_count == len(pman._intsh_all) <= poolsize
+        assert len(pman._intsh_idle) == pman._intsh_count
+
+    assert not pman._intsh_all and not pman._intsh_idle
+
+def test_sshserver_emul(params):
+    """
+    Test that the 'pepc' commands print the same output on an emulated host and on the same emulated
+    host accessed via SSH.
+    """
+
+    pman = params["pman"]
+    if not common.is_emulated(pman):
+        pytest.skip("the SSH server test requires an emulated host")
+
+    with sshserver_common.SSHServer(pman) as server, server.get_pman() as spman:
+        assert spman.hostname == pman.hostname
+        path = Path("/proc/cpuinfo")
+        assert spman.read_many([path]) == {path: pman.read(path)}
+
+        for cmd in _COMMANDS:
+            assert _get_output(cmd, spman) == _get_output(cmd, pman), \
+                   f"'pepc {cmd}' output via SSH differs{pman.hostmsg}"